@@ -27,7 +27,7 @@ try:
     print('import datetime: OK')
     from functools import wraps
     print('import functools.wraps: OK')
-    from flask import Flask, request, jsonify, send_from_directory, make_response
+    from flask import Flask, Response, request, jsonify, send_from_directory, make_response, stream_with_context
     print('import flask: OK')
     import functions_framework
     print('import functions_framework: OK')
@@ -56,6 +56,17 @@ if os.environ.get("GOOGLE_APPLICATION_CREDENTIALS_JSON"):
 
 # === 🗺️ MAP INTEGRATION ===
 from utils.map_integration import *
+from utils.country_aggregates import build_aggregates
+from utils.map_country_mapping import CountryMapper
+from utils.photo_store import PHOTO_CACHE_CONTROL, PhotoStore
+from utils.story_codec import ZSTD_DICTIONARY_PATH, StoryCodec, decode_story_bytes
+from utils.story_events import StoryEvents, issue_stream_token, sse_event, verify_stream_token
+from utils.story_partition import StoryPartition, StoryPartitions
+from utils.story_record import StoryRecord, compact_story
+from utils.story_search import SearchIndexer
+from utils.story_transfer import NDJSON_MIMETYPE, export_lines, import_lines
+from utils.upload_spool import UploadSpool
+from utils.story_index import build_hash_index, filter_rows, has_valid_country, idempotent_story_id, is_summary_projection, paginate_rows, parse_fields, parse_filters, parse_story_name, project_story, story_content_hash, story_sort_key
 
 # Resolve SVG path relative to project root
 svg_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend", "assets", "maps", "world-map.svg")
@@ -133,6 +144,486 @@ if not os.environ.get('VERCEL'):
             # If we can't create the directory, we'll use in-memory storage
             pass
 
+# Page sizes for paginated get_stories
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Story ids accepted by one get_stories_by_ids request
+MAX_STORY_IDS = 100
+
+# === 🗜️ STORY COMPRESSION ===
+# Opt-in: gzip with Content-Encoding on GCS, zstd with a trained dictionary for local files
+# (readers detect the format, so plain JSON stories saved earlier keep working)
+STORY_COMPRESSION = os.environ.get("STORY_COMPRESSION", "false").lower() in ("1", "true", "yes")
+gcs_story_codec = StoryCodec('gzip' if STORY_COMPRESSION else 'none')
+local_story_codec = StoryCodec('zstd' if STORY_COMPRESSION else 'none', ZSTD_DICTIONARY_PATH)
+
+# === 👤 STORY PARTITIONS ===
+# Signed-in users' stories live under stories/<user_id>/ with their own index, mirror and cache,
+# so a request only reads one traveller's history; anonymous requests use the shared stories/ prefix
+
+# "files" keeps one JSON file per story; "sqlite" keeps them in one indexed WAL database per partition;
+# "memory" keeps them in this process only (offline benchmarks and demos)
+LOCAL_STORAGE_BACKEND = os.environ.get("LOCAL_STORAGE_BACKEND", "files")
+country_mapper = CountryMapper()
+
+def open_story_partition(user_id):
+    """Open the storage of one partition (None for the shared partition)"""
+    return StoryPartition(
+        user_id,
+        bucket=storage_client.bucket(STORIES_BUCKET) if use_cloud_storage and storage_client else None,
+        local_root=LOCAL_STORAGE_DIR,
+        backend=LOCAL_STORAGE_BACKEND,
+        country_mapper=country_mapper,
+        gcs_codec=gcs_story_codec,
+        local_codec=local_story_codec
+    )
+
+story_partitions = StoryPartitions(open_story_partition)
+if story_partitions.shared.store.maintains_index:
+    print(f"🗄️ Using SQLite story store at {story_partitions.shared.store.db_path}")
+
+# Actions that read or write stories, answered from the caller's partition
+PARTITIONED_ACTIONS = {
+    "save_story", "get_stories", "get_highlighted_map", "get_map_statistics", "export_map_data",
+    "get_country_details", "delete_stories_by_country", "get_visited_countries", "export_stories",
+    "search_stories", "get_story", "get_stories_by_ids", "get_stories_since", "get_stream_token"
+}
+
+def story_partition_for(session_token):
+    """Partition of the user behind a session token (shared partition without one, None if the session is invalid)"""
+    if not session_token:
+        return story_partitions.shared
+    session_result = validate_session(session_token)
+    if not session_result.get("valid"):
+        return None
+    return story_partitions.get(session_result["user"]["id"])
+
+def bearer_token(request):
+    """Session token sent as an Authorization: Bearer header (for requests without a JSON body)"""
+    authorization = request.headers.get('Authorization', '')
+    return authorization[len('Bearer '):].strip() if authorization.startswith('Bearer ') else None
+
+# === 🖼️ PHOTO STORE ===
+# Photos are stored once per content hash, outside the story JSON
+LOCAL_PHOTO_DIR = os.path.join(os.path.dirname(LOCAL_STORAGE_DIR), "photos")
+photo_store = PhotoStore(
+    bucket=storage_client.bucket(STORIES_BUCKET) if use_cloud_storage and storage_client else None,
+    local_dir=LOCAL_PHOTO_DIR
+)
+
+def scan_stored_stories(partition):
+    """Full scan of a partition's story storage, yielding (name, story, size)"""
+    return partition.store.scan()
+
+def story_reader(partition):
+    """Function reading one of a partition's stories by blob/file name"""
+    return partition.store.read
+
+def iter_stories_by_name(partition, names):
+    """Lazily fetch stories by blob/file name in parallel, yielding them in the given order"""
+    for name, story_data, error in partition.store.read_many(names):
+        if error:
+            print(f"⚠️ Skipping unreadable story {name}: {error}")
+            continue
+        yield story_data
+
+def load_stories_by_name(partition, names):
+    """Fetch specific stories by blob/file name in parallel, keeping the given order"""
+    return list(iter_stories_by_name(partition, names))
+
+def iter_stored_stories(partition):
+    """Lazily yield every story, newest first, without holding the whole corpus in memory"""
+    if partition.store.maintains_index:
+        # The store's own index scans newest first in one pass
+        for _, story_data, _ in partition.store.scan():
+            yield story_data
+        return
+    # The index gives the order; stories are then fetched a bounded window at a time
+    yield from iter_stories_by_name(partition, [row['name'] for row in load_story_summaries(partition)])
+
+def scan_stored_summaries(partition):
+    """Summary rows for every story in a partition (from GCS listing metadata where available)"""
+    return partition.store.scan_summaries(partition.country_mapper)
+
+def rebuild_story_index(partition):
+    """Rebuild a partition's story index from a full scan of its storage"""
+    return partition.index.rebuild_from_rows(scan_stored_summaries(partition))
+
+# Search index updates rewrite a document that grows with the corpus, so they run on a background
+# thread (batched per partition) instead of inside save/delete requests and their save_lock
+search_indexer = SearchIndexer()
+search_indexer.start()
+
+def search_index_stories(partition, entries):
+    """Queue saved (name, story) pairs for the partition's search index (skipped there until the first search builds it)"""
+    search_indexer.add(partition.search, entries)
+
+def rebuild_search_index(partition):
+    """Rebuild a partition's search index from a full scan of its storage"""
+    return partition.search.rebuild(scan_stored_stories(partition))
+
+def index_saved_story(partition, name, story_data, size):
+    """Add a saved story to the partition's index without failing the save"""
+    try:
+        partition.index.add(name, story_data, size)
+    except Exception as e:
+        print(f"⚠️ Failed to update story index for {name}: {e}")
+
+def write_story(partition, filename, story_data):
+    """Write one story to a partition's active storage without indexing it; returns (name, size)"""
+    return partition.store.write(filename, story_data)
+
+def index_written_stories(partition, entries):
+    """Index a batch of (name, story, size) written by write_story (SQLite rows index themselves)"""
+    if not partition.store.maintains_index:
+        try:
+            partition.index.add_many(entries)
+        except Exception as e:
+            print(f"⚠️ Failed to index {len(entries)} imported stories: {e}")
+    search_index_stories(partition, [(name, story) for name, story, _ in entries])
+    on_stories_changed(partition)
+
+def read_story_summaries(partition):
+    """Read story summary rows (newest first) from the index in a single read"""
+    rows = partition.store.rows()
+    if rows is None:
+        # First run against this partition: build the index once
+        try:
+            rebuild_story_index(partition)
+            rows = partition.index.rows() or []
+        except Exception as e:
+            print(f"⚠️ Could not build story index, summarizing from a full scan: {e}")
+            rows = list(scan_stored_summaries(partition))
+            rows.sort(key=lambda row: (row['timestamp'], row['story_id']), reverse=True)
+    return [row for row in rows if has_valid_country(row)]
+
+def read_country_aggregates(partition):
+    """Per-country aggregates kept up to date by every save/delete (built from summaries on first run)"""
+    aggregates = partition.store.country_aggregates()
+    if aggregates is None:
+        aggregates = build_aggregates(read_story_summaries(partition))
+    return aggregates
+
+# === 🧠 SHARED STORY CACHE ===
+# One cache per partition, keyed on that partition's storage generation
+def load_story_summaries(partition):
+    """Story summary rows (newest first) as compact StoryRecords, shared across requests until the partition changes"""
+    return partition.cache.get('summaries', lambda: [StoryRecord(row) for row in read_story_summaries(partition)])
+
+def load_story_entries(partition):
+    """Every full story as (name, story), newest first, shared across requests until the partition changes"""
+    def read_story_entries():
+        entries = sorted(scan_stored_stories(partition), key=lambda entry: story_sort_key(entry[0]), reverse=True)
+        if partition.mirror is not None:
+            # The mirror already holds compacted stories; share them rather than copy
+            return [(name, story_data) for name, story_data, _ in entries]
+        return [(name, compact_story(story_data)) for name, story_data, _ in entries]
+    return partition.cache.get('story_entries', read_story_entries)
+
+def load_all_stories(partition):
+    """Every full story (newest first), shared across requests until the partition changes"""
+    return partition.cache.get('stories', lambda: [story_data for _, story_data in load_story_entries(partition)])
+
+def load_stories_by_id(partition):
+    """Every full story by story id, from the same cached scan as load_all_stories"""
+    def index_stories():
+        parsed = ((parse_story_name(name), story_data) for name, story_data in load_story_entries(partition))
+        return {name_parts[0]: story_data for name_parts, story_data in parsed if name_parts}
+    return partition.cache.get('stories_by_id', index_stories)
+
+def load_country_aggregates(partition):
+    """Per-country aggregates, shared across requests until the partition changes"""
+    return partition.cache.get('countries', lambda: read_country_aggregates(partition))
+
+def load_story_count(partition):
+    """Total number of stored stories (including ones whose country has no ISO code), shared until the partition changes"""
+    def read_story_count():
+        count = partition.store.story_count()
+        if count is None:
+            # The first listing builds the index; if even that failed, count what the listing could summarize
+            summaries = load_story_summaries(partition)
+            count = partition.store.story_count()
+            return count if count is not None else len(summaries)
+        return count
+    return partition.cache.get('story_count', read_story_count)
+
+def load_story_hashes(partition):
+    """Summary rows by content hash and story id, shared across requests until the partition changes"""
+    return partition.cache.get('hashes', lambda: build_hash_index(load_story_summaries(partition)))
+
+def find_saved_story(partition, story_id, content_hash):
+    """(name, content hash) of an already saved (or still queued) story with this id or content, None if there is none
+
+    An id match wins over a content match."""
+    keys = [key for key in (story_id, content_hash) if key]
+    for key in keys:
+        if key in partition.pending_saves:
+            return partition.pending_saves[key]
+    if partition.store.maintains_index:
+        # Indexed lookup in the store (a cached hash index would be rebuilt after every save)
+        row = partition.store.find(story_id, content_hash)
+        return (row['name'], row.get('content_hash')) if row else None
+    hashes = load_story_hashes(partition)
+    for key in keys:
+        if key in hashes:
+            return hashes[key]['name'], hashes[key].get('content_hash')
+    return None
+
+def resolve_story_names(partition, story_ids):
+    """Blob/file names of stories by id through the index; ids without a listed story are left out"""
+    if partition.store.maintains_index:
+        return partition.store.names_for_ids(story_ids)
+    names = partition.cache.get('names', lambda: {row['story_id']: row['name'] for row in load_story_summaries(partition)})
+    return {story_id: names[story_id] for story_id in story_ids if story_id in names}
+
+def fetch_stories_by_id(partition, story_ids, fields=None):
+    """Stories (each with its story_id) in the given order, fetched in parallel, plus the ids not found"""
+    names = resolve_story_names(partition, story_ids)
+    stories = {}
+    for name, story_data, error in partition.store.read_many(list(names.values())):
+        if error:
+            print(f"⚠️ Skipping unreadable story {name}: {error}")
+            continue
+        stories[name] = story_data
+    found, missing = [], []
+    for story_id in story_ids:
+        story_data = stories.get(names.get(story_id))
+        if story_data is None:
+            missing.append(story_id)
+        else:
+            found.append(project_story({**story_data, "story_id": story_id}, fields + ['story_id'] if fields else None))
+    return found, missing
+
+def stories_for_sync(partition, story_ids, summary_only, fields=None):
+    """Summary rows or full stories (each with its story_id) for delta sync, plus the ids no longer listed"""
+    if not summary_only:
+        return fetch_stories_by_id(partition, story_ids, fields)
+    rows = {row['story_id']: row for row in load_story_summaries(partition)}
+    found = [project_story(rows[story_id], fields + ['story_id'] if fields else None) for story_id in story_ids if story_id in rows]
+    return found, [story_id for story_id in story_ids if story_id not in rows]
+
+def snapshot_stories(partition, summary_only, fields=None):
+    """Every listed story (each with its story_id), newest first, for a delta sync reset"""
+    story_ids = [row['story_id'] for row in load_story_summaries(partition)]
+    if summary_only:
+        return stories_for_sync(partition, story_ids, summary_only, fields)[0]
+    # The cached full scan (kept current by the GCS mirror), not one download per story
+    stories = load_stories_by_id(partition)
+    return [project_story({**stories[story_id], "story_id": story_id}, fields + ['story_id'] if fields else None)
+            for story_id in story_ids if story_id in stories]
+
+def resolve_story_changes(partition, changes, summary_only, fields=None):
+    """The last change to each story, in the order they happened: saves with their story, otherwise delete tombstones"""
+    latest = {}
+    for change in changes:
+        latest.pop(change['story_id'], None)
+        latest[change['story_id']] = change
+    saved = [story_id for story_id, change in latest.items() if change['op'] == 'save']
+    stories, _ = stories_for_sync(partition, saved, summary_only, fields)
+    stories = {story['story_id']: story for story in stories}
+    results = []
+    for story_id, change in latest.items():
+        if story_id in stories:
+            results.append({"seq": change['seq'], "op": "save", "story_id": story_id, "story": stories[story_id]})
+        else:
+            # Deleted, or saved but not listed (no valid country): either way not in the client's list
+            results.append({"seq": change['seq'], "op": "delete", "story_id": story_id})
+    return results
+
+def story_sequence(partition):
+    """Current change sequence of a partition for write responses (None if it can't be read)"""
+    try:
+        return partition.store.version()
+    except Exception as e:
+        print(f"⚠️ Could not read story sequence: {e}")
+        return None
+
+def query_story_summaries(partition, filters):
+    """Summary rows (newest first) matching parsed filters; only these rows' stories ever get loaded"""
+    if not filters:
+        return load_story_summaries(partition)
+    if partition.store.maintains_index:
+        # Pushed down into the store's own index (on SQLite, the indexed ISO code and timestamp columns)
+        return [row for row in partition.store.rows(filters) if has_valid_country(row)]
+    if 'iso_code' in filters and filters['iso_code'] not in load_country_aggregates(partition):
+        # Never visited: the per-country aggregates answer without touching any rows
+        return []
+    return filter_rows(load_story_summaries(partition), filters)
+
+def on_stories_changed(partition):
+    """Hook run after this process saves or deletes stories in a partition"""
+    partition.cache.invalidate()
+    # Open event streams of this partition wake up and send the new changes
+    story_events.notify(partition.user_id)
+
+# === 📡 STORY EVENTS ===
+# GET /events streams story-added, story-deleted and map-version-changed as Server-Sent Events.
+# Streams sleep until this process changes the partition; changes made by other instances are
+# picked up by a version check on each heartbeat. Streams end after a while (serverless request limits)
+# and the browser reconnects with Last-Event-ID, so nothing is missed in between.
+# Every open stream holds a request thread, so at most STORY_EVENTS_MAX_STREAMS run at once per instance
+# (keep it well below the server's THREADS, see the Dockerfile); the client only subscribes while
+# the stories or map page is on screen.
+STORY_EVENTS_HEARTBEAT_SECONDS = float(os.environ.get("STORY_EVENTS_HEARTBEAT_SECONDS", "25"))
+STORY_EVENTS_MAX_SECONDS = float(os.environ.get("STORY_EVENTS_MAX_SECONDS", "300"))
+STORY_EVENTS_MAX_STREAMS = int(os.environ.get("STORY_EVENTS_MAX_STREAMS", "16"))
+STORY_EVENTS_RETRY_MS = 3000
+story_events = StoryEvents()
+story_stream_slots = threading.BoundedSemaphore(STORY_EVENTS_MAX_STREAMS)
+
+# EventSource can't send headers, so streams are opened with a short-lived signed token in the URL
+# instead of the session token. Set STREAM_TOKEN_SECRET when several instances serve the same app;
+# otherwise a token only opens streams on the instance that issued it.
+STREAM_TOKEN_SECONDS = 120
+STREAM_TOKEN_SECRET = (os.environ.get("STREAM_TOKEN_SECRET") or "").encode('utf-8') or secrets.token_bytes(32)
+
+def get_stream_token(partition):
+    """Short-lived token that opens the caller's /events stream"""
+    response = make_response(json.dumps({
+        "stream_token": issue_stream_token(STREAM_TOKEN_SECRET, partition.user_id, STREAM_TOKEN_SECONDS),
+        "expires_in": STREAM_TOKEN_SECONDS,
+        "success": True
+    }))
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+def event_stream_partition(request):
+    """Partition an /events request may follow: a stream token, a bearer session, or the shared one; None if invalid"""
+    stream_token = request.args.get('stream_token')
+    if stream_token:
+        try:
+            return story_partitions.get(verify_stream_token(STREAM_TOKEN_SECRET, stream_token))
+        except ValueError:
+            return None
+    return story_partition_for(bearer_token(request))
+
+def story_change_events(partition, sequence):
+    """SSE events for the changes after sequence; returns (events, new sequence)"""
+    version = partition.store.version()
+    if version == sequence:
+        return [], sequence
+    delta = partition.store.changes_since(sequence)
+    if delta is None or sequence > delta[1]:
+        # Too far behind (or a reset store): the client reloads everything
+        return [sse_event("reset", {"sequence": version}, version)], version
+    changes, current = delta
+    events = []
+    for change in resolve_story_changes(partition, changes, summary_only=True):
+        if change['op'] == 'save':
+            events.append(sse_event("story-added", {"story_id": change['story_id'], "story": change['story'], "seq": change['seq']}))
+        else:
+            events.append(sse_event("story-deleted", {"story_id": change['story_id'], "seq": change['seq']}))
+    # Map responses are versioned by the same sequence; the id lets a reconnect resume after this batch
+    events.append(sse_event("map-version-changed", {"version": current}, current))
+    return events, current
+
+def stream_story_events(partition, since=None):
+    """Server-Sent Events for one partition until STORY_EVENTS_MAX_SECONDS pass"""
+    def generate():
+        if since is None:
+            # Build the index first, so the starting sequence isn't older than its change log
+            load_story_summaries(partition)
+        sequence = since if since is not None else partition.store.version()
+        yield f"retry: {STORY_EVENTS_RETRY_MS}\n\n"
+        yield sse_event("ready", {"sequence": sequence}, sequence)
+        deadline = time.monotonic() + STORY_EVENTS_MAX_SECONDS
+        tick = story_events.tick(partition.user_id)
+        while True:
+            try:
+                events, sequence = story_change_events(partition, sequence)
+                yield from events
+            except Exception as e:
+                print(f"⚠️ Error reading story changes for events: {e}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            woken = story_events.wait(partition.user_id, tick, min(STORY_EVENTS_HEARTBEAT_SECONDS, remaining))
+            if woken == tick:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+            tick = woken
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Don't let nginx-style proxies buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# === 📮 WRITE-BEHIND UPLOADS ===
+# Opt-in: save_story appends to an fsync'd local journal and answers straight away;
+# a background thread uploads to GCS in batches (with retries) and replays the journal on restart.
+# Saved stories show up in listings once their upload has been indexed.
+STORY_WRITE_BEHIND = os.environ.get("STORY_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+LOCAL_SPOOL_DIR = os.path.join(os.path.dirname(LOCAL_STORAGE_DIR), "upload_spool")
+
+def upload_spooled_story(entry):
+    """Upload one spooled story blob exactly as save_story would have"""
+    partition = story_partitions.get(entry['user_id'])
+    partition.store.upload(entry['name'], entry['content'], entry['content_encoding'], entry['metadata'])
+
+def index_uploaded_stories(entries):
+    """Index a batch of uploaded stories, one manifest write per partition"""
+    by_partition = {}
+    for entry in entries:
+        by_partition.setdefault(entry['user_id'], []).append(entry)
+    for user_id, partition_entries in by_partition.items():
+        partition = story_partitions.get(user_id)
+        stories = [(entry['name'], decode_story_bytes(entry['content']), len(entry['content']))
+                   for entry in partition_entries]
+        try:
+            partition.index.add_many(stories)
+        except Exception as e:
+            print(f"⚠️ Failed to index {len(partition_entries)} uploaded stories: {e}")
+        search_index_stories(partition, [(name, story) for name, story, _ in stories])
+        on_stories_changed(partition)
+        for name, story, _ in stories:
+            # Listed now, so duplicate checks find them through the index
+            partition.pending_saves.pop(parse_story_name(name)[0], None)
+            partition.pending_saves.pop(story_content_hash(story), None)
+
+upload_spool = None
+if STORY_WRITE_BEHIND and use_cloud_storage and storage_client:
+    upload_spool = UploadSpool(LOCAL_SPOOL_DIR, upload_spooled_story, index_uploaded_stories)
+    upload_spool.start()
+    print(f"📮 Write-behind story uploads spooled in {LOCAL_SPOOL_DIR}")
+
+# === 🏷️ CONDITIONAL RESPONSES ===
+def versioned_response(request, partition, view, params, build):
+    """ETag a read-only response with the partition's store version; 304 Not Modified if the client already has it"""
+    try:
+        # Different options (and partitions) give different bodies, so they get different tags
+        variant = hashlib.sha1(json.dumps([partition.user_id, params], sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+        version = partition.store.version()
+    except Exception as e:
+        print(f"⚠️ Could not read store version, skipping ETag: {e}")
+        return build()
+
+    if not version:
+        # No index yet (or it could not be written), so the version doesn't change with the stories:
+        # tag the body itself instead
+        response = build()
+        if not is_cacheable(response):
+            return response
+        etag = f"{view}-c{hashlib.sha1(response.get_data()).hexdigest()[:16]}-{variant}"
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+    else:
+        etag = f"{view}-v{version}-{variant}"
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            # Version was read first: a write during build() only makes the tag look older
+            response = build()
+            if not is_cacheable(response):
+                return response
+    response.set_etag(etag)
+    # Let browsers keep the body but always revalidate it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def is_cacheable(response):
+    """Whether a built response may be tagged (a complete 200 body the handler didn't mark no-store)"""
+    return response.status_code == 200 and not response.is_streamed and response.headers.get('Cache-Control') != 'no-store'
+
 # === 🔐 USER DATABASE SETUP ===
 DB_PATH = "wanderlog_users.db"
 
@@ -470,7 +961,8 @@ def handle_get_profile(request_json):
 def add_cors_headers(response):
     response.headers['Access-Control-Allow-Origin'] = '*'
     response.headers['Access-Control-Allow-Methods'] = 'POST, OPTIONS, GET'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, If-None-Match, Authorization'
+    response.headers['Access-Control-Expose-Headers'] = 'ETag'
     return response
 
 # Static file serving route
@@ -516,43 +1008,68 @@ def wanderlog_ai(request):
         if request.path.rstrip('/') == '/stories':
             try:
                 # For GET requests, we don't need to parse JSON
-                # Just return all stories
-                stories = []
-                if (use_cloud_storage and storage_client):
+                # Just return the caller's stories (session token as a bearer token)
+                partition = story_partition_for(bearer_token(request))
+                if partition is None:
+                    response = make_response(json.dumps({"stories": [], "count": 0, "error": "Invalid session"}), 401)
+                    return add_cors_headers(response)
+                fields = parse_fields(request.args.get('fields'))
+                summary_only = request.args.get('view') == 'summary' or is_summary_projection(fields)
+                if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+                    stories = load_story_summaries(partition) if summary_only else iter_stored_stories(partition)
+                    return add_cors_headers(stream_stories_response(stories, fields))
+                def build_response():
+                    stories = []
+                    load_error = None
                     try:
-                        bucket = storage_client.bucket(STORIES_BUCKET)
-                        blobs = bucket.list_blobs(prefix='stories/')
-                        for blob in blobs:
-                            if blob.name.endswith('.json'):
-                                content = blob.download_as_text()
-                                story_data = json.loads(content)
-                                stories.append(story_data)
+                        if summary_only:
+                            stories = load_story_summaries(partition)
+                        else:
+                            stories = load_all_stories(partition)
                     except Exception as e:
                         print(f"Error retrieving stories: {e}")
-                else:
-                    # Local storage
-                    try:
-                        for filename in os.listdir(LOCAL_STORAGE_DIR):
-                            if filename.endswith('.json'):
-                                filepath = os.path.join(LOCAL_STORAGE_DIR, filename)
-                                with open(filepath, 'r') as f:
-                                    story_data = json.load(f)
-                                    stories.append(story_data)
-                    except Exception as e:
-                        print(f"Error reading local stories: {e}")
-                # Filter out stories with missing/empty/undefined country
-                filtered_stories = [s for s in stories if s.get('country') and str(s.get('country')).strip().lower() not in ('', 'undefined', 'none', 'null')]
-                response_data = {
-                    "stories": filtered_stories,
-                    "count": len(filtered_stories),
-                    "success": True
-                }
-                response = make_response(json.dumps(response_data), 200, {'Content-Type': 'application/json'})
-                return add_cors_headers(response)
+                        load_error = e
+                    # Filter out stories with missing/empty/undefined country
+                    filtered_stories = [s for s in stories if s.get('country') and str(s.get('country')).strip().lower() not in ('', 'undefined', 'none', 'null')]
+                    filtered_stories = [project_story(s, fields) for s in filtered_stories]
+                    response_data = {
+                        "stories": filtered_stories,
+                        "count": len(filtered_stories),
+                        "success": True
+                    }
+                    response = make_response(json.dumps(response_data), 200, {'Content-Type': 'application/json'})
+                    if load_error:
+                        # Don't let clients revalidate against an empty fallback listing
+                        response.headers['Cache-Control'] = 'no-store'
+                    return response
+                return add_cors_headers(versioned_response(request, partition, "stories", request.args.to_dict(), build_response))
             except Exception as e:
                 print(f"Error handling GET /stories: {str(e)}")
                 response = make_response(json.dumps({"stories": [], "count": 0, "error": str(e)}), 500)
                 return add_cors_headers(response)
+        elif request.path.rstrip('/') == '/events':
+            partition = event_stream_partition(request)
+            if partition is None:
+                response = make_response(json.dumps({"error": "Invalid or expired stream token"}), 401)
+                return add_cors_headers(response)
+            since = request.headers.get('Last-Event-ID') or request.args.get('since')
+            try:
+                since = int(since) if since else None
+            except ValueError:
+                response = make_response(json.dumps({"error": "since must be a sequence number"}), 400)
+                return add_cors_headers(response)
+            if not story_stream_slots.acquire(blocking=False):
+                # Leave the remaining threads to ordinary API calls; the client tries again later
+                response = make_response(json.dumps({"error": "Too many open event streams"}), 503)
+                response.headers['Retry-After'] = '30'
+                return add_cors_headers(response)
+            response = stream_story_events(partition, since)
+            # Runs however the stream ends (finished, client gone, or never started)
+            response.call_on_close(story_stream_slots.release)
+            return add_cors_headers(response)
+        elif request.path.startswith('/photos/'):
+            # Raw photo bytes for <img src="{API}/photos/<id>">
+            return add_cors_headers(get_photo({"photo_id": request.path[len('/photos/'):]}))
         elif request.path == '/' or request.path == '':
             # Handle root path GET requests (browser navigation)
             response = make_response(json.dumps({"message": "WanderLog AI API", "status": "running"}), 200)
@@ -567,6 +1084,14 @@ def wanderlog_ai(request):
         response = make_response(json.dumps({"error": "POST method required for API actions"}), 405)
         return add_cors_headers(response)
 
+    # NDJSON bulk import: the body is the story stream, so the session comes from the Authorization header
+    if request.mimetype == NDJSON_MIMETYPE:
+        partition = story_partition_for(bearer_token(request))
+        if partition is None:
+            response = make_response(json.dumps({"success": False, "error": "Invalid session"}), 401)
+            return add_cors_headers(response)
+        return add_cors_headers(import_stories(request, partition))
+
     # Handle POST requests with JSON body
     try:
         request_json = request.get_json()
@@ -574,6 +1099,12 @@ def wanderlog_ai(request):
             response = make_response(json.dumps({"error": "Invalid JSON body"}), 400)
             return add_cors_headers(response)
         action = request_json.get("action", "")
+        partition = None
+        if action in PARTITIONED_ACTIONS:
+            partition = story_partition_for(request_json.get("session_token"))
+            if partition is None:
+                response = make_response(json.dumps({"success": False, "error": "Invalid session"}), 401)
+                return add_cors_headers(response)
         if action == "suggest_cities":
             return add_cors_headers(suggest_cities(request_json))
         elif action == "generate_memory_prompts":
@@ -583,9 +1114,28 @@ def wanderlog_ai(request):
         elif action == "regenerate_style":
             return add_cors_headers(regenerate_style(request_json))
         elif action == "save_story":
-            return add_cors_headers(save_story(request_json))
+            return add_cors_headers(save_story(request_json, partition))
         elif action == "get_stories":
-            return add_cors_headers(get_stories(request_json))
+            return add_cors_headers(versioned_response(request, partition, "stories", request_json, lambda: get_stories(request_json, partition)))
+        elif action == "get_story":
+            return add_cors_headers(versioned_response(request, partition, "story", request_json, lambda: get_story(request_json, partition)))
+        elif action == "get_stories_by_ids":
+            return add_cors_headers(versioned_response(request, partition, "stories-by-id", request_json, lambda: get_stories_by_ids(request_json, partition)))
+        elif action == "get_stories_since":
+            return add_cors_headers(versioned_response(request, partition, "stories-since", request_json, lambda: get_stories_since(request_json, partition)))
+        elif action == "get_stream_token":
+            return add_cors_headers(get_stream_token(partition))
+        elif action == "search_stories":
+            # The search index is updated in the background, so its own generation is part of the tag
+            search_params = {**request_json, "search_generation": partition.search.generation()}
+            return add_cors_headers(versioned_response(request, partition, "search", search_params, lambda: search_stories(request_json, partition)))
+        elif action == "get_photo":
+            return add_cors_headers(get_photo(request_json))
+        elif action == "export_stories":
+            return add_cors_headers(export_stories(request_json, partition))
+        elif action == "import_stories":
+            response = make_response(json.dumps({"error": f"import_stories expects a {NDJSON_MIMETYPE} body"}), 415)
+            return add_cors_headers(response)
         # === 🔐 AUTHENTICATION ENDPOINTS ===
         elif action == "register":
             return add_cors_headers(handle_register(request_json))
@@ -599,21 +1149,18 @@ def wanderlog_ai(request):
             return add_cors_headers(handle_get_profile(request_json))
         # === 🗺️ MAP ENDPOINTS ===
         elif action == "get_highlighted_map":
-            return add_cors_headers(get_highlighted_map(request_json))
+            return add_cors_headers(versioned_response(request, partition, "map", request_json, lambda: get_highlighted_map(request_json, partition)))
         elif action == "get_map_statistics":
-            return add_cors_headers(get_map_statistics(request_json))
+            return add_cors_headers(versioned_response(request, partition, "map-stats", request_json, lambda: get_map_statistics(request_json, partition)))
         elif action == "export_map_data":
-            return add_cors_headers(export_map_data(request_json))
+            return add_cors_headers(export_map_data(request_json, partition))
         elif action == "get_country_details":
-            return add_cors_headers(get_country_details(request_json))
+            return add_cors_headers(get_country_details(request_json, partition))
         elif action == "delete_stories_by_country":
-            return add_cors_headers(delete_stories_by_country(request_json))
+            return add_cors_headers(delete_stories_by_country(request_json, partition))
         elif action == "get_visited_countries":
-            # Get stories from storage
-            stories_response = get_stories({})
-            stories_data = json.loads(stories_response.get_data(as_text=True))
-            stories = stories_data.get("stories", [])
-            visited_countries = map_integration.get_visited_countries(stories)
+            # Keys of the per-country aggregates, no story rows read
+            visited_countries = sorted(load_country_aggregates(partition))
             response = make_response(json.dumps({"visited_countries": visited_countries}))
             response.headers['Content-Type'] = 'application/json'
             return add_cors_headers(response)
@@ -882,26 +1429,71 @@ Keep the same core content but change the writing style to match the requested t
     response = make_response(json.dumps({"narrative": new_narrative}))
     return response
 
-def save_story(request_json):
+def save_story(request_json, partition):
     """Save a completed travel story"""
     story_data = request_json.get("story_data", {})
     
-    # Generate unique ID for the story
-    story_id = str(uuid.uuid4())
+    # Store inline photos as content-addressed blobs; the story keeps photos/<id> references
+    story_data = photo_store.extract_photos(story_data)
+    if partition.user_id:
+        # Attach the authenticated owner; the story is stored in their partition
+        story_data["user_id"] = partition.user_id
+    
+    # A retried save carries the same idempotency key, so it maps onto the same story ID
+    idempotency_key = request_json.get("idempotency_key")
+    story_id = idempotent_story_id(idempotency_key) if idempotency_key else str(uuid.uuid4())
+    content_hash = story_content_hash(story_data)
+    
+    with partition.save_lock:
+        # Double-clicks and retries return the story already saved instead of uploading it again
+        existing = find_saved_story(partition, story_id if idempotency_key else None, content_hash)
+        if existing:
+            existing, existing_hash = existing
+            if parse_story_name(existing)[0] == story_id and existing_hash not in (None, content_hash):
+                # The key was already used for a different story: saving it as a duplicate would drop the edits
+                return make_response(json.dumps({
+                    "error": "Idempotency key already used for a different story",
+                    "story_id": story_id
+                }), 409)
+            return make_response(json.dumps({
+                "story_id": parse_story_name(existing)[0],
+                "saved": True,
+                "duplicate": True,
+                "url": partition.store.url(existing),
+                "sequence": story_sequence(partition)
+            }))
+        return save_new_story(partition, story_id, story_data, content_hash)
+
+def save_new_story(partition, story_id, story_data, content_hash):
+    """Write a story that isn't stored yet (cloud first, local fallback) and index it"""
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     
+    filename = f"{story_id}_{timestamp}.json"
+    
     # Try cloud storage first, then fallback to local
     cloud_error = None
-    if (use_cloud_storage and storage_client):
+    if partition.fallback_store:
         try:
-            # Save to Google Cloud Storage
-            bucket = storage_client.bucket(STORIES_BUCKET)
-            blob = bucket.blob(f"stories/{story_id}_{timestamp}.json")
-            blob.upload_from_string(json.dumps(story_data), content_type="application/json")
+            if upload_spool:
+                # Acknowledge once the story is on local disk; the spool uploads and indexes it
+                name, content, content_encoding, metadata = partition.store.encode(filename, story_data)
+                upload_spool.enqueue(name, content, content_encoding, metadata, partition.user_id)
+                partition.pending_saves[story_id] = partition.pending_saves[content_hash] = (name, content_hash)
+                return make_response(json.dumps({
+                    "story_id": story_id,
+                    "saved": True,
+                    "queued": True,
+                    "url": partition.store.url(name)
+                }))
+            name, size = partition.store.write(filename, story_data)
+            index_saved_story(partition, name, story_data, size)
+            search_index_stories(partition, [(name, story_data)])
+            on_stories_changed(partition)
             return make_response(json.dumps({
                 "story_id": story_id,
                 "saved": True,
-                "url": f"https://storage.googleapis.com/{STORIES_BUCKET}/{blob.name}"
+                "url": partition.store.url(name),
+                "sequence": story_sequence(partition)
             }))
         except Exception as e:
             print(f"Error saving to cloud storage: {str(e)}")
@@ -909,15 +1501,20 @@ def save_story(request_json):
             # Fallback to local storage
     # Try local storage
     try:
-        filename = f"{story_id}_{timestamp}.json"
-        filepath = os.path.join(LOCAL_STORAGE_DIR, filename)
-        with open(filepath, 'w') as f:
-            json.dump(story_data, f, indent=2)
+        store = partition.fallback_store or partition.store
+        name, size = store.write(filename, story_data)
+        # The index only tracks the storage that listings read from
+        if store is partition.store:
+            if not store.maintains_index:
+                index_saved_story(partition, name, story_data, size)
+            search_index_stories(partition, [(name, story_data)])
+        on_stories_changed(partition)
         return make_response(json.dumps({
             "story_id": story_id,
             "saved": True,
-            "url": f"local://{filepath}",
-            "cloud_error": cloud_error if cloud_error else None
+            "url": store.url(name),
+            "cloud_error": cloud_error if cloud_error else None,
+            "sequence": story_sequence(partition)
         }))
     except Exception as e:
         print(f"Error saving story locally: {str(e)}")
@@ -927,39 +1524,73 @@ def save_story(request_json):
             "cloud_error": cloud_error if cloud_error else None
         }), 500)
 
-def get_stories(request_json):
-    """Retrieve all saved travel stories"""
+def stream_stories_response(stories, fields=None):
+    """Stream a get_stories JSON document story by story instead of building it in memory"""
+    def generate():
+        count = 0
+        yield '{"stories": ['
+        try:
+            for story in stories:
+                if not has_valid_country(story):
+                    continue
+                yield (', ' if count else '') + json.dumps(project_story(story, fields))
+                count += 1
+            yield f'], "count": {count}, "success": true}}'
+        except Exception as e:
+            # Headers are already sent, so report the failure inside the document
+            print(f"Error streaming stories: {str(e)}")
+            yield f'], "count": {count}, "error": {json.dumps(str(e))}, "success": false}}'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def get_stories(request_json, partition):
+    """Retrieve saved travel stories, newest first (paged with limit/cursor, summary rows with view/fields)"""
     try:
-        stories = []
+        limit = request_json.get("limit")
+        cursor = request_json.get("cursor")
+        fields = parse_fields(request_json.get("fields"))
+        # Summary views are answered from the story index without downloading any story blobs
+        summary_only = request_json.get("view") == "summary" or is_summary_projection(fields)
+        next_cursor = None
+        try:
+            # country / iso_code, visit_date {from, to} and city filters, applied to index rows before any story is read
+            filters = parse_filters(request_json.get("filters"), partition.country_mapper)
+        except ValueError as e:
+            response = make_response(json.dumps({"error": str(e), "success": False}), 400)
+            response.headers['Content-Type'] = 'application/json'
+            return response
         
-        if (use_cloud_storage and storage_client):
-            # Get from Google Cloud Storage
-            bucket = storage_client.bucket(STORIES_BUCKET)
-            blobs = bucket.list_blobs(prefix="stories/")
-            
-            for blob in blobs:
-                if blob.name.endswith('.json'):
-                    content = blob.download_as_text()
-                    story_data = json.loads(content)
-                    stories.append(story_data)
-        else:
-            # Get from local storage
-            if os.path.exists(LOCAL_STORAGE_DIR):
-                for filename in os.listdir(LOCAL_STORAGE_DIR):
-                    if filename.endswith('.json'):
-                        filepath = os.path.join(LOCAL_STORAGE_DIR, filename)
-                        with open(filepath, 'r') as f:
-                            story_data = json.load(f)
-                            stories.append(story_data)
+        if request_json.get("stream") and limit is None and not cursor:
+            # Flat memory and early first byte for very large listings
+            if filters:
+                rows = query_story_summaries(partition, filters)
+                return stream_stories_response(rows if summary_only else iter_stories_by_name(partition, [row['name'] for row in rows]), fields)
+            return stream_stories_response(load_story_summaries(partition) if summary_only else iter_stored_stories(partition), fields)
         
-        # Sort by timestamp (newest first)
-        stories.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+        if limit is not None or cursor:
+            # Keyset pagination over the index, then fetch only this page's stories
+            try:
+                limit = min(int(limit if limit is not None else DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+                page, next_cursor = paginate_rows(query_story_summaries(partition, filters), limit, cursor)
+            except (TypeError, ValueError) as e:
+                response = make_response(json.dumps({"error": str(e), "success": False}), 400)
+                response.headers['Content-Type'] = 'application/json'
+                return response
+            stories = page if summary_only else load_stories_by_name(partition, [row['name'] for row in page])
+        elif summary_only:
+            stories = query_story_summaries(partition, filters)
+        elif filters:
+            # Only the matching stories are fetched
+            stories = load_stories_by_name(partition, [row['name'] for row in query_story_summaries(partition, filters)])
+        else:
+            stories = load_all_stories(partition)
 
         # Filter out stories with missing/empty/undefined country
         filtered_stories = [s for s in stories if s.get('country') and str(s.get('country')).strip().lower() not in ('', 'undefined', 'none', 'null')]
+        filtered_stories = [project_story(s, fields) for s in filtered_stories]
         response = make_response(json.dumps({
             "stories": filtered_stories,
-            "count": len(filtered_stories)
+            "count": len(filtered_stories),
+            "next_cursor": next_cursor
         }))
         return response
         
@@ -972,18 +1603,210 @@ def get_stories(request_json):
         }))
         return response 
 
+def get_story(request_json, partition):
+    """Fetch one story by id: an index lookup and a single object read"""
+    try:
+        story_id = request_json.get("story_id")
+        if not story_id or not isinstance(story_id, str):
+            response = make_response(json.dumps({"error": "story_id is required", "success": False}), 400)
+            response.headers['Content-Type'] = 'application/json'
+            return response
+
+        stories, _ = fetch_stories_by_id(partition, [story_id], parse_fields(request_json.get("fields")))
+        if not stories:
+            response = make_response(json.dumps({"error": "Story not found", "success": False}), 404)
+        else:
+            response = make_response(json.dumps({"story": stories[0], "success": True}))
+        response.headers['Content-Type'] = 'application/json'
+        return response
+    except Exception as e:
+        print(f"Error getting story: {str(e)}")
+        response = make_response(json.dumps({"error": str(e), "success": False}), 500)
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+def get_stories_by_ids(request_json, partition):
+    """Fetch several stories by id, in the requested order; ids with no story come back in missing"""
+    try:
+        story_ids = request_json.get("story_ids")
+        if not isinstance(story_ids, list) or not story_ids or not all(isinstance(story_id, str) for story_id in story_ids):
+            error = "story_ids must be a non-empty list of story ids"
+        elif len(story_ids) > MAX_STORY_IDS:
+            error = f"At most {MAX_STORY_IDS} story_ids per request"
+        else:
+            error = None
+        if error:
+            response = make_response(json.dumps({"error": error, "success": False}), 400)
+            response.headers['Content-Type'] = 'application/json'
+            return response
+
+        # Repeated ids are fetched (and returned) once
+        stories, missing = fetch_stories_by_id(partition, list(dict.fromkeys(story_ids)), parse_fields(request_json.get("fields")))
+        response = make_response(json.dumps({
+            "stories": stories,
+            "missing": missing,
+            "count": len(stories),
+            "success": True
+        }))
+        response.headers['Content-Type'] = 'application/json'
+        return response
+    except Exception as e:
+        print(f"Error getting stories by id: {str(e)}")
+        response = make_response(json.dumps({"stories": [], "count": 0, "error": str(e), "success": False}), 500)
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+def get_stories_since(request_json, partition):
+    """Delta sync: saves and delete tombstones after a client-held sequence (a full snapshot without one, or when too far behind)"""
+    try:
+        since = request_json.get("since")
+        try:
+            since = None if since is None else int(since)
+            if since is not None and since < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            response = make_response(json.dumps({"error": "since must be a non-negative sequence number", "success": False}), 400)
+            response.headers['Content-Type'] = 'application/json'
+            return response
+        summary_only = request_json.get("view") == "summary"
+        fields = parse_fields(request_json.get("fields"))
+
+        delta = partition.store.changes_since(since) if since is not None else None
+        if delta is not None and since > delta[1]:
+            # A sequence from another store (or a reset one): start over
+            delta = None
+
+        if delta is None:
+            # Build the index first, so the sequence isn't older than the snapshot it comes with
+            load_story_summaries(partition)
+            sequence = partition.store.version()
+            stories = snapshot_stories(partition, summary_only, fields)
+            body = {"reset": True, "stories": stories, "count": len(stories), "sequence": sequence, "success": True}
+        else:
+            changes, sequence = delta
+            results = resolve_story_changes(partition, changes, summary_only, fields)
+            body = {"reset": False, "changes": results, "count": len(results), "sequence": sequence, "success": True}
+
+        response = make_response(json.dumps(body))
+        response.headers['Content-Type'] = 'application/json'
+        return response
+    except Exception as e:
+        print(f"Error getting story changes: {str(e)}")
+        response = make_response(json.dumps({"error": str(e), "success": False}), 500)
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+def search_stories(request_json, partition):
+    """Full-text search over narrative, title, cities and answers; best BM25 matches first (summary rows unless view=full)"""
+    try:
+        query = str(request_json.get("query", "")).strip()
+        try:
+            if not query:
+                raise ValueError("query is required")
+            limit = min(int(request_json.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError("limit must be a positive integer")
+        except (TypeError, ValueError) as e:
+            response = make_response(json.dumps({"error": str(e), "success": False}), 400)
+            response.headers['Content-Type'] = 'application/json'
+            return response
+        fields = parse_fields(request_json.get("fields"))
+
+        matches = partition.search.search(query, limit)
+        if matches is None:
+            # First search against this partition: build the index once
+            rebuild_search_index(partition)
+            matches = partition.search.search(query, limit) or []
+
+        if request_json.get("view") == "full":
+            names = [match['name'] for match in matches]
+            stories = {name: story for name, story, error in partition.store.read_many(names) if not error}
+            results = [{**stories[match['name']], "score": match['score']} for match in matches if match['name'] in stories]
+        else:
+            rows = {row['story_id']: row for row in load_story_summaries(partition)}
+            results = [{**rows[match['story_id']], "score": match['score']} for match in matches if match['story_id'] in rows]
+        results = [project_story(result, fields + ['score'] if fields else None) for result in results]
+
+        response = make_response(json.dumps({
+            "stories": results,
+            "count": len(results),
+            "query": query,
+            "success": True
+        }))
+        response.headers['Content-Type'] = 'application/json'
+        return response
+    except Exception as e:
+        print(f"Error searching stories: {str(e)}")
+        response = make_response(json.dumps({"stories": [], "count": 0, "error": str(e), "success": False}), 500)
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+def export_stories(request_json, partition):
+    """Stream a partition's stories as NDJSON, resumable from any line's cursor"""
+    limit = request_json.get("limit")
+    try:
+        limit = int(limit) if limit is not None else None
+        # Rows come from the index, so only the stories themselves are downloaded (a window at a time)
+        lines = export_lines(load_story_summaries(partition), story_reader(partition),
+                             request_json.get("cursor"), limit)
+        first_line = next(lines)
+    except (TypeError, ValueError) as e:
+        response = make_response(json.dumps({"error": str(e), "success": False}), 400)
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+    def generate():
+        yield first_line
+        yield from lines
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def import_stories(request, partition):
+    """Import an NDJSON story stream into a partition, reading the body line by line"""
+    try:
+        lines = iter(request.stream.readline, b'')
+        summary = import_lines(lines, lambda name, story: write_story(partition, name, story),
+                               lambda entries: index_written_stories(partition, entries))
+        summary["success"] = not summary["failed"]
+        response = make_response(json.dumps(summary), 200)
+    except Exception as e:
+        print(f"Error importing stories: {str(e)}")
+        response = make_response(json.dumps({"error": str(e), "success": False}), 500)
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+def get_photo(request_json):
+    """Serve the raw bytes of a stored photo"""
+    try:
+        photo_id = request_json.get("photo_id", "")
+        photo = photo_store.get(photo_id)
+        if not photo:
+            response = make_response(json.dumps({"error": "Photo not found"}), 404)
+            response.headers['Content-Type'] = 'application/json'
+            return response
+        
+        data, content_type = photo
+        response = make_response(data)
+        response.headers['Content-Type'] = content_type
+        # Photo ids are content hashes, so the bytes behind an id never change
+        response.headers['Cache-Control'] = PHOTO_CACHE_CONTROL
+        response.headers['ETag'] = f'"{photo_id}"'
+        return response
+        
+    except Exception as e:
+        print(f"Error getting photo: {str(e)}")
+        response = make_response(json.dumps({"error": str(e)}), 500)
+        return response
+
 # === 🗺️ MAP FUNCTIONS ===
 
-def get_highlighted_map(request_json):
+def get_highlighted_map(request_json, partition):
     """Get highlighted SVG map for visited countries"""
     try:
-        # Get stories from storage
-        stories_response = get_stories({})
-        stories_data = json.loads(stories_response.get_data(as_text=True))
-        stories = stories_data.get("stories", [])
+        # The visited ISO codes are the keys of the per-country aggregates
+        aggregates = load_country_aggregates(partition)
         
         # Get highlighted map
-        highlighted_svg = map_integration.get_highlighted_map(stories)
+        highlighted_svg = map_integration.get_highlighted_map_for_countries(sorted(aggregates))
         
         response = make_response(highlighted_svg)
         response.headers['Content-Type'] = 'image/svg+xml'
@@ -994,17 +1817,12 @@ def get_highlighted_map(request_json):
         response = make_response(json.dumps({"error": str(e)}), 500)
         return response
 
-def get_map_statistics(request_json):
+def get_map_statistics(request_json, partition):
     """Get map statistics"""
     try:
-        # Get stories from storage
-        stories_response = get_stories({})
-        stories_data = json.loads(stories_response.get_data(as_text=True))
-        stories = stories_data.get("stories", [])
-        
-        # Load stories into map integration
-        map_integration.load_stories(stories)
-        stats = map_integration.get_map_statistics()
+        # Per-country aggregates maintained on write: O(countries), not O(stories)
+        aggregates = load_country_aggregates(partition)
+        stats = map_integration.get_statistics_from_aggregates(aggregates, load_story_count(partition))
         
         response = make_response(json.dumps(stats))
         return response
@@ -1014,20 +1832,16 @@ def get_map_statistics(request_json):
         response = make_response(json.dumps({"error": str(e)}), 500)
         return response
 
-def export_map_data(request_json):
+def export_map_data(request_json, partition):
     """Export map data"""
     try:
-        # Get stories from storage
-        stories_response = get_stories({})
-        stories_data = json.loads(stories_response.get_data(as_text=True))
-        stories = stories_data.get("stories", [])
-        
-        # Load stories into map integration
-        map_integration.load_stories(stories)
+        # Per-country aggregates maintained on write: O(countries), not O(stories)
+        aggregates = load_country_aggregates(partition)
         
         # Get export format
         format_type = request_json.get('format', 'json')
-        export_data = map_integration.export_map_data(format_type)
+        stats = map_integration.get_statistics_from_aggregates(aggregates, load_story_count(partition))
+        export_data = map_integration.export_map_data(format_type, stats)
         
         response = make_response(export_data)
         if format_type == 'csv':
@@ -1041,7 +1855,7 @@ def export_map_data(request_json):
         response = make_response(json.dumps({"error": str(e)}), 500)
         return response
 
-def get_country_details(request_json):
+def get_country_details(request_json, partition):
     """Get details for a specific country"""
     try:
         country_name = request_json.get("country_name", "")
@@ -1049,14 +1863,11 @@ def get_country_details(request_json):
             response = make_response(json.dumps({"error": "Country name required"}), 400)
             return response
         
-        # Get stories from storage
-        stories_response = get_stories({})
-        stories_data = json.loads(stories_response.get_data(as_text=True))
-        stories = stories_data.get("stories", [])
-        
-        # Load stories into map integration
-        map_integration.load_stories(stories)
-        details = map_integration.get_country_details(country_name)
+        # ISO filter on the index rows; only this country's stories are fetched
+        iso_code = partition.country_mapper.get_iso_code(country_name)
+        rows = query_story_summaries(partition, {'iso_code': iso_code}) if iso_code else []
+        stories = load_stories_by_name(partition, [row['name'] for row in rows])
+        details = map_integration.get_country_details_for(country_name, stories)
         
         if details:
             response = make_response(json.dumps(details))
@@ -1070,44 +1881,45 @@ def get_country_details(request_json):
         response = make_response(json.dumps({"error": str(e)}), 500)
         return response
 
-def delete_stories_by_country(request_json):
-    """Delete all stories for a specific country"""
+def delete_stories_by_country(request_json, partition):
+    """Delete all stories for a specific country (dry_run only counts them)"""
     try:
         country_name = request_json.get("country_name", "")
         if not country_name:
             response = make_response(json.dumps({"error": "Country name required"}), 400)
             return response
+        dry_run = bool(request_json.get("dry_run", False))
         
-        deleted_count = 0
+        # Match on ISO code so spelling variants of the same country are included
+        iso_code = partition.country_mapper.get_iso_code(country_name)
         
-        if (use_cloud_storage and storage_client):
-            # Delete from Google Cloud Storage
-            bucket = storage_client.bucket(STORIES_BUCKET)
-            blobs = bucket.list_blobs(prefix="stories/")
-            
-            for blob in blobs:
-                if blob.name.endswith('.json'):
-                    content = blob.download_as_text()
-                    story_data = json.loads(content)
-                    if story_data.get('country') == country_name:
-                        blob.delete()
-                        deleted_count += 1
-        else:
-            # Delete from local storage
-            if os.path.exists(LOCAL_STORAGE_DIR):
-                for filename in os.listdir(LOCAL_STORAGE_DIR):
-                    if filename.endswith('.json'):
-                        filepath = os.path.join(LOCAL_STORAGE_DIR, filename)
-                        with open(filepath, 'r') as f:
-                            story_data = json.load(f)
-                            if story_data.get('country') == country_name:
-                                os.remove(filepath)
-                                deleted_count += 1
+        # Index lookup (indexed columns on SQLite, summary metadata listing if the index was never built), no story downloads
+        matches = partition.store.names_for_country(country_name, iso_code)
+        
+        if dry_run:
+            response = make_response(json.dumps({
+                "matched_count": len(matches),
+                "country": country_name,
+                "dry_run": True,
+                "message": f"Would delete {len(matches)} stories for {country_name}"
+            }))
+            return response
+        
+        # Batched on GCS, one transaction on SQLite, parallel file removals locally
+        deleted, failed = partition.store.remove(matches)
+        for name, error in failed:
+            print(f"⚠️ Failed to delete {name}: {error}")
+        deleted_count = len(deleted)
+        if not partition.store.maintains_index:
+            partition.index.remove(parsed[0] for parsed in map(parse_story_name, deleted) if parsed)
+        search_indexer.remove(partition.search, (parsed[0] for parsed in map(parse_story_name, deleted) if parsed))
+        on_stories_changed(partition)
         
         response = make_response(json.dumps({
             "deleted_count": deleted_count,
             "country": country_name,
-            "message": f"Deleted {deleted_count} stories for {country_name}"
+            "message": f"Deleted {deleted_count} stories for {country_name}",
+            "sequence": story_sequence(partition)
         }))
         return response
         
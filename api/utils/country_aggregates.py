@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+🌐 Country Aggregates Module
+Per-country totals (ISO code → count, first/last visit, latest title, cities) maintained on every write
+
+Visits are the story timestamps. Entries are updated in O(1) when a story is added; removing stories
+only rescans the rows of countries that lost their first/last visit or latest title, once per batch.
+"""
+
+from typing import Callable, Collection, Dict, Iterable, List, Set
+
+def _new_entry(iso_code: str) -> Dict:
+    return {'iso_code': iso_code, 'count': 0, 'first_visit': None, 'last_visit': None, 'cities': {}}
+
+def add_row(aggregates: Dict[str, Dict], row: Dict) -> None:
+    """Count one story summary row into its country's entry"""
+    iso_code = row.get('iso_code')
+    if not iso_code:
+        return
+    entry = aggregates.setdefault(iso_code, _new_entry(iso_code))
+    entry['count'] += 1
+    for city in row.get('cities') or []:
+        entry['cities'][city] = entry['cities'].get(city, 0) + 1
+    timestamp = row['timestamp']
+    if entry['first_visit'] is None or timestamp < entry['first_visit']:
+        entry['first_visit'] = timestamp
+    if entry['last_visit'] is None or (timestamp, row['story_id']) >= (entry['last_visit'], entry.get('latest_story_id', '')):
+        entry['last_visit'] = timestamp
+        entry['latest_story_id'] = row['story_id']
+        entry['country'] = row.get('country')
+        entry['latest_title'] = row.get('title')
+
+def remove_row(aggregates: Dict[str, Dict], row: Dict, rows_for_country: Callable[[str], Iterable[Dict]]) -> None:
+    """Take one removed story out of its country's entry (rows_for_country must no longer include it)"""
+    remove_rows(aggregates, [row], lambda iso_codes: rows_for_country(*iso_codes))
+
+def remove_rows(aggregates: Dict[str, Dict], rows: Iterable[Dict],
+                rows_for_countries: Callable[[Set[str]], Iterable[Dict]]) -> None:
+    """Take a batch of removed stories out of their countries' entries
+
+    Countries that lost their first/last visit or latest title are rebuilt once, after the whole batch,
+    from a single rows_for_countries call for just those ISO codes (which must no longer include the rows)."""
+    stale = set()
+    for row in rows:
+        iso_code = row.get('iso_code')
+        entry = aggregates.get(iso_code) if iso_code else None
+        if entry is None or iso_code in stale:
+            continue
+        if entry['count'] <= 1:
+            del aggregates[iso_code]
+            continue
+        if row['timestamp'] in (entry['first_visit'], entry['last_visit']) or row['story_id'] == entry.get('latest_story_id'):
+            # An extreme of this country went away: rebuild the entry once the batch is done
+            stale.add(iso_code)
+            continue
+        entry['count'] -= 1
+        for city in row.get('cities') or []:
+            remaining = entry['cities'].get(city, 0) - 1
+            if remaining > 0:
+                entry['cities'][city] = remaining
+            else:
+                entry['cities'].pop(city, None)
+    if not stale:
+        return
+    rebuilt = build_aggregates(rows_for_countries(stale))
+    for iso_code in stale:
+        if iso_code in rebuilt:
+            aggregates[iso_code] = rebuilt[iso_code]
+        else:
+            del aggregates[iso_code]
+
+def build_aggregates(rows: Iterable[Dict]) -> Dict[str, Dict]:
+    """Aggregate summary rows from scratch"""
+    aggregates = {}
+    for row in rows:
+        add_row(aggregates, row)
+    return aggregates
+
+def aggregate_view(entry: Dict) -> Dict:
+    """Public form of an entry (cities as a sorted list)"""
+    view = {key: value for key, value in entry.items() if key != 'cities'}
+    view['cities'] = sorted(entry['cities'])
+    return view
+
+def stories_per_country(aggregates: Dict[str, Dict]) -> Dict[str, int]:
+    return {iso_code: entry['count'] for iso_code, entry in aggregates.items()}
+
+def recent_countries(aggregates: Dict[str, Dict], limit: int = 5) -> List[Dict]:
+    """Countries with the most recent visits, newest first"""
+    entries = sorted(aggregates.values(), key=lambda entry: (entry['last_visit'], entry.get('latest_story_id', '')), reverse=True)
+    return entries[:limit]
+
+def rows_in_countries(rows: Iterable[Dict], iso_codes: Collection[str]) -> List[Dict]:
+    return [row for row in rows if row.get('iso_code') in iso_codes]
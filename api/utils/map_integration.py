@@ -7,6 +7,7 @@ Connects country mapping and SVG processing for complete map functionality
 import json
 import os
 from typing import Dict, List, Optional
+from utils.country_aggregates import recent_countries, stories_per_country
 from utils.map_country_mapping import CountryMapper
 from utils.map_svg_processor import SVGMapProcessor
 
@@ -111,9 +112,46 @@ class MapIntegration:
             'recent_visits': recent_visits
         }
     
-    def export_map_data(self, format: str = "json") -> str:
+    def get_statistics_from_aggregates(self, aggregates: Dict[str, Dict], total_stories: Optional[int] = None) -> Dict:
+        """Map statistics from per-country aggregates (no per-story work)
+
+        total_stories counts every stored story; aggregates only hold stories with a known ISO code,
+        so without it the total covers mapped stories only."""
+        visited_countries = sorted(aggregates)
+        world_countries = len(self.svg_processor.country_elements)
+        country_counts = stories_per_country(aggregates)
+        top_countries = sorted(country_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        
+        # Most recently visited countries, newest first
+        recent_visits = [{
+            'country': entry.get('country'),
+            'title': entry.get('latest_title'),
+            'iso_code': entry['iso_code'],
+            'last_visit': entry['last_visit']
+        } for entry in recent_countries(aggregates)]
+        
+        return {
+            'visited_countries': visited_countries,
+            'total_countries': len(visited_countries),
+            'world_countries': world_countries,
+            'completion_percentage': round((len(visited_countries) / world_countries) * 100, 1) if world_countries else 0,
+            'total_stories': sum(country_counts.values()) if total_stories is None else total_stories,
+            'unique_countries': len(visited_countries),
+            'stories_per_country': country_counts,
+            'top_countries': top_countries,
+            'recent_visits': recent_visits
+        }
+    
+    def get_highlighted_map_for_countries(self, iso_codes: List[str]) -> str:
+        """Get highlighted SVG map for already-known visited ISO codes"""
+        if not iso_codes:
+            return self.svg_processor.svg_content or ""
+        return self.svg_processor.highlight_countries(list(iso_codes))
+    
+    def export_map_data(self, format: str = "json", stats: Optional[Dict] = None) -> str:
         """Export map data in various formats"""
-        stats = self.get_map_statistics()
+        if stats is None:
+            stats = self.get_map_statistics()
         
         if format.lower() == "json":
             return json.dumps(stats, indent=2)
@@ -146,6 +184,14 @@ class MapIntegration:
                 if story_iso == iso_code:
                     country_stories.append(story)
         
+        return self.get_country_details_for(country_name, country_stories)
+    
+    def get_country_details_for(self, country_name: str, country_stories: List[Dict]) -> Optional[Dict]:
+        """Country details from stories already narrowed to that country (e.g. by an index query)"""
+        iso_code = self.country_mapper.get_iso_code(country_name)
+        if not iso_code:
+            return None
+        
         return {
             'country_name': country_name,
             'iso_code': iso_code,
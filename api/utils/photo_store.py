@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+🖼️ Photo Store Module
+Stores story photos as content-addressed blobs instead of inline base64 data URLs
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from utils.blob_fetcher import BlobFetcher, default_fetcher
+
+PHOTO_PREFIX = "photos/"
+
+# Photos never change once written (the name is their hash), so clients may cache forever
+PHOTO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+PHOTO_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp'
+}
+PHOTO_CONTENT_TYPES = {extension: content_type for content_type, extension in PHOTO_EXTENSIONS.items()}
+
+DATA_URL_PATTERN = re.compile(r"^data:(?P<content_type>image/[\w.+-]+);base64,(?P<data>.+)$", re.DOTALL)
+PHOTO_ID_PATTERN = re.compile(r"^[0-9a-f]{64}\.(jpg|png|gif|webp)$")
+
+def parse_data_url(data_url: str) -> Optional[Tuple[str, bytes]]:
+    """Decode a base64 image data URL into (content_type, bytes)"""
+    if not isinstance(data_url, str):
+        return None
+    match = DATA_URL_PATTERN.match(data_url)
+    if not match or match.group('content_type') not in PHOTO_EXTENSIONS:
+        return None
+    try:
+        return match.group('content_type'), base64.b64decode(match.group('data'), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+def photo_id_for(data: bytes, content_type: str) -> str:
+    """Content address of a photo: sha256 of its bytes plus an extension for the content type"""
+    return f"{hashlib.sha256(data).hexdigest()}.{PHOTO_EXTENSIONS[content_type]}"
+
+class PhotoStore:
+    """Content-addressed photo blobs in GCS (photos/<sha256>.<ext>) or a local directory"""
+
+    def __init__(self, bucket=None, local_dir: Optional[str] = None, fetcher: Optional[BlobFetcher] = None):
+        self.bucket = bucket
+        self.local_dir = local_dir
+        self.fetcher = fetcher or default_fetcher
+
+    def put(self, data: bytes, content_type: str) -> str:
+        """Store photo bytes once and return the photo id (duplicates are not re-uploaded)"""
+        photo_id = photo_id_for(data, content_type)
+        if self.bucket is not None:
+            blob = self.bucket.blob(f"{PHOTO_PREFIX}{photo_id}")
+            blob.cache_control = PHOTO_CACHE_CONTROL
+            try:
+                # Only create: identical bytes always map to the same object
+                blob.upload_from_string(data, content_type=content_type, if_generation_match=0)
+            except PreconditionFailed:
+                pass
+            return photo_id
+
+        filepath = os.path.join(self.local_dir, photo_id)
+        if not os.path.exists(filepath):
+            if not os.path.exists(self.local_dir):
+                os.makedirs(self.local_dir)
+            tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, filepath)
+        return photo_id
+
+    def get(self, photo_id: str) -> Optional[Tuple[bytes, str]]:
+        """Return (bytes, content_type) for a stored photo, or None if it doesn't exist"""
+        if not PHOTO_ID_PATTERN.match(photo_id or ''):
+            return None
+        content_type = PHOTO_CONTENT_TYPES[photo_id.rsplit('.', 1)[1]]
+        if self.bucket is not None:
+            try:
+                return self.bucket.blob(f"{PHOTO_PREFIX}{photo_id}").download_as_bytes(), content_type
+            except NotFound:
+                return None
+
+        filepath = os.path.join(self.local_dir, photo_id)
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, 'rb') as f:
+            return f.read(), content_type
+
+    def extract_photos(self, story_data: Dict) -> Dict:
+        """Move inline data URL photos out of a story, replacing them with photos/<id> references"""
+        photos = story_data.get('photos')
+        if not photos or not isinstance(photos, list):
+            return story_data
+
+        def store(photo):
+            parsed = parse_data_url(photo)
+            if not parsed:
+                return photo
+            content_type, data = parsed
+            return f"{PHOTO_PREFIX}{self.put(data, content_type)}"
+
+        stored = []
+        for photo, ref, error in self.fetcher.imap(store, photos):
+            if error:
+                # Keep the photo inline rather than losing it
+                print(f"⚠️ Failed to store photo, keeping it inline: {error}")
+                ref = photo
+            stored.append(ref)
+        return {**story_data, 'photos': stored}
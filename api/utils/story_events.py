@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+📡 Story Events Module
+Wakes Server-Sent Event streams when this process saves or deletes stories, formats the events,
+and signs the short-lived tokens that open a stream (so session tokens stay out of URLs and access logs)
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+def sse_event(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    """One Server-Sent Event (an id makes browsers resume from it with Last-Event-ID)"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+def _stream_signature(secret: bytes, payload: str) -> str:
+    return hmac.new(secret, payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def issue_stream_token(secret: bytes, user_id: Optional[str], ttl: float, now: Optional[float] = None) -> str:
+    """Signed token that opens the event stream of one partition until ttl seconds from now"""
+    payload = f"{user_id or ''}.{int((now if now is not None else time.time()) + ttl)}"
+    return f"{payload}.{_stream_signature(secret, payload)}"
+
+def verify_stream_token(secret: bytes, token: str, now: Optional[float] = None) -> Optional[str]:
+    """User id a stream token was issued for (None for the shared partition); ValueError if forged or expired"""
+    user_id, _, rest = (token or '').partition('.')
+    expires, _, signature = rest.partition('.')
+    if not hmac.compare_digest(signature, _stream_signature(secret, f"{user_id}.{expires}")):
+        raise ValueError("Invalid stream token")
+    if not expires.isdigit() or int(expires) < (now if now is not None else time.time()):
+        raise ValueError("Stream token expired")
+    return user_id or None
+
+class StoryEvents:
+    """Per-partition change counters that event streams block on instead of polling storage"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._ticks: Dict[Optional[str], int] = {}
+
+    def tick(self, user_id: Optional[str]) -> int:
+        """Current change counter of a partition (None is the shared partition)"""
+        with self._condition:
+            return self._ticks.get(user_id, 0)
+
+    def notify(self, user_id: Optional[str]) -> None:
+        """Wake every stream of a partition (called after this process changes its stories)"""
+        with self._condition:
+            self._ticks[user_id] = self._ticks.get(user_id, 0) + 1
+            self._condition.notify_all()
+
+    def wait(self, user_id: Optional[str], tick: int, timeout: float) -> int:
+        """Block until the partition's counter moves past tick or timeout passes; returns the counter"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._ticks.get(user_id, 0) != tick, timeout)
+            return self._ticks.get(user_id, 0)
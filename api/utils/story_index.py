@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+📇 Story Index Module
+Keeps a compact manifest of story summary rows so listings need one read instead of one per story
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from utils.blob_fetcher import BlobFetcher, default_fetcher, download_json_blob, read_json_file
+from utils.country_aggregates import add_row, build_aggregates, remove_rows, rows_in_countries
+from utils.map_country_mapping import CountryMapper
+
+# Where the manifest lives in the stories bucket (outside the stories/ prefix on purpose)
+INDEX_BLOB_NAME = "indexes/stories_index.json"
+INDEX_VERSION = 1
+
+# Newest change-log entries kept for delta sync; clients further behind get a full snapshot
+CHANGE_LOG_SIZE = 500
+
+# Raised by a generation-pinned manifest download when another instance wrote a new version in between
+MANIFEST_REPLACED_ERRORS = (PreconditionFailed, NotFound)
+
+# Stories are stored as {story_id}_{YYYYmmddHHMMSS}.json
+STORY_NAME_PATTERN = re.compile(r"^(?P<story_id>.+)_(?P<timestamp>\d{14})\.json$")
+
+# Fields every index row can answer without downloading the story
+SUMMARY_FIELDS = ('story_id', 'name', 'country', 'iso_code', 'cities', 'timestamp', 'title', 'size', 'content_hash')
+
+# Summary fields also written as custom metadata on each story blob, so list_blobs returns them
+METADATA_FIELDS = ('country', 'iso_code', 'cities', 'title', 'timestamp', 'content_hash')
+
+# Story ids derived from client idempotency keys live in their own UUID namespace
+IDEMPOTENCY_NAMESPACE = uuid.UUID('6f1c2b7e-3d4a-5e8f-9a0b-1c2d3e4f5a6b')
+
+# Country values the frontend sometimes sends for unfinished stories
+MALFORMED_COUNTRY_VALUES = ('', 'undefined', 'none', 'null')
+
+def parse_story_name(name: str) -> Optional[Tuple[str, str]]:
+    """Return (story_id, timestamp) from a story blob or file name"""
+    match = STORY_NAME_PATTERN.match(os.path.basename(name))
+    if not match:
+        return None
+    return match.group('story_id'), match.group('timestamp')
+
+def story_sort_key(name: str) -> Tuple[str, str]:
+    """Sort key (timestamp, story_id) taken from the blob name; newest first when reversed"""
+    parsed = parse_story_name(name)
+    if not parsed:
+        return '', os.path.basename(name)
+    story_id, timestamp = parsed
+    return timestamp, story_id
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque cursor pointing just after the given row"""
+    position = json.dumps([row['timestamp'], row['story_id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor back into its (timestamp, story_id) position"""
+    try:
+        timestamp, story_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(timestamp), str(story_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def paginate_rows(rows: List[Dict], limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Keyset pagination over rows sorted newest first; returns (page, next_cursor)"""
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    if cursor:
+        position = decode_cursor(cursor)
+        rows = [row for row in rows if (row['timestamp'], row['story_id']) < position]
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+    return page, next_cursor
+
+def parse_fields(fields) -> Optional[List[str]]:
+    """Normalize a fields option given as a list or a comma-separated string"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    return [str(field).strip() for field in fields if str(field).strip()]
+
+def is_summary_projection(fields: Optional[List[str]]) -> bool:
+    """Check whether the requested fields can all be served from index rows"""
+    return bool(fields) and all(field in SUMMARY_FIELDS for field in fields)
+
+def project_story(story: Dict, fields: Optional[List[str]]) -> Dict:
+    """Keep only the requested fields of a story or summary row (always a JSON-ready dict)"""
+    if not fields:
+        # Cached summary records are mappings, not dicts
+        return story if isinstance(story, dict) else dict(story)
+    return {field: story[field] for field in fields if field in story}
+
+def has_valid_country(story: Dict) -> bool:
+    """Check that a story (or summary row) has a usable country"""
+    country = story.get('country')
+    return bool(country) and str(country).strip().lower() not in MALFORMED_COUNTRY_VALUES
+
+def count_listed(rows: Iterable[Dict]) -> int:
+    """Number of rows with a usable country (the ones listings show)"""
+    return sum(1 for row in rows if has_valid_country(row))
+
+def matches_country(row: Dict, country_name: str, iso_code: Optional[str] = None) -> bool:
+    """Check whether a summary row belongs to a country (same ISO code, or same name ignoring case)"""
+    if iso_code and row.get('iso_code') == iso_code:
+        return True
+    return str(row.get('country') or '').strip().lower() == str(country_name or '').strip().lower()
+
+def _normalize_visit_date(value, end_of_day: bool) -> str:
+    """A visit_date bound (YYYY-MM-DD, YYYYMMDD or a full YYYYMMDDHHMMSS timestamp) as a comparable timestamp"""
+    digits = str(value).replace('-', '').strip()
+    if len(digits) == 8 and digits.isdigit():
+        return digits + ('235959' if end_of_day else '000000')
+    if len(digits) == 14 and digits.isdigit():
+        return digits
+    raise ValueError(f"Invalid visit_date: {value}")
+
+def parse_filters(filters, country_mapper: Optional[CountryMapper] = None) -> Optional[Dict]:
+    """Normalize get_stories filters ({country | iso_code, visit_date: {from, to}, city}) for pushdown"""
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+    parsed = {}
+    if filters.get('iso_code'):
+        parsed['iso_code'] = str(filters['iso_code']).strip().upper()
+    elif filters.get('country'):
+        country = str(filters['country']).strip()
+        iso_code = country_mapper.get_iso_code(country) if country_mapper else None
+        # Rows carry the ISO code resolved at save time, so spelling variants match too
+        if iso_code:
+            parsed['iso_code'] = iso_code
+        else:
+            parsed['country'] = country.lower()
+    visit_date = filters.get('visit_date') or {}
+    if not isinstance(visit_date, dict):
+        raise ValueError("visit_date must be an object with from and/or to")
+    if visit_date.get('from'):
+        parsed['visit_date_from'] = _normalize_visit_date(visit_date['from'], end_of_day=False)
+    if visit_date.get('to'):
+        parsed['visit_date_to'] = _normalize_visit_date(visit_date['to'], end_of_day=True)
+    if filters.get('city'):
+        parsed['city'] = str(filters['city']).strip().casefold()
+    return parsed or None
+
+def cities_contain(cities: Iterable[str], needle: str) -> bool:
+    """Whether any city name contains the (casefolded) needle"""
+    return any(needle in str(city).casefold() for city in cities or [])
+
+def row_matches_filters(row: Dict, filters: Dict) -> bool:
+    """Check a summary row against parsed filters"""
+    if 'iso_code' in filters and row.get('iso_code') != filters['iso_code']:
+        return False
+    if 'country' in filters and str(row.get('country') or '').strip().lower() != filters['country']:
+        return False
+    timestamp = row.get('timestamp', '')
+    if 'visit_date_from' in filters and timestamp < filters['visit_date_from']:
+        return False
+    if 'visit_date_to' in filters and timestamp > filters['visit_date_to']:
+        return False
+    if 'city' in filters and not cities_contain(row.get('cities'), filters['city']):
+        return False
+    return True
+
+def filter_rows(rows: Iterable[Dict], filters: Optional[Dict]) -> List[Dict]:
+    """Summary rows matching parsed filters, order kept"""
+    if not filters:
+        return list(rows)
+    return [row for row in rows if row_matches_filters(row, filters)]
+
+def story_content_hash(story: Dict) -> str:
+    """SHA-256 of a story's canonical JSON (sorted keys, no whitespace), equal for identical saves"""
+    canonical = json.dumps(story, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def idempotent_story_id(idempotency_key: str) -> str:
+    """Story id for a client idempotency key, so a retried save maps onto the story it already created"""
+    return str(uuid.uuid5(IDEMPOTENCY_NAMESPACE, str(idempotency_key)))
+
+def build_hash_index(rows: Iterable[Dict]) -> Dict[str, Dict]:
+    """Rows by content hash and by story id (hex digests and UUIDs can't collide); the first row wins"""
+    index = {}
+    for row in rows:
+        index.setdefault(row['story_id'], row)
+        if row.get('content_hash'):
+            index.setdefault(row['content_hash'], row)
+    return index
+
+def build_summary_row(name: str, story: Dict, size: int, country_mapper: Optional[CountryMapper] = None) -> Optional[Dict]:
+    """Build the index row for a stored story"""
+    parsed = parse_story_name(name)
+    if not parsed:
+        return None
+    story_id, timestamp = parsed
+    country = story.get('country')
+    iso_code = None
+    if country and country_mapper:
+        iso_code = country_mapper.get_iso_code(str(country))
+
+    row = {
+        'story_id': story_id,
+        'name': name,
+        'country': country,
+        'iso_code': iso_code,
+        'cities': story.get('cities') or ([story['city']] if story.get('city') else []),
+        'timestamp': timestamp,
+        'title': story.get('title'),
+        'size': size,
+        'content_hash': story_content_hash(story)
+    }
+    # Leave out empty fields so rows look like the stories they summarize
+    return {key: value for key, value in row.items() if value is not None}
+
+def scan_local_stories(directory: str, fetcher: Optional[BlobFetcher] = None) -> Iterable[Tuple[str, Dict, int]]:
+    """Yield (name, story, size) for every story file in a local directory"""
+    if not os.path.exists(directory):
+        return
+    fetcher = fetcher or default_fetcher
+    filenames = [filename for filename in os.listdir(directory) if filename.endswith('.json')]
+    def read(filename):
+        filepath = os.path.join(directory, filename)
+        return read_json_file(filepath), os.path.getsize(filepath)
+
+    for filename, result, error in fetcher.imap(read, filenames):
+        if error:
+            print(f"⚠️ Skipping unreadable story {filename}: {error}")
+            continue
+        story, size = result
+        yield filename, story, size
+
+def summary_metadata(row: Dict) -> Dict[str, str]:
+    """Custom blob metadata (string values only) for a summary row"""
+    metadata = {}
+    for field in METADATA_FIELDS:
+        if field not in row:
+            continue
+        value = row[field]
+        metadata[field] = json.dumps(value) if field == 'cities' else str(value)
+    return metadata
+
+def summary_row_from_blob(blob) -> Optional[Dict]:
+    """Summary row from a listed blob's metadata, or None if the blob was saved without it"""
+    metadata = blob.metadata or {}
+    parsed = parse_story_name(blob.name)
+    # Every summarized blob carries its timestamp, so its absence means "not summarized yet"
+    if not parsed or 'timestamp' not in metadata:
+        return None
+    story_id, timestamp = parsed
+    try:
+        cities = json.loads(metadata.get('cities') or '[]')
+    except ValueError:
+        cities = []
+    row = {
+        'story_id': story_id,
+        'name': blob.name,
+        'country': metadata.get('country'),
+        'iso_code': metadata.get('iso_code'),
+        'cities': cities,
+        'timestamp': timestamp,
+        'title': metadata.get('title'),
+        'size': blob.size or 0,
+        'content_hash': metadata.get('content_hash')
+    }
+    return {key: value for key, value in row.items() if value is not None}
+
+def scan_gcs_summaries(bucket, prefix: str = "stories/", fetcher: Optional[BlobFetcher] = None,
+                       country_mapper: Optional[CountryMapper] = None) -> Iterable[Dict]:
+    """Yield a summary row for every story blob, from listing metadata where present"""
+    fetcher = fetcher or default_fetcher
+    unsummarized = []
+    # The delimiter keeps per-user partitions (stories/<user_id>/...) out of the shared listing
+    for blob in bucket.list_blobs(prefix=prefix, delimiter='/'):
+        if not blob.name.endswith('.json'):
+            continue
+        row = summary_row_from_blob(blob)
+        if row:
+            yield row
+        else:
+            unsummarized.append(blob)
+
+    if not unsummarized:
+        return
+    # Older blobs without metadata still need their content downloaded
+    print(f"⚠️ {len(unsummarized)} stories have no summary metadata; run scripts/backfill_story_metadata.py")
+    download = lambda blob: download_json_blob(blob, fetcher.timeout)
+    for blob, story, error in fetcher.imap(download, unsummarized):
+        if error:
+            print(f"⚠️ Skipping unreadable story {blob.name}: {error}")
+            continue
+        row = build_summary_row(blob.name, story, blob.size or 0, country_mapper)
+        if row:
+            yield row
+
+class StoryIndex:
+    """Story manifest stored next to the stories (GCS blob or local JSON file)"""
+
+    def __init__(self, bucket=None, local_path: Optional[str] = None,
+                 country_mapper: Optional[CountryMapper] = None, max_retries: int = 5,
+                 blob_name: str = INDEX_BLOB_NAME):
+        self.bucket = bucket
+        self.local_path = local_path
+        self.blob_name = blob_name
+        self.country_mapper = country_mapper or CountryMapper()
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        # Rebuilds scanning right now, and the updates made while they scan (replayed into the rebuilt manifest)
+        self._rebuilds = 0
+        self._updates_during_rebuild: List[Callable] = []
+        # (generation, store_version) of the last local manifest we read the version from
+        self._version_cache: Tuple[Optional[Tuple], int] = (None, 0)
+
+    def _read(self) -> Tuple[Optional[Dict], Optional[int]]:
+        """Read the manifest document and its generation (None if it doesn't exist yet)"""
+        if self.bucket is not None:
+            blob = self.bucket.get_blob(self.blob_name)
+            if blob is None:
+                return None, None
+            content = blob.download_as_text(if_generation_match=blob.generation)
+            return json.loads(content), blob.generation
+
+        if not self.local_path or not os.path.exists(self.local_path):
+            return None, None
+        with open(self.local_path, 'r') as f:
+            return json.load(f), None
+
+    def _read_latest(self) -> Tuple[Optional[Dict], Optional[int]]:
+        """_read, retrying when another instance replaces the manifest between its lookup and download"""
+        for attempt in range(self.max_retries):
+            try:
+                return self._read()
+            except MANIFEST_REPLACED_ERRORS:
+                print(f"⚠️ Story index changed while reading, retrying ({attempt + 1}/{self.max_retries})")
+        raise RuntimeError("Could not read story index: too many concurrent writers")
+
+    def _write(self, document: Dict, generation: Optional[int]) -> None:
+        """Write the manifest; on GCS only if nobody changed it since we read it"""
+        content = json.dumps(document, separators=(',', ':'))
+        if self.bucket is not None:
+            blob = self.bucket.blob(self.blob_name)
+            # Mirrored into metadata so the version can be checked without downloading the manifest
+            blob.metadata = {'store_version': str(document.get('store_version', 0))}
+            blob.upload_from_string(content, content_type="application/json",
+                                    if_generation_match=generation or 0)
+            return
+
+        directory = os.path.dirname(self.local_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{self.local_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, self.local_path)
+
+    @staticmethod
+    def _log_changes(document: Dict, changes: Optional[List[Tuple[str, str]]]) -> None:
+        """Append (op, story_id) changes under the new store version; None means everything changed"""
+        seq = document['store_version']
+        if changes is None:
+            # Rebuilt from a scan: nothing before this version can be replayed
+            document['changes'] = []
+            document['changes_floor'] = seq
+            return
+        log = document['changes']
+        log.extend({'seq': seq, 'op': op, 'story_id': story_id} for op, story_id in changes)
+        if len(log) > CHANGE_LOG_SIZE:
+            document['changes_floor'] = log[-CHANGE_LOG_SIZE - 1]['seq']
+            del log[:-CHANGE_LOG_SIZE]
+
+    def _update(self, mutate: Callable[[Dict, Dict], Optional[List[Tuple[str, str]]]], create: bool = False) -> bool:
+        """Read-modify-write the manifest, retrying when another instance wrote first
+
+        mutate returns the (op, story_id) changes it made for the change log (None if it replaced everything).
+        Without create, a missing manifest is left missing (False is returned): a manifest holding only this
+        change would hide every older story, so the next listing builds it from a full scan instead."""
+        with self._lock:
+            if self._rebuilds and not create:
+                # A scan running now may have missed this change; the rebuild replays it
+                self._updates_during_rebuild.append(mutate)
+            for attempt in range(self.max_retries):
+                try:
+                    document, generation = self._read()
+                except MANIFEST_REPLACED_ERRORS:
+                    print(f"⚠️ Story index changed while reading, retrying ({attempt + 1}/{self.max_retries})")
+                    continue
+                if document is None:
+                    if not create:
+                        return False
+                    document = {'version': INDEX_VERSION, 'stories': {}}
+                if 'countries' not in document:
+                    # Manifests written before aggregates existed get them on their next write
+                    document['countries'] = build_aggregates(document['stories'].values())
+                if 'changes' not in document:
+                    # Manifests written before the change log: deltas start from their current version
+                    document['changes'] = []
+                    document['changes_floor'] = document.get('store_version', 0)
+                changes = mutate(document['stories'], document['countries'])
+                # Stories listings show, including ones without an ISO code (which no country aggregate holds)
+                document['story_count'] = count_listed(document['stories'].values())
+                # Every change to the stories bumps the store version (used for ETags and as change sequence)
+                document['store_version'] = document.get('store_version', 0) + 1
+                self._log_changes(document, changes)
+                try:
+                    self._write(document, generation)
+                    return True
+                except PreconditionFailed:
+                    print(f"⚠️ Story index changed concurrently, retrying ({attempt + 1}/{self.max_retries})")
+            raise RuntimeError("Could not update story index: too many concurrent writers")
+
+    def generation(self) -> Optional[Tuple]:
+        """Cheap change token for the manifest (GCS generation or local file stat), None if it doesn't exist"""
+        if self.bucket is not None:
+            blob = self.bucket.get_blob(self.blob_name)
+            return (blob.generation,) if blob is not None else None
+        if not self.local_path or not os.path.exists(self.local_path):
+            return None
+        stat = os.stat(self.local_path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def store_version(self) -> int:
+        """Monotonically increasing version of the stored stories (0 if the index doesn't exist)"""
+        if self.bucket is not None:
+            blob = self.bucket.get_blob(self.blob_name)
+            if blob is None:
+                return 0
+            return int((blob.metadata or {}).get('store_version', 0))
+
+        generation = self.generation()
+        if generation is None:
+            return 0
+        cached_generation, version = self._version_cache
+        if generation != cached_generation:
+            document, _ = self._read_latest()
+            version = (document or {}).get('store_version', 0)
+            self._version_cache = (generation, version)
+        return version
+
+    def rows(self) -> Optional[List[Dict]]:
+        """Return all summary rows, newest first (None if the index was never built)"""
+        document, _ = self._read_latest()
+        if document is None:
+            return None
+        rows = list(document.get('stories', {}).values())
+        rows.sort(key=lambda row: (row.get('timestamp', ''), row['story_id']), reverse=True)
+        return rows
+
+    def changes_since(self, since: int) -> Optional[Tuple[List[Dict], int]]:
+        """Change-log entries after a sequence and the current sequence (None if the log doesn't reach back that far)"""
+        document, _ = self._read_latest()
+        if document is None or 'changes' not in document or since < document.get('changes_floor', 0):
+            return None
+        return [change for change in document['changes'] if change['seq'] > since], document.get('store_version', 0)
+
+    def country_aggregates(self) -> Optional[Dict[str, Dict]]:
+        """Per-country aggregates keyed by ISO code (None if the index was never built)"""
+        document, _ = self._read_latest()
+        if document is None:
+            return None
+        if 'countries' not in document:
+            return build_aggregates(document.get('stories', {}).values())
+        return document['countries']
+
+    def story_count(self) -> Optional[int]:
+        """Number of indexed stories with a usable country, as listings show them (None if the index was never built)"""
+        document, _ = self._read_latest()
+        if document is None:
+            return None
+        if 'story_count' not in document:
+            return count_listed(document.get('stories', {}).values())
+        return document['story_count']
+
+    @staticmethod
+    def _put_rows(stories: Dict, countries: Dict, rows: List[Dict]) -> None:
+        """Insert or replace rows, keeping the country aggregates in step (one rescan for the whole batch)"""
+        rows = list({row['story_id']: row for row in rows}.values())
+        replaced = [stories.pop(row['story_id']) for row in rows if row['story_id'] in stories]
+        remove_rows(countries, replaced, lambda iso_codes: rows_in_countries(stories.values(), iso_codes))
+        for row in rows:
+            stories[row['story_id']] = row
+            add_row(countries, row)
+
+    def add(self, name: str, story: Dict, size: int) -> Optional[Dict]:
+        """Add (or replace) the row for a freshly saved story (skipped until the index is first built)"""
+        row = build_summary_row(name, story, size, self.country_mapper)
+        if row is None:
+            return None
+
+        def mutate(stories, countries):
+            self._put_rows(stories, countries, [row])
+            return [('save', row['story_id'])]
+        self._update(mutate)
+        return row
+
+    def add_many(self, entries: Iterable[Tuple[str, Dict, int]]) -> int:
+        """Add rows for several saved stories with a single manifest write (skipped until the index is first built)"""
+        rows = [build_summary_row(name, story, size, self.country_mapper) for name, story, size in entries]
+        rows = [row for row in rows if row]
+        if not rows:
+            return 0
+
+        def mutate(stories, countries):
+            self._put_rows(stories, countries, rows)
+            return [('save', row['story_id']) for row in rows]
+        self._update(mutate)
+        return len(rows)
+
+    def remove(self, story_ids: Iterable[str]) -> None:
+        """Drop rows for deleted stories (skipped until the index is first built)"""
+        story_ids = list(story_ids)
+        if not story_ids:
+            return
+
+        def mutate(stories, countries):
+            removed = [stories.pop(story_id) for story_id in dict.fromkeys(story_ids) if story_id in stories]
+            remove_rows(countries, removed, lambda iso_codes: rows_in_countries(stories.values(), iso_codes))
+            return [('delete', row['story_id']) for row in removed]
+        self._update(mutate)
+
+    def rebuild(self, entries: Iterable[Tuple[str, Dict, int]]) -> int:
+        """Rebuild the manifest from (name, story, size) tuples of a full scan"""
+        rows = (build_summary_row(name, story, size, self.country_mapper) for name, story, size in entries)
+        return self.rebuild_from_rows(row for row in rows if row)
+
+    def rebuild_from_rows(self, summary_rows: Iterable[Dict]) -> int:
+        """Rebuild the manifest from ready-made summary rows (e.g. read from blob metadata)
+
+        Adds and removals made in this process while the rows are being scanned (which a missing manifest
+        would otherwise drop, and an existing one would lose when it is replaced) are replayed on top."""
+        with self._lock:
+            self._rebuilds += 1
+        try:
+            rows = {row['story_id']: row for row in summary_rows}
+
+            def mutate(stories, countries):
+                stories.clear()
+                stories.update(rows)
+                countries.clear()
+                countries.update(build_aggregates(rows.values()))
+                for update in self._updates_during_rebuild:
+                    update(stories, countries)
+            self._update(mutate, create=True)
+        finally:
+            with self._lock:
+                self._rebuilds -= 1
+                if not self._rebuilds:
+                    self._updates_during_rebuild.clear()
+        print(f"✅ Story index rebuilt with {len(rows)} stories")
+        return len(rows)
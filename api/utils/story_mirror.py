@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+🪞 Story Mirror Module
+In-memory copy of the story blobs, refreshed incrementally using each blob's GCS generation
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils.blob_fetcher import BlobFetcher, default_fetcher, download_json_blob
+from utils.story_record import compact_story
+
+class GCSStoryMirror:
+    """Keeps every story blob in memory; a sync lists the bucket once and downloads only new or changed blobs"""
+
+    def __init__(self, bucket, prefix: str = "stories/", fetcher: Optional[BlobFetcher] = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.fetcher = fetcher or default_fetcher
+        # name -> (generation, story, size)
+        self._entries: Dict[str, Tuple[str, Dict, int]] = {}
+        self._lock = threading.Lock()
+        self.last_downloaded = 0
+        self.last_removed = 0
+
+    @staticmethod
+    def blob_version(blob) -> Optional[str]:
+        """Identity of one version of a blob: its generation, or its etag if the listing lacks one"""
+        if blob.generation is not None:
+            return str(blob.generation)
+        return blob.etag
+
+    def sync(self) -> List[Tuple[str, Dict, int]]:
+        """Bring the mirror up to date with the bucket and return (name, story, size) for every story"""
+        # One sync at a time: concurrent callers wait and then see the refreshed mirror
+        with self._lock:
+            # Direct children only: per-user partitions live in sub-prefixes
+            blobs = self.bucket.list_blobs(prefix=self.prefix, delimiter='/')
+            listed = {blob.name: blob for blob in blobs if blob.name.endswith('.json')}
+
+            removed = [name for name in self._entries if name not in listed]
+            for name in removed:
+                del self._entries[name]
+
+            changed = []
+            for name, blob in listed.items():
+                entry = self._entries.get(name)
+                version = self.blob_version(blob)
+                if entry is None or version is None or entry[0] != version:
+                    changed.append(blob)
+
+            # Listed blobs carry their generation, so each download is pinned to the version we listed
+            download = lambda blob: download_json_blob(blob, self.fetcher.timeout)
+            downloaded = 0
+            for blob, story, error in self.fetcher.imap(download, changed):
+                if error:
+                    # Keep any previous copy; the next sync retries this blob
+                    print(f"⚠️ Skipping unreadable story {blob.name}: {error}")
+                    continue
+                # Held for the life of the instance: keys and repeated values are shared across stories
+                self._entries[blob.name] = (self.blob_version(blob), compact_story(story), blob.size or 0)
+                downloaded += 1
+
+            self.last_downloaded = downloaded
+            self.last_removed = len(removed)
+            if downloaded or removed:
+                print(f"🪞 Story mirror synced: {downloaded} downloaded, {len(removed)} removed, {len(self._entries)} total")
+            return [(name, story, size) for name, (_, story, size) in self._entries.items()]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+👤 Story Partition Module
+Per-user story storage: stories/<user_id>/ on GCS, one directory (and index/database) per user locally
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from utils.map_country_mapping import CountryMapper
+from utils.sqlite_story_store import SQLiteStoryStore
+from utils.story_cache import StoryCache
+from utils.story_codec import StoryCodec
+from utils.story_index import INDEX_BLOB_NAME, StoryIndex
+from utils.story_mirror import GCSStoryMirror
+from utils.story_search import SEARCH_BLOB_NAME, SearchIndex
+from utils.story_store import GCSStoryStore, LocalFileStoryStore, MemoryStoryStore, StoryStore
+
+STORY_PREFIX = "stories/"
+
+# Where stories live when there is no bucket: one JSON file each, one SQLite database, or process memory
+LOCAL_BACKENDS = ("files", "sqlite", "memory")
+
+# Partitions kept in memory at once (the shared partition is never evicted)
+MAX_OPEN_PARTITIONS = int(os.environ.get("STORY_MAX_OPEN_PARTITIONS", "256"))
+
+def partition_index_blob_name(user_id: Optional[str]) -> str:
+    """Index blob for a partition (the shared partition keeps the original index)"""
+    if not user_id:
+        return INDEX_BLOB_NAME
+    return f"indexes/users/{user_id}/stories_index.json"
+
+def partition_search_blob_name(user_id: Optional[str]) -> str:
+    """Search index blob for a partition (the shared partition keeps the top-level one)"""
+    if not user_id:
+        return SEARCH_BLOB_NAME
+    return f"indexes/users/{user_id}/search_index.json"
+
+def partition_user_ids(bucket=None, local_root: str = "backend/data/stories") -> List[str]:
+    """Ids of users with a partition: stories/<user_id>/ in the bucket, or a story or data directory locally"""
+    user_ids = set()
+    if bucket is not None:
+        for blob in bucket.list_blobs(prefix=STORY_PREFIX):
+            user_id, separator, _ = blob.name[len(STORY_PREFIX):].partition('/')
+            if separator:
+                user_ids.add(user_id)
+        return sorted(user_ids)
+    # Story files live in local_root/<user_id>/, SQLite databases and indexes in <data root>/users/<user_id>/
+    for directory in (local_root, os.path.join(os.path.dirname(local_root), "users")):
+        if os.path.isdir(directory):
+            user_ids.update(entry for entry in os.listdir(directory) if os.path.isdir(os.path.join(directory, entry)))
+    return sorted(user_ids)
+
+class StoryPartition:
+    """Storage for one user's stories; user_id None is the shared partition used by anonymous requests"""
+
+    def __init__(self, user_id: Optional[str] = None, bucket=None, local_root: str = "backend/data/stories",
+                 backend: str = "files", country_mapper: Optional[CountryMapper] = None,
+                 gcs_codec: Optional[StoryCodec] = None, local_codec: Optional[StoryCodec] = None):
+        if backend not in LOCAL_BACKENDS:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        self.user_id = str(user_id) if user_id else None
+        self.bucket = bucket
+        data_root = os.path.dirname(local_root)
+        if self.user_id:
+            self.prefix = f"{STORY_PREFIX}{self.user_id}/"
+            self.local_dir = os.path.join(local_root, self.user_id)
+            self.data_dir = os.path.join(data_root, "users", self.user_id)
+        else:
+            self.prefix = STORY_PREFIX
+            self.local_dir = local_root
+            self.data_dir = data_root
+
+        self.index = StoryIndex(
+            bucket=bucket,
+            local_path=os.path.join(self.data_dir, "story_index.json"),
+            country_mapper=country_mapper,
+            blob_name=partition_index_blob_name(self.user_id)
+        )
+        self.search = SearchIndex(
+            bucket=bucket,
+            local_path=os.path.join(self.data_dir, "search_index.json"),
+            blob_name=partition_search_blob_name(self.user_id)
+        )
+        self.mirror = None
+        # Local files that save_story writes to when an upload to the bucket fails
+        self.fallback_store: Optional[StoryStore] = None
+        if bucket is not None:
+            # Warm instances re-list the partition and download only blobs whose generation changed
+            self.mirror = GCSStoryMirror(bucket, prefix=self.prefix)
+            self.store: StoryStore = GCSStoryStore(bucket, self.prefix, gcs_codec, self.country_mapper, self.mirror)
+            self.fallback_store = LocalFileStoryStore(self.local_dir, local_codec)
+        elif backend == "sqlite":
+            sqlite_store = SQLiteStoryStore(os.path.join(self.data_dir, "stories.db"), self.index.country_mapper)
+            if sqlite_store.count() == 0:
+                # First switch to SQLite: bring over the existing story files
+                sqlite_store.import_files(self.local_dir)
+            self.store = sqlite_store
+        elif backend == "memory":
+            self.store = MemoryStoryStore(local_codec)
+        else:
+            self.store = LocalFileStoryStore(self.local_dir, local_codec)
+        if not self.store.maintains_index:
+            # Versions, summary rows and lookups of document stores come from the partition's index
+            self.store.index = self.index
+
+        self.cache = StoryCache(self.store.generation)
+        # save_story checks for duplicates and writes under this lock, so a double-click can't save twice
+        self.save_lock = threading.Lock()
+        # Saves acknowledged but not indexed yet (write-behind uploads) as (name, content hash), by content hash and story id
+        self.pending_saves = {}
+
+    @property
+    def country_mapper(self) -> CountryMapper:
+        return self.index.country_mapper
+
+    def blob_name(self, filename: str) -> str:
+        """GCS object name for a story file in this partition"""
+        return f"{self.prefix}{filename}"
+
+    def busy(self) -> bool:
+        """Whether dropping this partition would lose state: a save holding its lock, or uploads not indexed yet"""
+        return self.save_lock.locked() or bool(self.pending_saves)
+
+class StoryPartitions:
+    """Partitions opened on demand, least recently used idle ones dropped beyond MAX_OPEN_PARTITIONS
+
+    Busy partitions are kept (even past the limit) until they go idle: a fresh partition for the same user
+    would have its own save_lock and no pending_saves, so duplicate checks would miss queued uploads."""
+
+    def __init__(self, factory: Callable[[Optional[str]], StoryPartition], max_open: int = MAX_OPEN_PARTITIONS):
+        self._factory = factory
+        self._max_open = max(1, max_open)
+        self._partitions: "OrderedDict[Optional[str], StoryPartition]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.shared = factory(None)
+
+    def get(self, user_id=None) -> StoryPartition:
+        """Partition for a user id (None for the shared partition)"""
+        if not user_id:
+            return self.shared
+        user_id = str(user_id)
+        with self._lock:
+            partition = self._partitions.get(user_id)
+            if partition is None:
+                partition = self._factory(user_id)
+                self._partitions[user_id] = partition
+                self._evict(keep=user_id)
+            else:
+                self._partitions.move_to_end(user_id)
+            return partition
+
+    def _evict(self, keep: str):
+        """Drop least recently used idle partitions, other than keep, until at most max_open remain (called under the lock)"""
+        for user_id, partition in list(self._partitions.items()):
+            if len(self._partitions) <= self._max_open:
+                break
+            if user_id != keep and not partition.busy():
+                del self._partitions[user_id]
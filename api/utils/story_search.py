@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+🔎 Story Search Module
+Inverted index with BM25 ranking over story text, stored next to the stories and updated after every
+save/delete by a background indexer (off the request path)
+"""
+
+import heapq
+import json
+import math
+import os
+import queue
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core.exceptions import PreconditionFailed
+
+from utils.story_index import MANIFEST_REPLACED_ERRORS, parse_story_name
+
+SEARCH_BLOB_NAME = "indexes/search_index.json"
+SEARCH_VERSION = 1
+
+# Text fields that are searched, with how many times a token counts towards its term frequency
+SEARCH_FIELDS = {'title': 2, 'cities': 2, 'city': 2, 'narrative': 1, 'user_answers': 1}
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-folded word tokens ("Gïon" and "gion" match)"""
+    folded = unicodedata.normalize('NFKD', text.lower())
+    folded = ''.join(char for char in folded if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(folded)
+
+def _field_text(value) -> Iterable[str]:
+    """Every string inside a field value (user_answers may be a list or a dict of answers)"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _field_text(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _field_text(item)
+
+def story_terms(story: Dict) -> Counter:
+    """Weighted term frequencies of a story's searchable fields"""
+    terms = Counter()
+    for field, weight in SEARCH_FIELDS.items():
+        for text in _field_text(story.get(field)):
+            for token in tokenize(text):
+                terms[token] += weight
+    return terms
+
+class SearchIndex:
+    """BM25 inverted index stored as one document (GCS blob or local JSON file), cached in memory per generation"""
+
+    def __init__(self, bucket=None, local_path: Optional[str] = None, blob_name: str = SEARCH_BLOB_NAME,
+                 max_retries: int = 5):
+        self.bucket = bucket
+        self.local_path = local_path
+        self.blob_name = blob_name
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        # (generation, document, average document length) of the last read, so queries skip the download
+        self._cache: Tuple[Optional[Tuple], Optional[Dict], float] = (None, None, 0.0)
+
+    def _read(self) -> Tuple[Optional[Dict], Optional[int]]:
+        """Read the index document and its generation (None if it doesn't exist yet)"""
+        if self.bucket is not None:
+            blob = self.bucket.get_blob(self.blob_name)
+            if blob is None:
+                return None, None
+            content = blob.download_as_text(if_generation_match=blob.generation)
+            return json.loads(content), blob.generation
+
+        if not self.local_path or not os.path.exists(self.local_path):
+            return None, None
+        with open(self.local_path, 'r') as f:
+            return json.load(f), None
+
+    def _read_latest(self) -> Tuple[Optional[Dict], Optional[int]]:
+        """_read, retrying when another instance replaces the index between its lookup and download"""
+        for attempt in range(self.max_retries):
+            try:
+                return self._read()
+            except MANIFEST_REPLACED_ERRORS:
+                print(f"⚠️ Search index changed while reading, retrying ({attempt + 1}/{self.max_retries})")
+        raise RuntimeError("Could not read search index: too many concurrent writers")
+
+    def _write(self, document: Dict, generation: Optional[int]) -> Optional[Tuple]:
+        """Write the index (on GCS only if nobody changed it since we read it); returns the new generation"""
+        content = json.dumps(document, separators=(',', ':'))
+        if self.bucket is not None:
+            blob = self.bucket.blob(self.blob_name)
+            blob.upload_from_string(content, content_type="application/json", if_generation_match=generation or 0)
+            return (blob.generation,)
+
+        directory = os.path.dirname(self.local_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{self.local_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, self.local_path)
+        return self.generation()
+
+    def _update(self, mutate: Callable[[Dict], None], create: bool = False) -> bool:
+        """Read-modify-write the index, retrying when another instance wrote first
+
+        Without create, a missing index is left missing (False is returned): an index holding only this
+        change would hide every older story from search, so the next search builds it from a full scan instead."""
+        with self._lock:
+            for attempt in range(self.max_retries):
+                try:
+                    document, generation = self._read()
+                except MANIFEST_REPLACED_ERRORS:
+                    print(f"⚠️ Search index changed while reading, retrying ({attempt + 1}/{self.max_retries})")
+                    continue
+                if document is None:
+                    if not create:
+                        return False
+                    document = {'version': SEARCH_VERSION, 'docs': {}, 'postings': {}}
+                mutate(document)
+                try:
+                    written_generation = self._write(document, generation)
+                except PreconditionFailed:
+                    print(f"⚠️ Search index changed concurrently, retrying ({attempt + 1}/{self.max_retries})")
+                    continue
+                # Queries in this process use what we just wrote instead of downloading it again
+                self._cache = (written_generation, document, self._average_length(document))
+                return True
+            raise RuntimeError("Could not update search index: too many concurrent writers")
+
+    @staticmethod
+    def _average_length(document: Dict) -> float:
+        lengths = [doc[1] for doc in document['docs'].values()]
+        return sum(lengths) / len(lengths) if lengths else 0.0
+
+    def generation(self) -> Optional[Tuple]:
+        """Cheap change token for the index (GCS generation or local file stat), None if it doesn't exist"""
+        if self.bucket is not None:
+            blob = self.bucket.get_blob(self.blob_name)
+            return (blob.generation,) if blob is not None else None
+        if not self.local_path or not os.path.exists(self.local_path):
+            return None
+        stat = os.stat(self.local_path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> Tuple[Optional[Dict], float]:
+        """Current index document and average document length, re-read only when its generation changed"""
+        generation = self.generation()
+        cached_generation, document, average_length = self._cache
+        if generation is not None and generation == cached_generation:
+            return document, average_length
+        document, _ = self._read_latest()
+        average_length = self._average_length(document) if document is not None else 0.0
+        self._cache = (generation, document, average_length)
+        return document, average_length
+
+    def exists(self) -> bool:
+        return self._load()[0] is not None
+
+    @staticmethod
+    def _remove_doc(document: Dict, story_id: str):
+        doc = document['docs'].pop(story_id, None)
+        if doc is None:
+            return
+        postings = document['postings']
+        # Each doc keeps its own term list, so removal never scans the whole vocabulary
+        for term in doc[2]:
+            postings.get(term, {}).pop(story_id, None)
+            if term in postings and not postings[term]:
+                del postings[term]
+
+    @staticmethod
+    def _add_doc(document: Dict, name: str, story: Dict):
+        parsed = parse_story_name(name)
+        if not parsed:
+            return
+        story_id = parsed[0]
+        SearchIndex._remove_doc(document, story_id)
+        terms = story_terms(story)
+        document['docs'][story_id] = [name, sum(terms.values()), sorted(terms)]
+        for term, frequency in terms.items():
+            document['postings'].setdefault(term, {})[story_id] = frequency
+
+    def add_many(self, entries: Iterable[Tuple[str, Dict]]) -> None:
+        """Index (or re-index) saved stories given as (name, story), with a single index write (skipped until first built)"""
+        entries = list(entries)
+        if not entries:
+            return
+
+        def mutate(document):
+            for name, story in entries:
+                self._add_doc(document, name, story)
+        self._update(mutate)
+
+    def add(self, name: str, story: Dict) -> None:
+        """Index a freshly saved story"""
+        self.add_many([(name, story)])
+
+    def remove(self, story_ids: Iterable[str]) -> None:
+        """Drop deleted stories from the index (skipped until first built)"""
+        story_ids = list(story_ids)
+        if not story_ids:
+            return
+
+        def mutate(document):
+            for story_id in story_ids:
+                self._remove_doc(document, story_id)
+        self._update(mutate)
+
+    def rebuild(self, entries: Iterable[Tuple[str, Dict, int]]) -> int:
+        """Rebuild the index from (name, story, size) tuples of a full scan"""
+        def mutate(document):
+            document['docs'].clear()
+            document['postings'].clear()
+            for name, story, _ in entries:
+                self._add_doc(document, name, story)
+        self._update(mutate, create=True)
+        return len(self._load()[0]['docs'])
+
+    def search(self, query: str, limit: int = 20) -> Optional[List[Dict]]:
+        """Best BM25 matches as {story_id, name, score} (None if the index was never built)"""
+        document, average_length = self._load()
+        if document is None:
+            return None
+        docs, postings = document['docs'], document['postings']
+        total = len(docs)
+        scores = Counter()
+        for term in set(tokenize(query)):
+            matches = postings.get(term)
+            if not matches:
+                continue
+            idf = math.log(1 + (total - len(matches) + 0.5) / (len(matches) + 0.5))
+            for story_id, frequency in matches.items():
+                length = docs[story_id][1]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length) if average_length else BM25_K1
+                scores[story_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], docs[item[0]][0]))
+        return [{'story_id': story_id, 'name': docs[story_id][0], 'score': round(score, 4)} for story_id, score in best]
+
+class SearchIndexer:
+    """Applies search index updates on a background thread, so saves and deletes don't wait for them
+
+    Queued updates are applied in order; everything queued for one index while the previous batch was
+    being written goes out as a single add_many/remove per run of the same operation. Updates still
+    queued when the process dies are lost (the index is derived data: a rebuild brings it back in step).
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[Tuple[SearchIndex, str, list]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the background indexer"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="story-search-indexer", daemon=True)
+            self._thread.start()
+
+    def add(self, index: SearchIndex, entries: Iterable[Tuple[str, Dict]]) -> None:
+        """Queue saved (name, story) pairs for indexing"""
+        entries = list(entries)
+        if entries:
+            self._queue.put((index, 'add', entries))
+
+    def remove(self, index: SearchIndex, story_ids: Iterable[str]) -> None:
+        """Queue deleted story ids for removal"""
+        story_ids = list(story_ids)
+        if story_ids:
+            self._queue.put((index, 'remove', story_ids))
+
+    def flush(self) -> None:
+        """Block until every update queued so far has been applied (or has failed)"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.apply(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def apply(batch: List[Tuple[SearchIndex, str, list]]) -> None:
+        """Apply (index, operation, items) updates in order, merging consecutive ones per index"""
+        runs: Dict[int, List[Tuple[SearchIndex, str, list]]] = {}
+        for index, operation, items in batch:
+            index_runs = runs.setdefault(id(index), [])
+            if index_runs and index_runs[-1][1] == operation:
+                index_runs[-1][2].extend(items)
+            else:
+                index_runs.append((index, operation, list(items)))
+        for index_runs in runs.values():
+            for index, operation, items in index_runs:
+                try:
+                    if operation == 'add':
+                        index.add_many(items)
+                    else:
+                        index.remove(items)
+                except Exception as e:
+                    print(f"⚠️ Failed to update search index ({operation}, {len(items)} stories): {e}")
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+📦 Story Store Module
+One interface over where a partition's story documents live: local files, GCS, memory (SQLite in sqlite_story_store)
+
+Stores only hold documents. The summary index, search index and caches sit on top of any of them,
+so each optimization can be run against the in-memory store or a fake GCS bucket offline. Summary
+queries (versions, rows, aggregates, lookups) go through the store too: document stores answer them
+from the StoryIndex their partition attaches, stores with their own index (SQLite) from their tables.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.blob_fetcher import BlobFetcher, default_fetcher, delete_gcs_blobs, download_json_blob, read_json_file
+from utils.map_country_mapping import CountryMapper
+from utils.story_codec import StoryCodec
+from utils.story_index import StoryIndex, build_hash_index, build_summary_row, filter_rows, matches_country, scan_gcs_summaries, scan_local_stories, summary_metadata
+
+class StoryStore:
+    """Story documents addressed by name (file name locally, full blob name on GCS)"""
+
+    # Stores that keep their own summary rows (SQLite) don't need the separate story index
+    maintains_index = False
+
+    def __init__(self, fetcher: Optional[BlobFetcher] = None):
+        self.fetcher = fetcher or default_fetcher
+        # Summary index answering the queries below, attached by the partition unless maintains_index
+        self.index: Optional[StoryIndex] = None
+
+    def read(self, name: str) -> Dict:
+        """Read one story (FileNotFoundError / NotFound if it doesn't exist)"""
+        raise NotImplementedError
+
+    def read_many(self, names: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+        """Yield (name, story, error) in the given order, reading a bounded window in parallel"""
+        return self.fetcher.imap(self.read, names)
+
+    def write(self, filename: str, story: Dict) -> Tuple[str, int]:
+        """Store a story under a new file name; returns (name, stored size)"""
+        raise NotImplementedError
+
+    def remove(self, names: List[str]) -> Tuple[List[str], List[Tuple[str, Exception]]]:
+        """Delete stories by name; returns (deleted names, [(name, error)])"""
+        raise NotImplementedError
+
+    def names(self) -> List[str]:
+        """Names of every stored story, without reading them"""
+        raise NotImplementedError
+
+    def scan(self) -> Iterable[Tuple[str, Dict, int]]:
+        """Yield (name, story, size) for every story"""
+        raise NotImplementedError
+
+    def scan_summaries(self, country_mapper: Optional[CountryMapper] = None) -> Iterable[Dict]:
+        """Summary rows for every story (stores with cheaper sources than a full scan override this)"""
+        rows = (build_summary_row(name, story, size, country_mapper) for name, story, size in self.scan())
+        return (row for row in rows if row)
+
+    def url(self, name: str) -> str:
+        """Where a stored story can be found, as reported by save_story"""
+        raise NotImplementedError
+
+    def generation(self):
+        """Cheap token that changes whenever the stories change"""
+        # Every save/delete rewrites the index, so its generation tracks the whole store
+        return self.index.generation()
+
+    def version(self) -> int:
+        """Monotonically increasing version of the stories (bumped by every save/delete)"""
+        return self.index.store_version()
+
+    def rows(self, filters: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """Summary rows (newest first) matching parsed filters, None if the index was never built"""
+        rows = self.index.rows()
+        if rows is None or not filters:
+            return rows
+        return filter_rows(rows, filters)
+
+    def country_aggregates(self) -> Optional[Dict[str, Dict]]:
+        """Per-country aggregates maintained on write (None if the index was never built)"""
+        return self.index.country_aggregates()
+
+    def story_count(self) -> Optional[int]:
+        """Number of listed stories (usable country), with or without an ISO code (None if the index was never built)"""
+        return self.index.story_count()
+
+    def changes_since(self, since: int) -> Optional[Tuple[List[Dict], int]]:
+        """(change-log entries after a sequence, current sequence), None if the log doesn't reach back that far"""
+        return self.index.changes_since(since)
+
+    def find(self, story_id: Optional[str] = None, content_hash: Optional[str] = None) -> Optional[Dict]:
+        """Summary row of a stored story with this id or content hash, None if there is none (an id match wins)"""
+        rows = build_hash_index(self.rows() or [])
+        for key in (story_id, content_hash):
+            if key and key in rows:
+                return rows[key]
+        return None
+
+    def names_for_ids(self, story_ids: List[str]) -> Dict[str, str]:
+        """Names of stored stories by story id; unknown ids are left out"""
+        names = {row['story_id']: row['name'] for row in self.rows() or []}
+        return {story_id: names[story_id] for story_id in story_ids if story_id in names}
+
+    def names_for_country(self, country: str, iso_code: Optional[str] = None) -> List[str]:
+        """Names of stories saved with this country name (ignoring case) or ISO code, without reading any story"""
+        rows = self.rows()
+        if rows is None:
+            # Summary metadata listing if the index was never built
+            rows = self.scan_summaries(self.index.country_mapper)
+        return [row['name'] for row in rows if matches_country(row, country, iso_code)]
+
+class LocalFileStoryStore(StoryStore):
+    """One JSON (or zstd) file per story in a directory"""
+
+    def __init__(self, directory: str, codec: Optional[StoryCodec] = None, fetcher: Optional[BlobFetcher] = None):
+        super().__init__(fetcher)
+        self.directory = directory
+        self.codec = codec or StoryCodec('none')
+
+    def read(self, name: str) -> Dict:
+        return read_json_file(os.path.join(self.directory, name))
+
+    def write(self, filename: str, story: Dict) -> Tuple[str, int]:
+        os.makedirs(self.directory, exist_ok=True)
+        if self.codec.name == 'none':
+            # Plain files stay human-readable
+            content = json.dumps(story, indent=2).encode('utf-8')
+        else:
+            content, _ = self.codec.encode(story)
+        with open(os.path.join(self.directory, filename), 'wb') as f:
+            f.write(content)
+        return filename, len(content)
+
+    def remove(self, names: List[str]) -> Tuple[List[str], List[Tuple[str, Exception]]]:
+        results = self.fetcher.map(lambda name: os.remove(os.path.join(self.directory, name)), names)
+        deleted = [name for name, _, error in results if not error]
+        failed = [(name, error) for name, _, error in results if error]
+        return deleted, failed
+
+    def names(self) -> List[str]:
+        if not os.path.exists(self.directory):
+            return []
+        return [filename for filename in os.listdir(self.directory) if filename.endswith('.json')]
+
+    def scan(self) -> Iterable[Tuple[str, Dict, int]]:
+        return scan_local_stories(self.directory, self.fetcher)
+
+    def url(self, name: str) -> str:
+        return f"local://{os.path.join(self.directory, name)}"
+
+class GCSStoryStore(StoryStore):
+    """Story blobs under a prefix of a bucket, with summary fields as object metadata"""
+
+    def __init__(self, bucket, prefix: str = "stories/", codec: Optional[StoryCodec] = None,
+                 country_mapper: Optional[CountryMapper] = None, mirror=None, fetcher: Optional[BlobFetcher] = None):
+        super().__init__(fetcher)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.codec = codec or StoryCodec('none')
+        self.country_mapper = country_mapper
+        # Full scans go through the mirror (only new or changed blobs are downloaded) when there is one
+        self.mirror = mirror
+
+    def blob_name(self, filename: str) -> str:
+        return f"{self.prefix}{filename}"
+
+    def encode(self, filename: str, story: Dict) -> Tuple[str, bytes, Optional[str], Dict[str, str]]:
+        """(blob name, content, Content-Encoding, metadata) for a story about to be uploaded"""
+        name = self.blob_name(filename)
+        content, content_encoding = self.codec.encode(story)
+        # Summary fields ride along as object metadata, so listings need no downloads
+        summary = build_summary_row(name, story, len(content), self.country_mapper)
+        return name, content, content_encoding, summary_metadata(summary) if summary else None
+
+    def upload(self, name: str, content: bytes, content_encoding: Optional[str], metadata: Optional[Dict[str, str]]):
+        """Upload already-encoded story bytes (see encode)"""
+        blob = self.bucket.blob(name)
+        blob.metadata = metadata
+        # GCS still serves gzip objects decompressed to clients that don't accept gzip
+        blob.content_encoding = content_encoding
+        blob.upload_from_string(content, content_type="application/json", timeout=self.fetcher.timeout)
+
+    def read(self, name: str) -> Dict:
+        return download_json_blob(self.bucket.blob(name), self.fetcher.timeout)
+
+    def write(self, filename: str, story: Dict) -> Tuple[str, int]:
+        name, content, content_encoding, metadata = self.encode(filename, story)
+        self.upload(name, content, content_encoding, metadata)
+        return name, len(content)
+
+    def remove(self, names: List[str]) -> Tuple[List[str], List[Tuple[str, Exception]]]:
+        # Batched deletes (100 per request), batches sent in parallel
+        return delete_gcs_blobs(self.bucket, names, self.fetcher)
+
+    def names(self) -> List[str]:
+        # Direct children only: per-user partitions live in sub-prefixes
+        blobs = self.bucket.list_blobs(prefix=self.prefix, delimiter='/')
+        return [blob.name for blob in blobs if blob.name.endswith('.json')]
+
+    def scan(self) -> Iterable[Tuple[str, Dict, int]]:
+        if self.mirror is not None:
+            return self.mirror.sync()
+        return self._scan_blobs()
+
+    def _scan_blobs(self) -> Iterator[Tuple[str, Dict, int]]:
+        blobs = [blob for blob in self.bucket.list_blobs(prefix=self.prefix, delimiter='/') if blob.name.endswith('.json')]
+        download = lambda blob: download_json_blob(blob, self.fetcher.timeout)
+        for blob, story, error in self.fetcher.imap(download, blobs):
+            if error:
+                print(f"⚠️ Skipping unreadable story {blob.name}: {error}")
+                continue
+            yield blob.name, story, blob.size or 0
+
+    def scan_summaries(self, country_mapper: Optional[CountryMapper] = None) -> Iterable[Dict]:
+        return scan_gcs_summaries(self.bucket, prefix=self.prefix, fetcher=self.fetcher,
+                                  country_mapper=country_mapper or self.country_mapper)
+
+    def url(self, name: str) -> str:
+        return f"https://storage.googleapis.com/{self.bucket.name}/{name}"
+
+class MemoryStoryStore(StoryStore):
+    """Stories kept in a dict, encoded like files so sizes and codecs behave the same"""
+
+    def __init__(self, codec: Optional[StoryCodec] = None, fetcher: Optional[BlobFetcher] = None):
+        super().__init__(fetcher)
+        self.codec = codec or StoryCodec('none')
+        self._stories: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def read(self, name: str) -> Dict:
+        with self._lock:
+            content = self._stories.get(name)
+        if content is None:
+            raise FileNotFoundError(name)
+        return self.codec.decode(content)
+
+    def read_many(self, names: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+        # Nothing to wait on, so no point in handing reads to the thread pool
+        for name in names:
+            try:
+                yield name, self.read(name), None
+            except Exception as e:
+                yield name, None, e
+
+    def write(self, filename: str, story: Dict) -> Tuple[str, int]:
+        content, _ = self.codec.encode(story)
+        with self._lock:
+            self._stories[filename] = content
+        return filename, len(content)
+
+    def remove(self, names: List[str]) -> Tuple[List[str], List[Tuple[str, Exception]]]:
+        deleted, failed = [], []
+        with self._lock:
+            for name in names:
+                if self._stories.pop(name, None) is None:
+                    failed.append((name, FileNotFoundError(name)))
+                else:
+                    deleted.append(name)
+        return deleted, failed
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._stories)
+
+    def scan(self) -> Iterable[Tuple[str, Dict, int]]:
+        with self._lock:
+            items = list(self._stories.items())
+        return [(name, self.codec.decode(content), len(content)) for name, content in items]
+
+    def url(self, name: str) -> str:
+        return f"memory://{name}"
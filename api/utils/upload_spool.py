@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+📮 Upload Spool Module
+Write-behind story uploads: saves land in an fsync'd local journal and a background thread drains it to GCS
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.blob_fetcher import BlobFetcher, default_fetcher
+
+JOURNAL_NAME = "uploads.journal"
+
+# Tunable from the environment like the fetcher pool
+DEFAULT_UPLOAD_BATCH_SIZE = int(os.environ.get("STORY_UPLOAD_BATCH_SIZE", "32"))
+DEFAULT_RETRY_DELAY = float(os.environ.get("STORY_UPLOAD_RETRY_DELAY", "1"))
+MAX_RETRY_DELAY = 60.0
+
+class UploadSpool:
+    """Durable queue of pending story uploads, journaled to disk and replayed on restart
+
+    The journal is append-only: one line per queued upload and one per acknowledged (uploaded) entry.
+    It is truncated whenever the queue drains, so it only ever holds recent, unfinished work.
+    """
+
+    def __init__(self, spool_dir: str, upload: Callable[[Dict], None],
+                 on_uploaded: Optional[Callable[[List[Dict]], None]] = None,
+                 batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE, retry_delay: float = DEFAULT_RETRY_DELAY,
+                 fetcher: Optional[BlobFetcher] = None):
+        self.spool_dir = spool_dir
+        self.journal_path = os.path.join(spool_dir, JOURNAL_NAME)
+        self.upload = upload
+        self.on_uploaded = on_uploaded
+        self.batch_size = max(1, batch_size)
+        self.retry_delay = retry_delay
+        self.fetcher = fetcher or default_fetcher
+        self._pending: "OrderedDict[int, Dict]" = OrderedDict()
+        self._seq = 0
+        self._lock = threading.Lock()
+        # One drain at a time, whether from the background thread or an explicit drain()
+        self._drain_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.uploaded = 0
+        self.failed = 0
+
+        if not os.path.exists(spool_dir):
+            os.makedirs(spool_dir)
+        self._replay()
+
+    def _replay(self):
+        """Reload entries that were queued but never acknowledged (e.g. before a crash or restart)"""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final write: the save was never acknowledged to the client
+                    continue
+                if 'ack' in record:
+                    self._pending.pop(record['ack'], None)
+                    continue
+                record['content'] = base64.b64decode(record.pop('content_b64'))
+                self._pending[record['seq']] = record
+                self._seq = max(self._seq, record['seq'])
+        # Rewrite the journal with just the pending entries (drops acks and any torn line)
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for entry in self._pending.values():
+                f.write(json.dumps(self._journal_record(entry), separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        if self._pending:
+            print(f"📮 Replaying {len(self._pending)} spooled story uploads")
+
+    @staticmethod
+    def _journal_record(entry: Dict) -> Dict:
+        record = {key: value for key, value in entry.items() if key != 'content'}
+        record['content_b64'] = base64.b64encode(entry['content']).decode('ascii')
+        return record
+
+    def _append(self, records: List[Dict]):
+        """Append journal records and fsync before returning (caller holds the lock)"""
+        with open(self.journal_path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def enqueue(self, name: str, content: bytes, content_encoding: Optional[str] = None,
+                metadata: Optional[Dict[str, str]] = None, user_id: Optional[str] = None) -> Dict:
+        """Durably queue one blob upload; returns once the entry is on disk"""
+        with self._lock:
+            self._seq += 1
+            entry = {
+                'seq': self._seq,
+                'name': name,
+                'content_encoding': content_encoding,
+                'metadata': metadata or {},
+                'user_id': user_id,
+                'content': content
+            }
+            self._append([self._journal_record(entry)])
+            self._pending[entry['seq']] = entry
+        self._wakeup.set()
+        return entry
+
+    def pending(self) -> List[Dict]:
+        """Entries not uploaded yet, oldest first"""
+        with self._lock:
+            return list(self._pending.values())
+
+    def _acknowledge(self, entries: List[Dict]):
+        with self._lock:
+            for entry in entries:
+                self._pending.pop(entry['seq'], None)
+            if self._pending:
+                self._append([{'ack': entry['seq']} for entry in entries])
+            else:
+                # Nothing left to replay: start the next journal from scratch
+                with open(self.journal_path, 'w') as f:
+                    os.fsync(f.fileno())
+
+    def drain_once(self) -> Tuple[int, int]:
+        """Upload the oldest batch of pending entries in parallel; returns (uploaded, failed)"""
+        with self._drain_lock:
+            batch = self.pending()[:self.batch_size]
+            if not batch:
+                return 0, 0
+
+            done, failed = [], 0
+            for entry, _, error in self.fetcher.imap(self.upload, batch):
+                if error:
+                    print(f"⚠️ Spooled upload of {entry['name']} failed, will retry: {error}")
+                    failed += 1
+                else:
+                    done.append(entry)
+            if done:
+                self._acknowledge(done)
+                self.uploaded += len(done)
+                if self.on_uploaded:
+                    try:
+                        self.on_uploaded(done)
+                    except Exception as e:
+                        print(f"⚠️ Post-upload hook failed: {e}")
+            self.failed += failed
+            return len(done), failed
+
+    def drain(self) -> bool:
+        """Upload until the spool is empty or a batch fails; True if everything was uploaded"""
+        while True:
+            uploaded, failed = self.drain_once()
+            if failed:
+                return False
+            if not uploaded:
+                return True
+
+    def _run(self):
+        delay = self.retry_delay
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self.drain():
+                delay = self.retry_delay
+                continue
+            # Back off exponentially while GCS keeps failing, then try again
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+            self._wakeup.set()
+
+    def start(self):
+        """Start the background uploader (replayed entries are picked up straight away)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="story-upload-spool", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
@@ -56,6 +56,9 @@ def proxy_api(endpoint) -> Union[Response, Tuple[bytes, int, list]]:
         # Convert request.args to dict for requests library
         params = dict(request.args)
         
+        # Server-Sent Events stay open, so they are relayed as they arrive instead of buffered
+        event_stream = 'text/event-stream' in request.headers.get('Accept', '')
+        
         # Make request to backend
         response = requests.request(
             method=request.method,
@@ -63,9 +66,14 @@ def proxy_api(endpoint) -> Union[Response, Tuple[bytes, int, list]]:
             data=data,
             headers=headers,
             params=params,
-            timeout=60
+            timeout=None if event_stream else 60,
+            stream=event_stream
         )
         
+        if event_stream:
+            return Response(response.iter_content(chunk_size=None), status=response.status_code,
+                            content_type=response.headers.get('Content-Type'))
+        
         # Return backend response
         return response.content, response.status_code, list(response.headers.items())
         
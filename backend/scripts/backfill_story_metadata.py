@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Metadata Backfill
+Writes summary fields as custom metadata on Cloud Storage story blobs saved before metadata existed
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.blob_fetcher import BlobFetcher, download_json_blob
+from utils.map_country_mapping import CountryMapper
+from utils.story_index import build_summary_row, summary_metadata, summary_row_from_blob
+
+fetcher = BlobFetcher()
+
+def backfill_blob(blob, country_mapper):
+    """Download one story and patch its summary metadata in place"""
+    story = download_json_blob(blob, fetcher.timeout)
+    row = build_summary_row(blob.name, story, blob.size or 0, country_mapper)
+    if row is None:
+        return False
+    blob.metadata = summary_metadata(row)
+    # Skip (rather than clobber) blobs whose metadata changed since we listed them
+    blob.patch(if_metageneration_match=blob.metageneration, timeout=fetcher.timeout)
+    return True
+
+def backfill_gcs(bucket_name, dry_run=False):
+    try:
+        from google.cloud import storage
+    except ImportError:
+        print("\n⚠️ google-cloud-storage not installed. Skipping backfill.")
+        return
+    print(f"\n🏷️ Backfilling story metadata in bucket: {bucket_name} ...")
+    try:
+        bucket = storage.Client().bucket(bucket_name)
+        blobs = [blob for blob in bucket.list_blobs(prefix='stories/')
+                 if blob.name.endswith('.json') and summary_row_from_blob(blob) is None]
+        print(f"  {len(blobs)} stories without summary metadata")
+        if dry_run or not blobs:
+            return
+        country_mapper = CountryMapper()
+        updated = 0
+        for blob, patched, error in fetcher.imap(lambda blob: backfill_blob(blob, country_mapper), blobs):
+            if error:
+                print(f"  ⚠️ Error backfilling {blob.name}: {error}")
+            elif patched:
+                updated += 1
+        print(f"✅ Backfill complete. Updated {updated} blobs.")
+    except Exception as e:
+        print(f"⚠️ Could not backfill GCS bucket: {e}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill summary metadata on WanderLog story blobs")
+    parser.add_argument('--bucket', default=os.environ.get('STORIES_BUCKET', 'wanderlog-ai-stories'),
+                        help="stories bucket to backfill (default: $STORIES_BUCKET)")
+    parser.add_argument('--dry-run', action='store_true', help="only count blobs that need metadata")
+    args = parser.parse_args()
+
+    backfill_gcs(args.bucket, dry_run=args.dry_run)
+    print("\n🎉 Backfill finished.")
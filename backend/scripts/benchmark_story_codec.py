@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Codec Benchmark
+Reports stored size and encode/decode CPU time for each story codec, and trains the local zstd dictionary
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_codec import StoryCodec, train_zstd_dictionary, zstandard
+from utils.story_index import scan_local_stories
+
+LOCAL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'stories')
+DICTIONARY_PATH = os.path.join(os.path.dirname(LOCAL_DIR), 'story_codec.dict')
+
+COUNTRIES = ['Japan', 'France', 'Italy', 'Peru', 'Kenya', 'Canada', 'Vietnam', 'Portugal']
+WORDS = ('we wandered through the old town at dawn, tasted street food, watched the sunset over the harbour, '
+         'got lost in the market and laughed about it over dinner with new friends').split()
+
+def synthetic_stories(count):
+    """Stories shaped like the ones the app saves, for when there is little local data"""
+    rng = random.Random(42)
+    stories = []
+    for n in range(count):
+        country = rng.choice(COUNTRIES)
+        stories.append({
+            'country': country,
+            'cities': [f"{country} City {rng.randint(1, 20)}" for _ in range(rng.randint(1, 3))],
+            'title': f"A week in {country}",
+            'narrative': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(150, 600))),
+            'user_answers': {'highlight': ' '.join(rng.choice(WORDS) for _ in range(30))},
+            'style': 'Original',
+            'photos': []
+        })
+    return stories
+
+def measure(codec, stories):
+    """Return (stored bytes, encode seconds, decode seconds) for one codec over all stories"""
+    started = time.perf_counter()
+    encoded = [codec.encode(story)[0] for story in stories]
+    encode_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for content in encoded:
+        codec.decode(content)
+    decode_seconds = time.perf_counter() - started
+    return sum(len(content) for content in encoded), encode_seconds, decode_seconds
+
+def run(stories, dictionary_path):
+    baseline = sum(len(json.dumps(story, indent=2).encode('utf-8')) for story in stories)
+    print(f"\n🗜️ {len(stories)} stories, {baseline / 1024:.1f} KiB as indented JSON (the old local format)\n")
+    print(f"  {'codec':<14}{'stored KiB':>12}{'ratio':>8}{'encode µs':>12}{'decode µs':>12}")
+
+    codecs = [('none', StoryCodec('none')), ('gzip', StoryCodec('gzip'))]
+    if zstandard is not None:
+        codecs.append(('zstd', StoryCodec('zstd')))
+        if os.path.exists(dictionary_path):
+            codecs.append(('zstd+dict', StoryCodec('zstd', dictionary_path)))
+    else:
+        print("  (zstandard not installed: zstd rows skipped)")
+
+    for label, codec in codecs:
+        stored, encode_seconds, decode_seconds = measure(codec, stories)
+        print(f"  {label:<14}{stored / 1024:>12.1f}{baseline / stored:>8.2f}"
+              f"{encode_seconds / len(stories) * 1e6:>12.1f}{decode_seconds / len(stories) * 1e6:>12.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark WanderLog story compression codecs")
+    parser.add_argument('--dir', default=LOCAL_DIR, help="story directory to sample (default: local storage)")
+    parser.add_argument('--synthetic', type=int, default=2000,
+                        help="use this many synthetic stories when the directory has fewer")
+    parser.add_argument('--train-dictionary', action='store_true',
+                        help=f"train the local zstd dictionary ({DICTIONARY_PATH}) from the sampled stories")
+    parser.add_argument('--force', action='store_true',
+                        help="overwrite an existing dictionary (stories compressed with it become unreadable)")
+    args = parser.parse_args()
+
+    stories = [story for _, story, _ in scan_local_stories(args.dir)]
+    if len(stories) < args.synthetic:
+        print(f"📝 Only {len(stories)} local stories, benchmarking {args.synthetic} synthetic ones")
+        stories = synthetic_stories(args.synthetic)
+
+    if args.train_dictionary:
+        if os.path.exists(DICTIONARY_PATH) and not args.force:
+            print(f"⚠️ {DICTIONARY_PATH} already exists; pass --force to replace it")
+        else:
+            used = train_zstd_dictionary(stories, DICTIONARY_PATH)
+            print(f"✅ Trained zstd dictionary on {used} stories: {DICTIONARY_PATH}")
+
+    run(stories, DICTIONARY_PATH)
+    print("\n🎉 Benchmark finished.")
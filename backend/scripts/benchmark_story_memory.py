@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Memory Benchmark
+Measures what the long-lived story caches hold per N stories: summary rows as dicts versus StoryRecords,
+and full stories as decoded versus compacted (interned) dicts
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+import uuid
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.map_country_mapping import CountryMapper
+from utils.story_index import build_summary_row
+from utils.story_record import StoryRecord, compact_story
+
+COUNTRIES = {'Japan': ['Kyoto', 'Tokyo', 'Osaka'], 'France': ['Paris', 'Lyon'], 'Italy': ['Rome', 'Florence'],
+             'Peru': ['Lima', 'Cusco'], 'Kenya': ['Nairobi'], 'Canada': ['Toronto', 'Vancouver'],
+             'Vietnam': ['Hanoi', 'Hue'], 'Portugal': ['Lisbon', 'Porto']}
+
+def synthetic_stories(count):
+    """(name, story JSON) pairs shaped like the ones the app saves"""
+    rng = random.Random(42)
+    stories = []
+    for n in range(count):
+        country = rng.choice(sorted(COUNTRIES))
+        cities = rng.sample(COUNTRIES[country], rng.randint(1, len(COUNTRIES[country])))
+        story = {'country': country, 'city': cities[0], 'cities': cities, 'title': f"Story {n} in {country}",
+                 'story_length': rng.choice(['short', 'medium', 'long']), 'style': rng.choice(['casual', 'poetic']),
+                 'narrative': 'x' * rng.randint(200, 2000), 'answers': [{'question': 'Best meal?', 'answer': 'Ramen'}],
+                 'user_id': None}
+        story_id = uuid.UUID(int=rng.getrandbits(128))
+        stories.append((f"stories/{story_id}_2025{n % 12 + 1:02d}{n % 28 + 1:02d}120000.json", json.dumps(story)))
+    return stories
+
+def retained(build):
+    """Bytes still allocated by what build() returns once it is kept and everything else is freed"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+def report(label, before, after, count):
+    saved = 100.0 * (before - after) / before if before else 0.0
+    print(f"  {label:<28}{before / 1024:>12.0f}{after / 1024:>12.0f}{saved:>9.0f}%   "
+          f"({before / count:.0f} → {after / count:.0f} bytes per story)")
+
+def run(count):
+    stories = synthetic_stories(count)
+    mapper = CountryMapper()
+    # The index manifest is stored as JSON, so cached rows start out as json.loads output
+    manifest = json.dumps([build_summary_row(name, json.loads(text), len(text), mapper) for name, text in stories])
+
+    print(f"\n🧠 Cached memory for {count} stories\n")
+    print(f"  {'cache':<28}{'before KiB':>12}{'after KiB':>12}{'saved':>10}")
+    report("summary rows", retained(lambda: json.loads(manifest)),
+           retained(lambda: [StoryRecord(row) for row in json.loads(manifest)]), count)
+    report("full stories", retained(lambda: [json.loads(text) for _, text in stories]),
+           retained(lambda: [compact_story(json.loads(text)) for _, text in stories]), count)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark memory held by the WanderLog story caches")
+    parser.add_argument('--stories', type=int, default=10000, help="synthetic stories to cache")
+    args = parser.parse_args()
+
+    run(args.stories)
+    print("\n🎉 Benchmark finished.")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Store Benchmark
+Runs the GCS read paths against an in-memory fake bucket with fixed per-request latency, so caching,
+parallel fetch and index changes can be compared offline and reproducibly
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.blob_fetcher import BlobFetcher
+from utils.fake_gcs import FakeBucket
+from utils.story_partition import StoryPartition
+from utils.story_store import GCSStoryStore
+
+COUNTRIES = ['Japan', 'France', 'Italy', 'Peru', 'Kenya', 'Canada', 'Vietnam', 'Portugal']
+
+def populate(bucket, count):
+    """Write synthetic stories straight into the fake bucket (no latency while seeding)"""
+    rng = random.Random(42)
+    latency, bucket.latency = bucket.latency, 0.0
+    store = GCSStoryStore(bucket)
+    entries = []
+    for n in range(count):
+        country = rng.choice(COUNTRIES)
+        story = {'country': country, 'title': f"Story {n} in {country}", 'narrative': 'x' * rng.randint(200, 2000)}
+        name, size = store.write(f"s{n:06d}_2025{n % 12 + 1:02d}01000000.json", story)
+        entries.append((name, story, size))
+    bucket.latency = latency
+    return entries
+
+def timed(label, bucket, action):
+    bucket.requests.clear()
+    started = time.perf_counter()
+    result = action()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<44}{elapsed * 1000:>10.1f}{sum(bucket.requests.values()):>10}")
+    return result
+
+def run(count, latency, workers):
+    bucket = FakeBucket(latency=latency)
+    entries = populate(bucket, count)
+    data_dir = tempfile.mkdtemp()
+    partition = StoryPartition(None, bucket=bucket, local_root=os.path.join(data_dir, 'stories'))
+    names = [name for name, _, _ in entries]
+
+    print(f"\n📦 {count} stories in a fake bucket, {latency * 1000:.0f} ms per request, {workers} fetch workers\n")
+    print(f"  {'operation':<44}{'ms':>10}{'requests':>10}")
+
+    serial = GCSStoryStore(bucket, fetcher=BlobFetcher(max_workers=1))
+    parallel = GCSStoryStore(bucket, fetcher=BlobFetcher(max_workers=workers))
+    timed("read 50 stories one at a time", bucket, lambda: list(serial.read_many(names[:50])))
+    timed("read 50 stories in parallel", bucket, lambda: list(parallel.read_many(names[:50])))
+
+    timed("full scan, cold mirror", bucket, partition.store.scan)
+    timed("full scan, warm mirror", bucket, partition.store.scan)
+
+    timed("summaries from listing metadata", bucket, lambda: list(partition.store.scan_summaries()))
+    timed("build index", bucket, lambda: partition.index.rebuild_from_rows(partition.store.scan_summaries()))
+    timed("summaries from the index", bucket, partition.index.rows)
+    timed("per-country aggregates from the index", bucket, partition.country_aggregates)
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark WanderLog story storage against a fake GCS bucket")
+    parser.add_argument('--stories', type=int, default=500, help="stories to seed the fake bucket with")
+    parser.add_argument('--latency', type=float, default=0.01, help="seconds added to every fake GCS request")
+    parser.add_argument('--workers', type=int, default=16, help="parallel fetch workers")
+    args = parser.parse_args()
+
+    run(args.stories, args.latency, args.workers)
+    print("\n🎉 Benchmark finished.")
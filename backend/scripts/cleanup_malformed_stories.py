@@ -1,8 +1,13 @@
+import argparse
 import os
-import json
 import sys
 
-# === Local Storage Cleanup ===
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_index import parse_story_name
+from utils.story_partition import StoryPartition, partition_user_ids
+
 LOCAL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'stories')
 MALFORMED_COUNTRY_VALUES = {'', 'undefined', 'none', 'null'}
 
@@ -13,53 +18,69 @@ def is_malformed(story):
     country_str = str(country).strip().lower()
     return country_str in MALFORMED_COUNTRY_VALUES
 
-def cleanup_local():
-    print(f"\n🧹 Cleaning up local stories in {LOCAL_DIR}...")
+def partitions_to_clean(args, bucket=None):
+    """User ids of the partitions to clean (None is the shared partition); every partition by default"""
+    if args.user:
+        return args.user
+    return [None] + partition_user_ids(bucket, args.local_dir)
+
+def cleanup_partition(partition):
+    """Delete a partition's malformed stories through its store, and drop them from its indexes"""
+    owner = f"user {partition.user_id}" if partition.user_id else "shared stories"
+    malformed = [name for name, story, _ in partition.store.scan() if is_malformed(story)]
+    if not malformed:
+        return 0
+    # Parallel, batched deletes on GCS
+    deleted, failed = partition.store.remove(malformed)
+    for name, error in failed:
+        print(f"  ⚠️ Error deleting {name}: {error}")
+    for name in deleted:
+        print(f"  🗑️ Deleted malformed: {name}")
+    story_ids = [parsed[0] for parsed in map(parse_story_name, deleted) if parsed]
+    # Same bookkeeping as a country delete: SQLite rows drop out of its own index
+    if not partition.store.maintains_index:
+        partition.index.remove(story_ids)
+    partition.search.remove(story_ids)
+    print(f"  ✅ {owner}: deleted {len(deleted)} of {len(malformed)} malformed stories")
+    return len(deleted)
+
+# === Local Storage Cleanup ===
+def cleanup_local(args):
+    print(f"\n🧹 Cleaning up local stories in {args.local_dir}...")
     deleted = 0
-    for fname in os.listdir(LOCAL_DIR):
-        if fname.endswith('.json'):
-            fpath = os.path.join(LOCAL_DIR, fname)
-            try:
-                with open(fpath, 'r') as f:
-                    data = json.load(f)
-                if is_malformed(data):
-                    os.remove(fpath)
-                    print(f"  🗑️ Deleted malformed: {fname}")
-                    deleted += 1
-            except Exception as e:
-                print(f"  ⚠️ Error reading {fname}: {e}")
-    print(f"✅ Local cleanup complete. Deleted {deleted} files.")
+    for user_id in partitions_to_clean(args):
+        partition = StoryPartition(user_id, local_root=args.local_dir, backend=args.backend)
+        deleted += cleanup_partition(partition)
+    print(f"✅ Local cleanup complete. Deleted {deleted} stories.")
 
 # === Google Cloud Storage Cleanup ===
-def cleanup_gcs():
+def cleanup_gcs(args):
     try:
         from google.cloud import storage
     except ImportError:
         print("\n⚠️ google-cloud-storage not installed. Skipping GCS cleanup.")
         return
-    BUCKET_NAME = 'wanderlog-ai-stories'
-    print(f"\n🧹 Cleaning up Google Cloud Storage bucket: {BUCKET_NAME} ...")
+    print(f"\n🧹 Cleaning up Google Cloud Storage bucket: {args.bucket} ...")
     try:
-        client = storage.Client()
-        bucket = client.bucket(BUCKET_NAME)
-        blobs = list(bucket.list_blobs(prefix='stories/'))
+        bucket = storage.Client().bucket(args.bucket)
         deleted = 0
-        for blob in blobs:
-            if blob.name.endswith('.json'):
-                try:
-                    content = blob.download_as_text()
-                    data = json.loads(content)
-                    if is_malformed(data):
-                        blob.delete()
-                        print(f"  🗑️ Deleted malformed: {blob.name}")
-                        deleted += 1
-                except Exception as e:
-                    print(f"  ⚠️ Error reading {blob.name}: {e}")
+        for user_id in partitions_to_clean(args, bucket):
+            deleted += cleanup_partition(StoryPartition(user_id, bucket=bucket, local_root=args.local_dir))
         print(f"✅ GCS cleanup complete. Deleted {deleted} blobs.")
     except Exception as e:
         print(f"⚠️ Could not access GCS bucket: {e}")
 
 if __name__ == '__main__':
-    cleanup_local()
-    cleanup_gcs()
-    print("\n🎉 Cleanup finished.") 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Delete WanderLog stories saved without a usable country")
+    parser.add_argument('--local', action='store_true', help="clean up local storage only")
+    parser.add_argument('--bucket', default=os.environ.get('STORIES_BUCKET', 'wanderlog-ai-stories'),
+                        help="stories bucket to clean up (default: $STORIES_BUCKET)")
+    parser.add_argument('--local-dir', default=LOCAL_DIR, help="local stories directory")
+    parser.add_argument('--backend', default='files', choices=['files', 'sqlite'], help="local storage backend")
+    parser.add_argument('--user', action='append', help="clean up only this user's partition (repeatable)")
+    args = parser.parse_args()
+
+    cleanup_local(args)
+    if not args.local:
+        cleanup_gcs(args)
+    print("\n🎉 Cleanup finished.")
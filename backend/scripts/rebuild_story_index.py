@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Index Rebuilder
+Rebuilds the story summary index (and optionally the search index) of the shared and per-user partitions
+from a full scan of local or Cloud Storage stories
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_partition import StoryPartition, partition_user_ids
+
+LOCAL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'stories')
+
+def partitions_to_rebuild(args, bucket=None):
+    """User ids of the partitions to rebuild (None is the shared partition)"""
+    if args.user:
+        return args.user
+    if args.all_users:
+        return [None] + partition_user_ids(bucket, args.local_dir)
+    return [None]
+
+def rebuild_partition(partition, search=False):
+    """Rebuild one partition's indexes, the way the app builds them on first use"""
+    owner = f"user {partition.user_id}" if partition.user_id else "shared stories"
+    if partition.store.maintains_index:
+        print(f"  ⏭️ {owner}: the store keeps its own index")
+    else:
+        try:
+            # On GCS this reads summary metadata from the listing; only unsummarized blobs are downloaded
+            count = partition.index.rebuild_from_rows(partition.store.scan_summaries(partition.country_mapper))
+            print(f"  📇 {owner}: {count} stories")
+        except Exception as e:
+            print(f"  ⚠️ Could not rebuild index for {owner}: {e}")
+    if search:
+        try:
+            # The search index needs every story's text, so this is a full download
+            count = partition.search.rebuild(partition.store.scan())
+            print(f"  🔎 {owner}: {count} stories searchable")
+        except Exception as e:
+            print(f"  ⚠️ Could not rebuild search index for {owner}: {e}")
+
+def rebuild_local(args):
+    print(f"\n📇 Rebuilding local story indexes from {args.local_dir}...")
+    for user_id in partitions_to_rebuild(args):
+        rebuild_partition(StoryPartition(user_id, local_root=args.local_dir), args.search)
+
+def rebuild_gcs(args):
+    try:
+        from google.cloud import storage
+    except ImportError:
+        print("\n⚠️ google-cloud-storage not installed. Skipping GCS rebuild.")
+        return
+    print(f"\n📇 Rebuilding story indexes for bucket: {args.bucket} ...")
+    try:
+        bucket = storage.Client().bucket(args.bucket)
+        for user_id in partitions_to_rebuild(args, bucket):
+            rebuild_partition(StoryPartition(user_id, bucket=bucket, local_root=args.local_dir), args.search)
+    except Exception as e:
+        print(f"⚠️ Could not rebuild indexes for GCS bucket: {e}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild the WanderLog story index")
+    parser.add_argument('--local', action='store_true', help="rebuild the local file storage indexes only")
+    parser.add_argument('--bucket', default=os.environ.get('STORIES_BUCKET', 'wanderlog-ai-stories'),
+                        help="stories bucket to rebuild (default: $STORIES_BUCKET)")
+    parser.add_argument('--local-dir', default=LOCAL_DIR, help="local stories directory")
+    parser.add_argument('--user', action='append', help="rebuild only this user's partition (repeatable)")
+    parser.add_argument('--all-users', action='store_true', help="rebuild the shared partition and every user's")
+    parser.add_argument('--search', action='store_true',
+                        help="also rebuild the search index (after out-of-band imports or deletes)")
+    args = parser.parse_args()
+
+    rebuild_local(args)
+    if not args.local:
+        rebuild_gcs(args)
+    print("\n🎉 Rebuild finished.")
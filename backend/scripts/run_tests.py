@@ -17,6 +17,22 @@ def main():
     # Import test modules
     try:
         from test_wanderlog import TestWanderLogAI, TestStorageOperations
+        from test_story_index import TestStoryIndex
+        from test_blob_fetcher import TestBlobFetcher
+        from test_photo_store import TestPhotoStore
+        from test_sqlite_story_store import TestSQLiteStoryStore
+        from test_story_cache import TestStoryCache
+        from test_story_mirror import TestStoryMirror
+        from test_story_codec import TestStoryCodec
+        from test_story_partition import TestStoryPartition
+        from test_upload_spool import TestUploadSpool
+        from test_story_transfer import TestStoryTransfer
+        from test_story_search import TestStorySearch
+        from test_country_aggregates import TestCountryAggregates
+        from test_story_store import TestStoryStore
+        from test_story_events import TestStoryEvents
+        from test_story_record import TestStoryRecord
+        from test_story_handlers import TestStoryHandlers
     except ImportError as e:
         print(f"❌ Error importing tests: {e}")
         print("Make sure test_wanderlog.py exists in the current directory")
@@ -26,6 +42,22 @@ def main():
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestWanderLogAI))
     test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStorageOperations))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryIndex))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestBlobFetcher))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestPhotoStore))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestSQLiteStoryStore))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryCache))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryMirror))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryCodec))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryPartition))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestUploadSpool))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryTransfer))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStorySearch))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestCountryAggregates))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryStore))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryEvents))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryRecord))
+    test_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestStoryHandlers))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
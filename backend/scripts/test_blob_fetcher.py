@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Blob Fetcher Tests
+"""
+
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.api_core.exceptions import NotFound
+
+from utils.blob_fetcher import BlobFetcher, delete_gcs_blobs
+
+class FakeBatch:
+    """Collects deletes and applies them on exit, failing like GCS on the first missing blob"""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def __enter__(self):
+        self.bucket.batch_requests += 1
+        self.bucket.in_batch = True
+        self.bucket.queued = []
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.bucket.in_batch = False
+        missing = [name for name in self.bucket.queued if name not in self.bucket.names]
+        for name in self.bucket.queued:
+            self.bucket.names.discard(name)
+        if missing:
+            raise NotFound(f"No such object: {missing[0]}")
+
+class FakeBucket:
+    """Bucket holding blob names, with a client that hands out batches"""
+
+    def __init__(self, names):
+        self.names = set(names)
+        self.client = self
+        self.batch_requests = 0
+        self.in_batch = False
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def delete_blob(self, name, timeout=None):
+        if self.in_batch:
+            self.queued.append(name)
+        elif name in self.names:
+            self.names.discard(name)
+        else:
+            raise NotFound(f"No such object: {name}")
+
+class TestBlobFetcher(unittest.TestCase):
+    """Test the bounded-concurrency fetch engine"""
+
+    def setUp(self):
+        """Set up a small fetcher"""
+        self.fetcher = BlobFetcher(max_workers=4, timeout=1)
+
+    def tearDown(self):
+        """Stop worker threads"""
+        self.fetcher.shutdown()
+
+    def test_results_keep_input_order(self):
+        """Test results come back in input order even when fetches finish out of order"""
+        def fetch(n):
+            time.sleep(0.01 * (10 - n))
+            return n * n
+        results = self.fetcher.map(fetch, range(10))
+        self.assertEqual([item for item, _, _ in results], list(range(10)))
+        self.assertEqual([value for _, value, _ in results], [n * n for n in range(10)])
+
+    def test_concurrency_is_bounded(self):
+        """Test no more than max_workers fetches run at once"""
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def fetch(n):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+            return n
+
+        self.fetcher.map(fetch, range(20))
+        self.assertLessEqual(state['peak'], 4)
+        self.assertGreater(state['peak'], 1)
+
+    def test_errors_and_timeouts_are_reported_per_item(self):
+        """Test one failing or slow blob doesn't fail the whole scan"""
+        def fetch(n):
+            if n == 1:
+                raise ValueError("bad json")
+            if n == 2:
+                time.sleep(1.5)
+            return n
+
+        results = self.fetcher.map(fetch, range(4))
+        self.assertIsInstance(results[1][2], ValueError)
+        self.assertIsInstance(results[2][2], TimeoutError)
+        self.assertEqual(results[3][1], 3)
+
+    def test_delete_gcs_blobs_in_batches(self):
+        """Test deletes go out 100 per batch and a failed batch is retried blob by blob"""
+        names = [f"stories/s{n}_20250101000000.json" for n in range(250)]
+        bucket = FakeBucket(names[:-1])
+
+        deleted, failed = delete_gcs_blobs(bucket, names, self.fetcher)
+        self.assertEqual(sorted(deleted), sorted(names))
+        self.assertEqual(failed, [])
+        self.assertEqual(bucket.batch_requests, 3)
+        self.assertEqual(bucket.names, set())
+
+if __name__ == '__main__':
+    unittest.main()
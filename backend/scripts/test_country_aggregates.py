@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Country Aggregates Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.country_aggregates import aggregate_view, build_aggregates, recent_countries, remove_rows, rows_in_countries
+from utils.map_country_mapping import CountryMapper
+from utils.sqlite_story_store import SQLiteStoryStore
+from utils.story_index import StoryIndex, count_listed
+
+STORIES = [
+    ('paris_20250101000000.json', {'country': 'France', 'title': 'Paris', 'cities': ['Paris']}),
+    ('lyon_20250301000000.json', {'country': 'France', 'title': 'Lyon', 'cities': ['Lyon']}),
+    ('kyoto_20250201000000.json', {'country': 'Japan', 'title': 'Kyoto', 'cities': ['Kyoto']}),
+]
+
+class TestCountryAggregates(unittest.TestCase):
+    """Test per-country aggregates stay equal to a from-scratch rebuild after every write"""
+
+    def setUp(self):
+        """Set up a local index and a SQLite store"""
+        self.test_data_dir = tempfile.mkdtemp()
+        self.mapper = CountryMapper()
+        self.index = StoryIndex(local_path=os.path.join(self.test_data_dir, 'story_index.json'), country_mapper=self.mapper)
+        self.store = SQLiteStoryStore(os.path.join(self.test_data_dir, 'stories.db'), self.mapper)
+        self.index.rebuild([])
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.test_data_dir, ignore_errors=True)
+
+    def assert_matches_rebuild(self):
+        self.assertEqual(self.index.country_aggregates(), build_aggregates(self.index.rows()))
+        self.assertEqual(self.store.country_aggregates(), build_aggregates(self.store.rows()))
+        self.assertEqual(self.index.story_count(), count_listed(self.index.rows()))
+        self.assertEqual(self.store.story_count(), count_listed(self.store.rows()))
+
+    def save(self, name, story):
+        self.index.add(name, story, 10)
+        self.store.save(name, story)
+
+    def test_add_tracks_counts_and_visits(self):
+        """Test counts, first/last visit, cities and latest title per ISO code"""
+        for name, story in STORIES:
+            self.save(name, story)
+        france = self.index.country_aggregates()['FR']
+        self.assertEqual(france['count'], 2)
+        self.assertEqual((france['first_visit'], france['last_visit']), ('20250101000000', '20250301000000'))
+        self.assertEqual(france['latest_title'], 'Lyon')
+        self.assertEqual(aggregate_view(france)['cities'], ['Lyon', 'Paris'])
+        self.assertEqual([entry['iso_code'] for entry in recent_countries(self.index.country_aggregates())], ['FR', 'JP'])
+        self.assert_matches_rebuild()
+
+    def test_delete_and_replace(self):
+        """Test removing the latest story falls back to the previous one and empty countries disappear"""
+        for name, story in STORIES:
+            self.save(name, story)
+        self.index.remove(['lyon'])
+        self.store.delete(['lyon_20250301000000.json'])
+        for aggregates in (self.index.country_aggregates(), self.store.country_aggregates()):
+            self.assertEqual(aggregates['FR']['latest_title'], 'Paris')
+            self.assertEqual(aggregates['FR']['last_visit'], '20250101000000')
+        self.assert_matches_rebuild()
+
+        # Re-saving a story under a new country moves it between entries
+        self.save('kyoto_20250201000000.json', {'country': 'France', 'title': 'Nice', 'cities': ['Nice']})
+        self.assertNotIn('JP', self.index.country_aggregates())
+        self.assertEqual(self.store.country_aggregates()['FR']['count'], 2)
+        self.assert_matches_rebuild()
+
+    def test_batch_delete_rescans_affected_countries_once(self):
+        """Test deleting a batch that holds a country's first and last visits rescans only that country, once"""
+        nice = [(f'nice{day}_202504{day:02d}000000.json', {'country': 'France', 'title': f'Nice {day}'}) for day in range(1, 6)]
+        for name, story in STORIES + nice:
+            self.save(name, story)
+        names = [name for name, story in STORIES + nice if story['country'] == 'France' and name != 'nice3_20250403000000.json']
+        removed_ids = {name.split('_')[0] for name in names}
+        removed = [row for row in self.index.rows() if row['story_id'] in removed_ids]
+        remaining = [row for row in self.index.rows() if row['story_id'] not in removed_ids]
+        aggregates = build_aggregates(self.index.rows())
+        rescans = []
+
+        def rows_for_countries(iso_codes):
+            rescans.append(set(iso_codes))
+            return rows_in_countries(remaining, iso_codes)
+        remove_rows(aggregates, removed, rows_for_countries)
+        self.assertEqual(rescans, [{'FR'}])
+        self.assertEqual(aggregates, build_aggregates(remaining))
+        self.assertEqual(aggregates['FR']['latest_title'], 'Nice 3')
+
+        self.index.remove(removed_ids)
+        self.store.delete(names)
+        self.assertEqual(self.store.country_aggregates()['FR']['count'], 1)
+        self.assert_matches_rebuild()
+
+    def test_story_count_matches_listed_stories(self):
+        """Test the total story count keeps stories no country aggregate holds but leaves out unlisted ones"""
+        unmapped = [('atlantis_20250401000000.json', {'country': 'Atlantis'}),
+                    ('undefined_20250402000000.json', {'country': 'undefined'}),
+                    ('blank_20250403000000.json', {'country': ''})]
+        for name, story in STORIES + unmapped:
+            self.save(name, story)
+        self.save('paris_20250101000000.json', {'country': 'France', 'title': 'Paris again'})
+        for aggregates, count in ((self.index.country_aggregates(), self.index.story_count()),
+                                  (self.store.country_aggregates(), self.store.story_count())):
+            self.assertEqual(sum(entry['count'] for entry in aggregates.values()), 3)
+            self.assertEqual(count, 4)
+        self.assertEqual(self.store.count(), 6)
+        # Re-saving a malformed story with a usable country lists it
+        self.save('blank_20250403000000.json', {'country': 'Peru'})
+        self.index.remove(['atlantis', 'undefined'])
+        self.store.delete(['atlantis_20250401000000.json', 'undefined_20250402000000.json'])
+        self.assertEqual((self.index.story_count(), self.store.story_count()), (4, 4))
+        self.assert_matches_rebuild()
+
+    def test_existing_database_is_backfilled(self):
+        """Test a store opened over rows without aggregates builds them once"""
+        for name, story in STORIES:
+            self.store.save(name, story)
+        self.store._connect().execute("DELETE FROM country_aggregates")
+        self.store._connect().commit()
+        self.store._connect().execute("DELETE FROM store_meta WHERE key = 'story_count'")
+        self.store._connect().commit()
+        reopened = SQLiteStoryStore(self.store.db_path, self.mapper)
+        self.assertEqual(reopened.country_aggregates()['FR']['count'], 2)
+        self.assertEqual(reopened.story_count(), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Photo Store Tests
+"""
+
+import unittest
+import base64
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.photo_store import PhotoStore, parse_data_url, photo_id_for
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\n fake image bytes'
+PNG_DATA_URL = 'data:image/png;base64,' + base64.b64encode(PNG_BYTES).decode('ascii')
+
+class TestPhotoStore(unittest.TestCase):
+    """Test content-addressed photo storage"""
+
+    def setUp(self):
+        """Set up a temporary photo directory"""
+        self.test_data_dir = tempfile.mkdtemp()
+        self.photo_dir = os.path.join(self.test_data_dir, 'photos')
+        self.store = PhotoStore(local_dir=self.photo_dir)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.test_data_dir, ignore_errors=True)
+
+    def test_parse_data_url(self):
+        """Test data URLs decode to bytes and non-images are ignored"""
+        self.assertEqual(parse_data_url(PNG_DATA_URL), ('image/png', PNG_BYTES))
+        self.assertIsNone(parse_data_url('https://example.com/photo.jpg'))
+        self.assertIsNone(parse_data_url('data:text/html;base64,PGI+'))
+        self.assertIsNone(parse_data_url(None))
+
+    def test_extract_photos_stores_duplicates_once(self):
+        """Test photos become references and identical bytes are stored once"""
+        story = {'country': 'Japan', 'photos': [PNG_DATA_URL, PNG_DATA_URL, 'https://example.com/a.jpg']}
+        stored = self.store.extract_photos(story)
+
+        photo_id = photo_id_for(PNG_BYTES, 'image/png')
+        self.assertEqual(stored['photos'], [f'photos/{photo_id}', f'photos/{photo_id}', 'https://example.com/a.jpg'])
+        self.assertEqual(os.listdir(self.photo_dir), [photo_id])
+        self.assertEqual(story['photos'][0], PNG_DATA_URL)
+
+    def test_get_photo(self):
+        """Test stored photos are served back with their content type"""
+        photo_id = self.store.put(PNG_BYTES, 'image/png')
+        self.assertEqual(self.store.get(photo_id), (PNG_BYTES, 'image/png'))
+        self.assertIsNone(self.store.get('0' * 64 + '.png'))
+        self.assertIsNone(self.store.get('../story_index.json'))
+
+if __name__ == '__main__':
+    unittest.main()
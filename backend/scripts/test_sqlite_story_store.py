@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI SQLite Story Store Tests
+"""
+
+import unittest
+import json
+import os
+import sys
+import sqlite3
+import tempfile
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.sqlite_story_store import SQLiteStoryStore
+from utils.story_index import filter_rows, parse_filters, story_content_hash
+
+class TestSQLiteStoryStore(unittest.TestCase):
+    """Test the SQLite-backed local story store"""
+
+    def setUp(self):
+        """Set up a temporary database"""
+        self.test_data_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_data_dir, 'stories.db')
+        self.store = SQLiteStoryStore(self.db_path)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.test_data_dir, ignore_errors=True)
+
+    def test_wal_mode_and_indexes(self):
+        """Test the database runs in WAL mode with the query indexes in place"""
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({'idx_stories_country', 'idx_stories_iso_code', 'idx_stories_timestamp'} <= indexes)
+        conn.close()
+
+    def test_save_load_and_rows(self):
+        """Test stories round-trip and summary rows come back newest first"""
+        self.store.save('s1_20240101000000.json', {'country': 'France', 'cities': ['Paris'], 'narrative': 'Croissants'})
+        self.store.save('s2_20250101000000.json', {'country': 'Japan', 'title': 'Kyoto', 'narrative': 'Ramen'})
+
+        self.assertEqual(self.store.load(['s2_20250101000000.json', 'missing.json', 's1_20240101000000.json']),
+                         [{'country': 'Japan', 'title': 'Kyoto', 'narrative': 'Ramen'},
+                          {'country': 'France', 'cities': ['Paris'], 'narrative': 'Croissants'}])
+        rows = self.store.rows()
+        self.assertEqual([row['story_id'] for row in rows], ['s2', 's1'])
+        self.assertEqual(rows[0]['iso_code'], 'JP')
+        self.assertNotIn('narrative', rows[0])
+        self.assertEqual([name for name, _, _ in self.store.scan()], ['s2_20250101000000.json', 's1_20240101000000.json'])
+
+    def test_delete_by_country(self):
+        """Test country deletes go through the indexed lookup"""
+        self.store.save('s1_20240101000000.json', {'country': 'France'})
+        self.store.save('s2_20250101000000.json', {'country': 'Japan'})
+        self.store.save('s3_20250102000000.json', {'country': 'Japan'})
+
+        self.store.save('s4_20250103000000.json', {'country': ' japan '})
+        self.store.save('s5_20250104000000.json', {'country': 'Nihon'})
+
+        # Names match ignoring case and surrounding spaces, like matches_country
+        self.assertEqual(sorted(self.store.names_for_country('JAPAN')),
+                         ['s2_20250101000000.json', 's3_20250102000000.json', 's4_20250103000000.json'])
+        # ISO code matching picks up spelling variants of the same country
+        names = self.store.names_for_country('Japan', 'JP')
+        self.assertEqual(len(names), 4)
+        plan = ' '.join(row[-1] for row in self.store._connect().execute(
+            "EXPLAIN QUERY PLAN SELECT name FROM stories WHERE lower(trim(country)) = ?", ('japan',)))
+        self.assertIn('idx_stories_country_name', plan)
+        self.assertEqual(self.store.delete(names), 4)
+        self.assertEqual(self.store.count(), 1)
+
+    def test_concurrent_writes_keep_totals(self):
+        """Test parallel saves and deletes (as imports run them) don't overwrite each other's counts"""
+        names = [f"s{n}_2025010{n % 9 + 1}000000.json" for n in range(120)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda name: self.store.save(name, {'country': 'Japan'}), names))
+        self.assertEqual(self.store.count(), 120)
+        self.assertEqual(self.store.country_aggregates()['JP']['count'], 120)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda name: self.store.delete([name]), names[:60]))
+        self.assertEqual(self.store.count(), 60)
+        self.assertEqual(self.store.country_aggregates()['JP']['count'], 60)
+        self.assertEqual(self.store.version(), 180)
+
+    def test_filtered_rows_match_python_filters(self):
+        """Test filters pushed into SQL return the same rows as filtering in Python"""
+        self.store.save('kyoto_20250110120000.json', {'country': 'Japan', 'cities': ['Kyoto']})
+        self.store.save('tokyo_20250301090000.json', {'country': 'Japan', 'cities': ['Tokyo', 'Nikkō']})
+        self.store.save('lima_20250215000000.json', {'country': 'Peru', 'cities': ['Lima']})
+        self.store.save('atlantis_20250101000000.json', {'country': 'Atlantis'})
+        for filters in [{'country': 'Japan'}, {'iso_code': 'PE'}, {'country': 'atlantis'}, {'city': 'NIKKŌ'},
+                        {'visit_date': {'from': '20250201', 'to': '2025-03-01'}}, {'country': 'Japan', 'city': 'kyo'}]:
+            parsed = parse_filters(filters, self.store.country_mapper)
+            self.assertEqual(self.store.rows(parsed), filter_rows(self.store.rows(), parsed), filters)
+        self.assertEqual([row['story_id'] for row in self.store.rows(parse_filters({'city': 'nikkō'}))], ['tokyo'])
+
+    def test_find_by_id_or_content_hash(self):
+        """Test duplicate lookups by story id or content hash, including databases created before the column"""
+        story = {'country': 'Japan', 'title': 'Kyoto'}
+        self.store.save('kyoto_20250110120000.json', story)
+        self.store.save('lima_20250215000000.json', {'country': 'Peru'})
+        self.assertEqual(self.store.find(content_hash=story_content_hash(story))['name'], 'kyoto_20250110120000.json')
+        self.assertEqual(self.store.find('lima', story_content_hash(story))['name'], 'lima_20250215000000.json')
+        self.assertIsNone(self.store.find('missing', story_content_hash({'country': 'Chile'})))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP INDEX idx_stories_content_hash")
+        conn.execute("ALTER TABLE stories DROP COLUMN content_hash")
+        conn.commit()
+        conn.close()
+        migrated = SQLiteStoryStore(self.db_path)
+        self.assertEqual(migrated.find(content_hash=story_content_hash(story))['story_id'], 'kyoto')
+
+    def test_names_for_ids(self):
+        """Test story ids resolve to stored names without reading the documents"""
+        self.store.save('kyoto_20250110120000.json', {'country': 'Japan'})
+        self.store.save('lima_20250215000000.json', {'country': 'Peru'})
+        self.assertEqual(self.store.names_for_ids(['lima', 'missing', 'kyoto']),
+                         {'lima': 'lima_20250215000000.json', 'kyoto': 'kyoto_20250110120000.json'})
+        self.assertEqual(self.store.names_for_ids([]), {})
+
+    def test_change_log(self):
+        """Test saves and deletes are logged under the version they produced"""
+        self.store.save('kyoto_20250110120000.json', {'country': 'Japan'})
+        self.store.save('lima_20250215000000.json', {'country': 'Peru'})
+        self.store.delete(['kyoto_20250110120000.json'])
+        changes, sequence = self.store.changes_since(1)
+        self.assertEqual(sequence, 3)
+        self.assertEqual([(change['seq'], change['op'], change['story_id']) for change in changes],
+                         [(2, 'save', 'lima'), (3, 'delete', 'kyoto')])
+        self.assertEqual(self.store.changes_since(3), ([], 3))
+
+    def test_import_files(self):
+        """Test existing JSON story files are imported once"""
+        stories_dir = os.path.join(self.test_data_dir, 'stories')
+        os.makedirs(stories_dir)
+        with open(os.path.join(stories_dir, 'old_20230101000000.json'), 'w') as f:
+            json.dump({'country': 'Peru'}, f)
+
+        self.assertEqual(self.store.import_files(stories_dir), 1)
+        self.assertEqual(self.store.rows()[0]['country'], 'Peru')
+
+if __name__ == '__main__':
+    unittest.main()
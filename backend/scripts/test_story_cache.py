@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Cache Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.sqlite_story_store import SQLiteStoryStore
+from utils.story_cache import StoryCache
+from utils.story_index import StoryIndex
+
+class TestStoryCache(unittest.TestCase):
+    """Test the shared story cache"""
+
+    def setUp(self):
+        """Set up a controllable generation and a counting loader"""
+        self.generation = 1
+        self.loads = 0
+        self.cache = StoryCache(lambda: self.generation)
+
+    def _loader(self):
+        self.loads += 1
+        return [{'country': 'France', 'load': self.loads}]
+
+    def test_hit_until_generation_changes(self):
+        """Test repeated reads share one load until storage changes"""
+        first = self.cache.get('stories', self._loader)
+        self.assertIs(self.cache.get('stories', self._loader), first)
+        self.assertEqual(self.loads, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        self.generation = 2
+        self.assertEqual(self.cache.get('stories', self._loader)[0]['load'], 2)
+
+    def test_invalidate(self):
+        """Test writes from this process drop cached values"""
+        self.cache.get('stories', self._loader)
+        self.cache.invalidate()
+        self.cache.get('stories', self._loader)
+        self.assertEqual(self.loads, 2)
+
+    def test_unknown_generation_never_hits(self):
+        """Test nothing is served from cache when storage can't report a generation"""
+        self.generation = None
+        self.cache.get('stories', self._loader)
+        self.cache.get('stories', self._loader)
+        self.assertEqual(self.loads, 2)
+
+    def test_storage_generations_change_on_write(self):
+        """Test the index and SQLite store report new generations after writes"""
+        data_dir = tempfile.mkdtemp()
+        try:
+            index = StoryIndex(local_path=os.path.join(data_dir, 'story_index.json'))
+            self.assertIsNone(index.generation())
+            index.rebuild([])
+            index.add('s1_20250101000000.json', {'country': 'France'}, 10)
+            before = index.generation()
+            index.add('s2_20250102000000.json', {'country': 'Italy'}, 10)
+            self.assertNotEqual(index.generation(), before)
+
+            store = SQLiteStoryStore(os.path.join(data_dir, 'stories.db'))
+            version = store.version()
+            store.save('s1_20250101000000.json', {'country': 'France'})
+            self.assertEqual(store.version(), version + 1)
+            store.delete(['missing_20250101000000.json'])
+            self.assertEqual(store.version(), version + 1)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Codec Tests
+"""
+
+import unittest
+import json
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.blob_fetcher import read_json_file
+from utils.story_codec import StoryCodec, decode_story_bytes, train_zstd_dictionary, zstandard
+
+STORY = {
+    'country': 'Japan',
+    'cities': ['Kyoto', 'Osaka'],
+    'title': 'Temples and ramen',
+    'narrative': 'We wandered through the temples of Kyoto before a late ramen dinner. ' * 20
+}
+
+class TestStoryCodec(unittest.TestCase):
+    """Test transparent story compression"""
+
+    def setUp(self):
+        """Set up a temporary data directory"""
+        self.test_data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.test_data_dir, ignore_errors=True)
+
+    def test_plain_json_still_reads(self):
+        """Test stories written before compression decode unchanged"""
+        filepath = os.path.join(self.test_data_dir, 's1_20250101000000.json')
+        with open(filepath, 'w') as f:
+            json.dump(STORY, f, indent=2)
+        self.assertEqual(read_json_file(filepath), STORY)
+
+        content, encoding = StoryCodec('none').encode(STORY)
+        self.assertIsNone(encoding)
+        self.assertEqual(json.loads(content), STORY)
+
+    def test_gzip_round_trip(self):
+        """Test gzip output is smaller, tagged for Content-Encoding and decodes by magic number"""
+        content, encoding = StoryCodec('gzip').encode(STORY)
+        self.assertEqual(encoding, 'gzip')
+        self.assertLess(len(content), len(json.dumps(STORY)))
+        self.assertEqual(decode_story_bytes(content), STORY)
+        # Deterministic, so identical stories produce identical objects
+        self.assertEqual(StoryCodec('gzip').encode(STORY)[0], content)
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_zstd_with_trained_dictionary(self):
+        """Test zstd files written with a trained dictionary read back through read_json_file"""
+        dictionary_path = os.path.join(self.test_data_dir, 'story_codec.dict')
+        samples = [{**STORY, 'title': f"Trip {n}", 'cities': [f"City {n}", 'Kyoto']} for n in range(200)]
+        train_zstd_dictionary(samples, dictionary_path, size=4096)
+
+        codec = StoryCodec('zstd', dictionary_path)
+        content, encoding = codec.encode(STORY)
+        self.assertIsNone(encoding)
+        self.assertEqual(codec.decode(content), STORY)
+        self.assertEqual(decode_story_bytes(content, dictionary_path), STORY)
+
+    def test_unknown_codec(self):
+        """Test a misconfigured codec name fails fast"""
+        with self.assertRaises(ValueError):
+            StoryCodec('brotli')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Events Tests
+"""
+
+import unittest
+import json
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_events import StoryEvents, issue_stream_token, sse_event, verify_stream_token
+
+class TestStoryEvents(unittest.TestCase):
+    """Test event streams are woken by writes to their own partition only"""
+
+    def setUp(self):
+        """Set up an event bus"""
+        self.events = StoryEvents()
+
+    def test_stream_tokens(self):
+        """Test stream tokens name their partition until they expire and can't be altered"""
+        secret = b'secret'
+        token = issue_stream_token(secret, '42', 60, now=1000)
+        self.assertEqual(verify_stream_token(secret, token, now=1059), '42')
+        self.assertIsNone(verify_stream_token(secret, issue_stream_token(secret, None, 60, now=1000), now=1000))
+        with self.assertRaises(ValueError):
+            verify_stream_token(secret, token, now=1061)
+        with self.assertRaises(ValueError):
+            verify_stream_token(secret, '7' + token[2:], now=1000)
+        with self.assertRaises(ValueError):
+            verify_stream_token(b'other', token, now=1000)
+        with self.assertRaises(ValueError):
+            verify_stream_token(secret, 'garbage', now=1000)
+
+    def test_sse_event_format(self):
+        """Test events carry an optional id, a name and one JSON data line"""
+        self.assertEqual(sse_event('story-deleted', {'story_id': 's1'}), 'event: story-deleted\ndata: {"story_id": "s1"}\n\n')
+        event = sse_event('map-version-changed', {'version': 7}, 7)
+        self.assertTrue(event.startswith('id: 7\nevent: map-version-changed\n'))
+        self.assertEqual(json.loads(event.split('data: ')[1]), {'version': 7})
+
+    def test_notify_wakes_waiting_stream(self):
+        """Test a waiting stream returns as soon as its partition changes"""
+        tick = self.events.tick('42')
+        threading.Timer(0.05, self.events.notify, args=('42',)).start()
+        started = time.monotonic()
+        self.assertEqual(self.events.wait('42', tick, timeout=5), tick + 1)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_other_partitions_do_not_wake_stream(self):
+        """Test changes to another partition leave a stream asleep until its timeout"""
+        tick = self.events.tick(None)
+        self.events.notify('42')
+        self.assertEqual(self.events.wait(None, tick, timeout=0.05), tick)
+        self.assertEqual(self.events.tick('42'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
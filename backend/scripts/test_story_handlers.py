@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Handler Tests
+Drive wanderlog_ai end to end against a temporary local partition
+"""
+
+import unittest
+import json
+import os
+import sys
+import tempfile
+import threading
+import shutil
+from unittest.mock import patch
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, request
+
+from utils.story_partition import StoryPartition
+from utils.story_transfer import NDJSON_MIMETYPE
+
+main = None
+
+def setUpModule():
+    """Import the app from a scratch directory (it creates its local storage and user database on import)"""
+    global main
+    for name in ('GEMINI_API_KEY', 'TRAVEL_DATA_BUCKET', 'STORIES_BUCKET'):
+        os.environ.setdefault(name, 'test')
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        import main as app_main
+        main = app_main
+    finally:
+        os.chdir(cwd)
+
+class TestStoryHandlers(unittest.TestCase):
+    """Test story actions through the HTTP entry point"""
+
+    def setUp(self):
+        """Set up a partition that already holds stories but has no index yet"""
+        self.test_data_dir = tempfile.mkdtemp()
+        stories_dir = os.path.join(self.test_data_dir, 'stories')
+        os.makedirs(stories_dir)
+        self.partition = StoryPartition(None, local_root=stories_dir, country_mapper=main.country_mapper)
+        self.app = Flask(__name__)
+        for story_id, timestamp, country in [('jp', '20250101000000', 'Japan'), ('fr', '20250102000000', 'France'),
+                                             ('es', '20250103000000', 'Spain')]:
+            with open(os.path.join(stories_dir, f"{story_id}_{timestamp}.json"), 'w') as f:
+                json.dump({'country': country, 'title': f"Trip to {country}"}, f)
+        for patcher in (patch.object(main, 'story_partition_for', return_value=self.partition),
+                        patch.object(main.story_partitions, 'get', return_value=self.partition)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.test_data_dir, ignore_errors=True)
+
+    def call(self, body=None, **kwargs):
+        """POST to wanderlog_ai and decode its JSON reply"""
+        if body is not None:
+            kwargs['json'] = body
+        with self.app.test_request_context('/', method='POST', **kwargs):
+            response = main.wanderlog_ai(request)
+            return response.status_code, json.loads(response.get_data(as_text=True))
+
+    def open_events(self, query):
+        """GET /events and read the whole stream (it ends at once with STORY_EVENTS_MAX_SECONDS = 0)"""
+        with patch.object(main, 'STORY_EVENTS_MAX_SECONDS', 0), \
+                self.app.test_request_context(f'/events{query}', method='GET'):
+            response = main.wanderlog_ai(request)
+            body = response.get_data(as_text=True)
+            response.close()
+            return response.status_code, body
+
+    def listed_countries(self):
+        """Countries of the summary listing (served from the story index)"""
+        _, listing = self.call({'action': 'get_stories', 'view': 'summary'})
+        return sorted(story['country'] for story in listing['stories'])
+
+    def test_delete_before_first_listing_keeps_other_stories(self):
+        """Test a country delete on an unindexed partition doesn't hide the remaining stories"""
+        _, deleted = self.call({'action': 'delete_stories_by_country', 'country_name': 'Spain'})
+        self.assertEqual(deleted['deleted_count'], 1)
+        self.assertEqual(self.listed_countries(), ['France', 'Japan'])
+        _, visited = self.call({'action': 'get_visited_countries'})
+        self.assertEqual(visited['visited_countries'], ['FR', 'JP'])
+
+    def test_delete_before_first_search_keeps_other_stories_searchable(self):
+        """Test a country delete on a partition without a search index doesn't hide the remaining stories from search"""
+        self.call({'action': 'delete_stories_by_country', 'country_name': 'Spain'})
+        _, found = self.call({'action': 'search_stories', 'query': 'trip'})
+        self.assertEqual(sorted(story['country'] for story in found['stories']), ['France', 'Japan'])
+
+    def test_saves_reach_search_in_the_background(self):
+        """Test a saved story becomes searchable once the background indexer has caught up"""
+        self.call({'action': 'search_stories', 'query': 'trip'})
+        self.call({'action': 'save_story', 'story_data': {'country': 'Peru', 'title': 'Ceviche in Lima'}})
+        main.search_indexer.flush()
+        _, found = self.call({'action': 'search_stories', 'query': 'ceviche'})
+        self.assertEqual([story['country'] for story in found['stories']], ['Peru'])
+
+    def test_idempotency_key_reused_for_different_content_conflicts(self):
+        """Test a retried save is a duplicate, but the same key with edited content is refused rather than dropped"""
+        story = {'country': 'Peru', 'title': 'Lima'}
+        status, saved = self.call({'action': 'save_story', 'story_data': story, 'idempotency_key': 'draft-1'})
+        self.assertEqual(status, 200, saved)
+        status, retried = self.call({'action': 'save_story', 'story_data': story, 'idempotency_key': 'draft-1'})
+        self.assertEqual((status, retried['duplicate'], retried['story_id']), (200, True, saved['story_id']))
+
+        edited = {'country': 'Peru', 'title': 'Lima and Cusco'}
+        status, conflict = self.call({'action': 'save_story', 'story_data': edited, 'idempotency_key': 'draft-1'})
+        self.assertEqual(status, 409, conflict)
+        self.assertEqual(self.listed_countries(), ['France', 'Japan', 'Peru', 'Spain'])
+
+    def test_save_before_first_listing_keeps_other_stories(self):
+        """Test the first save on an unindexed partition lists alongside the older stories"""
+        status, saved = self.call({'action': 'save_story', 'story_data': {'country': 'Peru', 'title': 'Lima'}})
+        self.assertEqual(status, 200, saved)
+        self.assertEqual(self.listed_countries(), ['France', 'Japan', 'Peru', 'Spain'])
+
+    def test_import_before_first_listing_keeps_other_stories(self):
+        """Test the first NDJSON import on an unindexed partition lists alongside the older stories"""
+        line = json.dumps({'name': 'pe_20250104000000.json', 'story': {'country': 'Peru', 'title': 'Lima'}})
+        status, summary = self.call(data=line + '\n', content_type=NDJSON_MIMETYPE)
+        self.assertEqual((status, summary['imported']), (200, 1), summary)
+        self.assertEqual(self.listed_countries(), ['France', 'Japan', 'Peru', 'Spain'])
+
+    def test_map_statistics_count_stories_without_iso_code(self):
+        """Test total_stories counts every story, not just the ones a country aggregate holds"""
+        self.call({'action': 'save_story', 'story_data': {'country': 'Atlantis', 'title': 'Lost city'}})
+        _, stats = self.call({'action': 'get_map_statistics'})
+        self.assertEqual(stats['total_stories'], 4)
+        self.assertEqual(sum(stats['stories_per_country'].values()), 3)
+
+    def test_listings_without_a_store_version_are_tagged_by_content(self):
+        """Test version 0 (no index written) doesn't pin the ETag, so changed listings aren't answered 304"""
+        def get(etag=None):
+            headers = {'If-None-Match': etag} if etag else {}
+            with self.app.test_request_context('/', method='POST', json={'action': 'get_stories', 'view': 'summary'},
+                                               headers=headers):
+                response = main.wanderlog_ai(request)
+                return response.status_code, response.get_etag()[0]
+
+        with patch.object(self.partition.store, 'version', return_value=0):
+            status, etag = get()
+            self.assertEqual(status, 200)
+            self.assertEqual(get(etag), (304, etag))
+            self.call({'action': 'save_story', 'story_data': {'country': 'Peru', 'title': 'Lima'}})
+            status, changed = get(etag)
+            self.assertEqual(status, 200)
+            self.assertNotEqual(changed, etag)
+
+    def test_full_sync_snapshot_comes_from_the_cached_scan(self):
+        """Test a get_stories_since reset serves full stories from the shared scan, not one read per story"""
+        with patch.object(self.partition.store, 'read_many', side_effect=AssertionError("per-story reads")):
+            _, snapshot = self.call({'action': 'get_stories_since'})
+            self.assertTrue(snapshot['reset'])
+            self.assertEqual([story['story_id'] for story in snapshot['stories']], ['es', 'fr', 'jp'])
+            self.assertEqual(snapshot['stories'][0]['title'], 'Trip to Spain')
+            misses = self.partition.cache.misses
+            _, again = self.call({'action': 'get_stories_since', 'fields': 'title'})
+            self.assertEqual(again['stories'][0], {'title': 'Trip to Spain', 'story_id': 'es'})
+            self.assertEqual(self.partition.cache.misses, misses)
+
+    def test_event_streams_open_with_a_stream_token_only(self):
+        """Test /events takes a signed stream token (not a session token) and releases its slot when done"""
+        _, issued = self.call({'action': 'get_stream_token', 'session_token': 'session'})
+        status, body = self.open_events(f"?stream_token={issued['stream_token']}")
+        self.assertEqual(status, 200)
+        self.assertIn('event: ready', body)
+        self.assertEqual(self.open_events('?stream_token=forged')[0], 401)
+
+        with patch.object(main, 'story_stream_slots', threading.BoundedSemaphore(1)) as slots:
+            self.assertEqual(self.open_events(f"?stream_token={issued['stream_token']}")[0], 200)
+            # The finished stream gave its slot back; holding it leaves none for the next stream
+            self.assertTrue(slots.acquire(blocking=False))
+            self.assertEqual(self.open_events(f"?stream_token={issued['stream_token']}")[0], 503)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Index Tests
+"""
+
+import unittest
+import json
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_index import CHANGE_LOG_SIZE, StoryIndex, build_hash_index, build_summary_row, filter_rows, has_valid_country, idempotent_story_id, is_summary_projection, matches_country, paginate_rows, parse_fields, parse_filters, parse_story_name, project_story, scan_gcs_summaries, scan_local_stories, story_content_hash, summary_metadata, summary_row_from_blob
+
+class FakeBlob:
+    """Listed story blob with optional custom metadata"""
+
+    def __init__(self, name, story, metadata=None):
+        self.name = name
+        self.story = story
+        self.metadata = metadata
+        self.size = len(json.dumps(story))
+        self.downloaded = False
+
+    def download_as_bytes(self, timeout=None, raw_download=False):
+        self.downloaded = True
+        return json.dumps(self.story).encode('utf-8')
+
+class FakeBucket:
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    def list_blobs(self, prefix='', delimiter=None):
+        return [blob for blob in self.blobs if blob.name.startswith(prefix)
+                and not (delimiter and delimiter in blob.name[len(prefix):])]
+
+class TestStoryIndex(unittest.TestCase):
+    """Test the story summary index"""
+
+    def setUp(self):
+        """Set up a temporary story directory"""
+        self.test_data_dir = tempfile.mkdtemp()
+        self.stories_dir = os.path.join(self.test_data_dir, 'stories')
+        os.makedirs(self.stories_dir)
+        self.index = StoryIndex(local_path=os.path.join(self.test_data_dir, 'story_index.json'))
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.test_data_dir, ignore_errors=True)
+
+    def _write_story(self, story_id, timestamp, story):
+        filename = f"{story_id}_{timestamp}.json"
+        with open(os.path.join(self.stories_dir, filename), 'w') as f:
+            json.dump(story, f)
+        return filename
+
+    def test_parse_story_name(self):
+        """Test story id and timestamp come from the blob name"""
+        self.assertEqual(parse_story_name('stories/abc-123_20250101120000.json'), ('abc-123', '20250101120000'))
+        self.assertIsNone(parse_story_name('stories/notes.json'))
+
+    def test_summary_row(self):
+        """Test summary rows carry the listing fields only"""
+        story = {'country': 'Japan', 'cities': ['Kyoto'], 'narrative': 'x' * 1000, 'photos': ['data:...']}
+        row = build_summary_row('stories/s1_20250101120000.json', story, 1234, self.index.country_mapper)
+        self.assertEqual(row['story_id'], 's1')
+        self.assertEqual(row['iso_code'], 'JP')
+        self.assertEqual(row['cities'], ['Kyoto'])
+        self.assertEqual(row['size'], 1234)
+        self.assertNotIn('narrative', row)
+        self.assertNotIn('title', row)
+
+    def test_content_hash_and_hash_index(self):
+        """Test identical stories hash alike whatever the key order, and the hash index finds them"""
+        story = {'country': 'Japan', 'cities': ['Kyoto'], 'narrative': 'Temples'}
+        reordered = {'narrative': 'Temples', 'cities': ['Kyoto'], 'country': 'Japan'}
+        self.assertEqual(story_content_hash(story), story_content_hash(reordered))
+        self.assertNotEqual(story_content_hash(story), story_content_hash({**story, 'narrative': 'Shrines'}))
+        self.assertEqual(idempotent_story_id('key-1'), idempotent_story_id('key-1'))
+        self.assertNotEqual(idempotent_story_id('key-1'), idempotent_story_id('key-2'))
+
+        self.index.rebuild([])
+        self.index.add('s1_20250101000000.json', story, 10)
+        hashes = build_hash_index(self.index.rows())
+        self.assertEqual(hashes[story_content_hash(reordered)]['name'], 's1_20250101000000.json')
+        self.assertEqual(hashes['s1']['name'], 's1_20250101000000.json')
+
+    def test_missing_index_returns_none(self):
+        """Test an unbuilt index is distinguishable from an empty one"""
+        self.assertIsNone(self.index.rows())
+        self.index.rebuild([])
+        self.assertEqual(self.index.rows(), [])
+
+    def test_incremental_updates(self):
+        """Test add/remove keep the manifest in sync and sorted newest first"""
+        self.index.rebuild([])
+        self.index.add('s1_20240101000000.json', {'country': 'France'}, 10)
+        self.index.add('s2_20250101000000.json', {'country': 'Italy'}, 20)
+        self.assertEqual([row['story_id'] for row in self.index.rows()], ['s2', 's1'])
+
+        self.index.remove(['s2'])
+        self.assertEqual([row['story_id'] for row in self.index.rows()], ['s1'])
+
+    def test_store_version_increases_on_every_change(self):
+        """Test the store version (used for ETags) only ever goes up"""
+        self.assertEqual(self.index.store_version(), 0)
+        self.index.rebuild([])
+        self.index.add('s1_20240101000000.json', {'country': 'France'}, 10)
+        self.assertEqual(self.index.store_version(), 2)
+        self.assertEqual(self.index.store_version(), 2)
+        self.index.remove(['s1'])
+        self.index.rebuild([])
+        self.assertEqual(self.index.store_version(), 4)
+
+    def test_updates_leave_an_unbuilt_index_unbuilt(self):
+        """Test saves and deletes before the first build don't write a manifest that hides older stories"""
+        self._write_story('s1', '20240101000000', {'country': 'France'})
+        self.index.add('s2_20250101000000.json', {'country': 'Italy'}, 10)
+        self.index.add_many([('s3_20250102000000.json', {'country': 'Peru'}, 10)])
+        self.index.remove(['s1'])
+        self.assertIsNone(self.index.rows())
+        self.assertIsNone(self.index.country_aggregates())
+        self.assertEqual(self.index.store_version(), 0)
+
+    def test_rebuild_keeps_updates_made_during_its_scan(self):
+        """Test a save and a delete that land while the first rebuild scans end up in the manifest it writes"""
+        def scan():
+            yield build_summary_row('s1_20240101000000.json', {'country': 'France'}, 10, self.index.country_mapper)
+            # Saved after the scan listed it (skipped by add: no manifest yet), deleted after it was scanned
+            self.index.add('s2_20250101000000.json', {'country': 'Italy'}, 10)
+            self.index.remove(['s1'])
+            yield build_summary_row('s3_20250102000000.json', {'country': 'Peru'}, 10, self.index.country_mapper)
+
+        self.index.rebuild_from_rows(scan())
+        self.assertEqual([row['story_id'] for row in self.index.rows()], ['s3', 's2'])
+        self.assertEqual(sorted(self.index.country_aggregates()), ['IT', 'PE'])
+        # Once the rebuild is done, updates go straight to the manifest again
+        self.index.remove(['s2'])
+        self.index.rebuild_from_rows(iter(self.index.rows()))
+        self.assertEqual([row['story_id'] for row in self.index.rows()], ['s3'])
+
+    def test_change_log(self):
+        """Test saves and deletes are logged by store version, and rebuilds or trimming force a snapshot"""
+        self.assertIsNone(self.index.changes_since(0))
+        self.index.rebuild([])
+        self.index.add('s1_20240101000000.json', {'country': 'France'}, 10)
+        self.index.add_many([('s2_20250101000000.json', {'country': 'Italy'}, 20), ('s3_20250102000000.json', {'country': 'Peru'}, 30)])
+        self.index.remove(['s1', 'missing'])
+        changes, sequence = self.index.changes_since(2)
+        self.assertEqual(sequence, 4)
+        self.assertEqual([(change['seq'], change['op'], change['story_id']) for change in changes],
+                         [(3, 'save', 's2'), (3, 'save', 's3'), (4, 'delete', 's1')])
+        self.assertEqual(self.index.changes_since(4), ([], 4))
+
+        self.index.rebuild([])
+        self.assertIsNone(self.index.changes_since(4))
+        self.assertEqual(self.index.changes_since(5), ([], 5))
+
+        self.index.add_many((f's{n}_20250101000000.json', {'country': 'Peru'}, 1) for n in range(CHANGE_LOG_SIZE))
+        self.index.add('last_20250101000000.json', {'country': 'Peru'}, 1)
+        self.assertIsNone(self.index.changes_since(5))
+        changes, sequence = self.index.changes_since(6)
+        self.assertEqual([change['story_id'] for change in changes], ['last'])
+
+    def test_rebuild_from_scan(self):
+        """Test rebuilding the index from a full directory scan"""
+        self._write_story('s1', '20240101000000', {'country': 'France', 'title': 'Paris'})
+        self._write_story('s2', '20250101000000', {'country': 'undefined'})
+
+        self.assertEqual(self.index.rebuild(scan_local_stories(self.stories_dir)), 2)
+        rows = [row for row in self.index.rows() if has_valid_country(row)]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Paris')
+
+    def test_keyset_pagination(self):
+        """Test cursors walk every row exactly once, newest first"""
+        self.index.rebuild([])
+        for n in range(5):
+            self.index.add(f's{n}_2025010100000{n}.json', {'country': 'France'}, 10)
+        # Same timestamp: story_id breaks the tie
+        self.index.add('t9_20250101000004.json', {'country': 'Spain'}, 10)
+        rows = self.index.rows()
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = paginate_rows(rows, 2, cursor)
+            seen.extend(row['story_id'] for row in page)
+            if not cursor:
+                break
+        self.assertEqual(seen, ['t9', 's4', 's3', 's2', 's1', 's0'])
+
+        with self.assertRaises(ValueError):
+            paginate_rows(rows, 2, 'not-a-cursor')
+
+    def test_field_projection(self):
+        """Test fields options and which projections the index can serve"""
+        self.assertEqual(parse_fields('country, title'), ['country', 'title'])
+        self.assertIsNone(parse_fields(''))
+        self.assertTrue(is_summary_projection(['country', 'title']))
+        self.assertFalse(is_summary_projection(['country', 'narrative']))
+        self.assertFalse(is_summary_projection(None))
+
+        story = {'country': 'Japan', 'narrative': 'Ramen in Gion', 'photos': ['data:...']}
+        self.assertEqual(project_story(story, ['country', 'title']), {'country': 'Japan'})
+        self.assertIs(project_story(story, None), story)
+
+    def test_matches_country(self):
+        """Test country matching goes by ISO code, then by case-insensitive name"""
+        row = build_summary_row('stories/s1_20250101120000.json', {'country': 'USA'}, 0, self.index.country_mapper)
+        iso_code = self.index.country_mapper.get_iso_code('United States')
+        self.assertTrue(matches_country(row, 'United States', iso_code))
+        self.assertTrue(matches_country({'country': 'undefined'}, 'Undefined'))
+        self.assertFalse(matches_country(row, 'Canada', self.index.country_mapper.get_iso_code('Canada')))
+
+    def test_filters(self):
+        """Test country, ISO, visit_date range and city filters narrow summary rows"""
+        mapper = self.index.country_mapper
+        rows = [build_summary_row(name, story, 0, mapper) for name, story in [
+            ('kyoto_20250110120000.json', {'country': 'Japan', 'cities': ['Kyoto']}),
+            ('tokyo_20250301090000.json', {'country': 'Japan', 'cities': ['Tokyo', 'Nikkō']}),
+            ('lima_20250215000000.json', {'country': 'Peru', 'cities': ['Lima']}),
+        ]]
+        ids = lambda filters: [row['story_id'] for row in filter_rows(rows, parse_filters(filters, mapper))]
+        self.assertEqual(ids({'country': 'japan'}), ['kyoto', 'tokyo'])
+        self.assertEqual(ids({'iso_code': 'pe'}), ['lima'])
+        self.assertEqual(ids({'visit_date': {'from': '2025-02-01', 'to': '2025-03-01'}}), ['tokyo', 'lima'])
+        self.assertEqual(ids({'city': 'NIKKO'}), [])
+        self.assertEqual(ids({'city': 'nikkō', 'country': 'Japan'}), ['tokyo'])
+        self.assertIsNone(parse_filters({}, mapper))
+        with self.assertRaises(ValueError):
+            parse_filters({'visit_date': {'from': 'last week'}}, mapper)
+
+    def test_summary_metadata_round_trip(self):
+        """Test summary rows survive a trip through string-only blob metadata"""
+        name = 'stories/s1_20250101120000.json'
+        story = {'country': 'Japan', 'cities': ['Kyoto', 'Osaka'], 'title': 'Temples'}
+        row = build_summary_row(name, story, 0, self.index.country_mapper)
+        metadata = summary_metadata(row)
+        self.assertTrue(all(isinstance(value, str) for value in metadata.values()))
+
+        blob = FakeBlob(name, story, metadata)
+        self.assertEqual(summary_row_from_blob(blob), {**row, 'size': blob.size})
+        self.assertIsNone(summary_row_from_blob(FakeBlob(name, story)))
+
+    def test_scan_gcs_summaries_downloads_only_unsummarized(self):
+        """Test listing metadata is used and only blobs without it are downloaded"""
+        story = {'country': 'France'}
+        row = build_summary_row('stories/s1_20250101000000.json', story, 0, self.index.country_mapper)
+        summarized = FakeBlob('stories/s1_20250101000000.json', story, summary_metadata(row))
+        legacy = FakeBlob('stories/s2_20250102000000.json', {'country': 'Italy'})
+        bucket = FakeBucket([summarized, legacy, FakeBlob('stories/readme.txt', {})])
+
+        rows = list(scan_gcs_summaries(bucket, country_mapper=self.index.country_mapper))
+        self.assertEqual(sorted(row['country'] for row in rows), ['France', 'Italy'])
+        self.assertEqual([row['iso_code'] for row in rows if row['story_id'] == 's2'], ['IT'])
+        self.assertFalse(summarized.downloaded)
+        self.assertTrue(legacy.downloaded)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Mirror Tests
+"""
+
+import unittest
+import json
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_mirror import GCSStoryMirror
+
+class FakeBlob:
+    """Listed blob with a generation, as returned by list_blobs"""
+
+    def __init__(self, bucket, name, generation):
+        self.bucket = bucket
+        self.name = name
+        self.generation = generation
+        self.etag = f"etag-{generation}"
+        self.size = len(bucket.objects[name][1])
+
+    def download_as_bytes(self, timeout=None, raw_download=False):
+        self.bucket.downloads.append(self.name)
+        return self.bucket.objects[self.name][1].encode('utf-8')
+
+class FakeBucket:
+    """Just enough of a GCS bucket to list and download story blobs"""
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+        self.next_generation = 1
+
+    def put(self, name, story):
+        self.objects[name] = (self.next_generation, json.dumps(story))
+        self.next_generation += 1
+
+    def list_blobs(self, prefix='', delimiter=None):
+        return [FakeBlob(self, name, generation) for name, (generation, _) in sorted(self.objects.items())
+                if name.startswith(prefix) and not (delimiter and delimiter in name[len(prefix):])]
+
+class TestStoryMirror(unittest.TestCase):
+    """Test incremental, generation-aware story sync"""
+
+    def setUp(self):
+        """Set up a fake bucket with two stories"""
+        self.bucket = FakeBucket()
+        self.bucket.put('stories/s1_20250101000000.json', {'country': 'France'})
+        self.bucket.put('stories/s2_20250102000000.json', {'country': 'Italy'})
+        self.mirror = GCSStoryMirror(self.bucket)
+
+    def _countries(self, entries):
+        return sorted(story['country'] for _, story, _ in entries)
+
+    def test_cold_sync_downloads_everything(self):
+        """Test the first sync downloads every story blob"""
+        self.assertEqual(self._countries(self.mirror.sync()), ['France', 'Italy'])
+        self.assertEqual(len(self.bucket.downloads), 2)
+
+    def test_warm_sync_downloads_only_changes(self):
+        """Test unchanged blobs are not downloaded again and vanished blobs are dropped"""
+        self.mirror.sync()
+        self.bucket.downloads = []
+
+        self.assertEqual(len(self.mirror.sync()), 2)
+        self.assertEqual(self.bucket.downloads, [])
+
+        self.bucket.put('stories/s1_20250101000000.json', {'country': 'Spain'})
+        self.bucket.put('stories/s3_20250103000000.json', {'country': 'Japan'})
+        del self.bucket.objects['stories/s2_20250102000000.json']
+        self.assertEqual(self._countries(self.mirror.sync()), ['Japan', 'Spain'])
+        self.assertEqual(sorted(self.bucket.downloads), ['stories/s1_20250101000000.json', 'stories/s3_20250103000000.json'])
+        self.assertEqual((self.mirror.last_downloaded, self.mirror.last_removed), (2, 1))
+
+    def test_partitions_are_listed_separately(self):
+        """Test the shared mirror skips per-user partitions and a user mirror sees only its own stories"""
+        self.bucket.put('stories/42/s9_20250105000000.json', {'country': 'Peru'})
+        self.assertEqual(self._countries(self.mirror.sync()), ['France', 'Italy'])
+        self.assertEqual(self._countries(GCSStoryMirror(self.bucket, prefix='stories/42/').sync()), ['Peru'])
+
+if __name__ == '__main__':
+    unittest.main()
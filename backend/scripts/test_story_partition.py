@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Partition Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_index import INDEX_BLOB_NAME, scan_local_stories
+from utils.fake_gcs import FakeBucket
+from utils.story_partition import StoryPartition, StoryPartitions, partition_index_blob_name, partition_user_ids
+
+class TestStoryPartition(unittest.TestCase):
+    """Test per-user story partitioning"""
+
+    def setUp(self):
+        """Set up a temporary local story root"""
+        self.data_dir = tempfile.mkdtemp()
+        self.local_root = os.path.join(self.data_dir, 'stories')
+        os.makedirs(self.local_root)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_layout(self):
+        """Test user partitions get their own prefix, directory and index while the shared one is unchanged"""
+        shared = StoryPartition(None, local_root=self.local_root)
+        user = StoryPartition(42, local_root=self.local_root)
+
+        self.assertEqual(shared.blob_name('s1_20250101000000.json'), 'stories/s1_20250101000000.json')
+        self.assertEqual(user.blob_name('s1_20250101000000.json'), 'stories/42/s1_20250101000000.json')
+        self.assertEqual(shared.local_dir, self.local_root)
+        self.assertEqual(user.local_dir, os.path.join(self.local_root, '42'))
+        self.assertEqual(partition_index_blob_name(None), INDEX_BLOB_NAME)
+        self.assertEqual(partition_index_blob_name('42'), 'indexes/users/42/stories_index.json')
+
+    def test_indexes_are_independent(self):
+        """Test writes to one partition don't show up in (or change the version of) another"""
+        shared = StoryPartition(None, local_root=self.local_root)
+        user = StoryPartition('42', local_root=self.local_root)
+        user.index.rebuild([])
+        user.index.add('s1_20250101000000.json', {'country': 'France'}, 10)
+
+        self.assertEqual([row['country'] for row in user.index.rows()], ['France'])
+        self.assertIsNone(shared.index.rows())
+        self.assertEqual(shared.store.version(), 0)
+        self.assertGreater(user.store.version(), 0)
+
+    def test_shared_scan_skips_user_directories(self):
+        """Test the shared local scan doesn't pick up stories stored in user partitions"""
+        user = StoryPartition('42', local_root=self.local_root)
+        os.makedirs(user.local_dir)
+        with open(os.path.join(user.local_dir, 's1_20250101000000.json'), 'w') as f:
+            f.write('{"country": "France"}')
+
+        self.assertEqual(list(scan_local_stories(self.local_root)), [])
+        self.assertEqual([name for name, _, _ in scan_local_stories(user.local_dir)], ['s1_20250101000000.json'])
+
+    def test_summary_queries_agree_across_backends(self):
+        """Test index-backed stores and SQLite answer the same summary queries through the store"""
+        for backend in ('files', 'sqlite', 'memory'):
+            with self.subTest(backend=backend):
+                partition = StoryPartition(backend, local_root=os.path.join(self.data_dir, backend), backend=backend)
+                store = partition.store
+                names = {}
+                for story_id, country in (('jp', 'Japan'), ('fr', 'France'), ('jp2', ' japan ')):
+                    story = {'country': country}
+                    names[story_id], size = store.write(f"{story_id}_2025010{len(names) + 1}000000.json", story)
+                    if not store.maintains_index:
+                        if partition.index.rows() is None:
+                            # Country deletes work before the index is first built
+                            self.assertEqual(store.names_for_country('JAPAN'), [names['jp']])
+                            partition.index.rebuild([])
+                        partition.index.add(names[story_id], story, size)
+
+                self.assertEqual(store.version(), 3 if store.maintains_index else 4)
+                self.assertEqual(store.story_count(), 3)
+                self.assertEqual([row['story_id'] for row in store.rows()], ['jp2', 'fr', 'jp'])
+                self.assertEqual(sorted(store.country_aggregates()), ['FR', 'JP'])
+                self.assertEqual(sorted(store.names_for_country('Japan', 'JP')), sorted([names['jp'], names['jp2']]))
+                self.assertEqual(store.names_for_ids(['fr', 'missing']), {'fr': names['fr']})
+                self.assertEqual(store.find(content_hash=store.find('fr')['content_hash'])['story_id'], 'fr')
+                self.assertEqual([change['story_id'] for change in store.changes_since(store.version() - 1)[0]], ['jp2'])
+
+    def test_user_partitions_are_listed(self):
+        """Test maintenance scripts find every user partition, locally and in the bucket"""
+        StoryPartition('42', local_root=self.local_root).store.write('s1_20250101000000.json', {'country': 'France'})
+        StoryPartition('7', local_root=self.local_root, backend='sqlite')
+        self.assertEqual(partition_user_ids(local_root=self.local_root), ['42', '7'])
+
+        bucket = FakeBucket()
+        for user_id in (None, '42', '42', '9'):
+            StoryPartition(user_id, bucket=bucket, local_root=self.local_root).store.write(
+                f"s{len(bucket)}_20250101000000.json", {'country': 'France'})
+        self.assertEqual(partition_user_ids(bucket), ['42', '9'])
+
+    def test_partitions_are_reused_and_evicted(self):
+        """Test partitions are opened once and the least recently used ones are dropped"""
+        opened = []
+        def factory(user_id):
+            opened.append(user_id)
+            return StoryPartition(user_id, local_root=self.local_root)
+        partitions = StoryPartitions(factory, max_open=2)
+
+        self.assertIs(partitions.get(), partitions.shared)
+        first = partitions.get(1)
+        self.assertIs(partitions.get('1'), first)
+        partitions.get(2)
+        partitions.get(1)
+        partitions.get(3)
+        partitions.get(2)
+        self.assertEqual(opened, [None, '1', '2', '3', '2'])
+
+    def test_busy_partitions_are_not_evicted(self):
+        """Test partitions with queued uploads or a save in progress outlive the LRU limit until they go idle"""
+        partitions = StoryPartitions(lambda user_id: StoryPartition(user_id, local_root=self.local_root), max_open=1)
+        queued = partitions.get(1)
+        queued.pending_saves['s1'] = ('stories/1/s1_20250101000000.json', 'hash')
+        saving = partitions.get(2)
+        with saving.save_lock:
+            partitions.get(3)
+            self.assertIs(partitions.get(1), queued)
+            self.assertIs(partitions.get(2), saving)
+
+        queued.pending_saves.clear()
+        partitions.get(4)
+        self.assertIsNot(partitions.get(1), queued)
+        self.assertIsNot(partitions.get(2), saving)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Record Tests
+"""
+
+import unittest
+import json
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.map_country_mapping import CountryMapper
+from utils.story_index import build_hash_index, build_summary_row, filter_rows, paginate_rows, parse_filters, project_story
+from utils.story_record import StoryRecord, compact_story
+
+class TestStoryRecord(unittest.TestCase):
+    """Test compact cached story records"""
+
+    def setUp(self):
+        self.mapper = CountryMapper()
+        self.rows = [build_summary_row(name, story, 100, self.mapper) for name, story in [
+            ('stories/kyoto_20250110120000.json', {'country': 'Japan', 'cities': ['Kyoto'], 'title': 'Temples'}),
+            ('stories/tokyo_20250301090000.json', {'country': 'Japan', 'cities': ['Tokyo', 'Nikkō']}),
+            ('lima_20250215000000.json', {'country': 'Peru'}),
+        ]]
+        # Newest first, like the index keeps them
+        self.rows.sort(key=lambda row: row['timestamp'], reverse=True)
+        self.records = [StoryRecord(row) for row in self.rows]
+
+    def test_reads_like_the_row(self):
+        """Test a record has the row's fields, leaves out absent ones and serializes the same"""
+        for row, record in zip(self.rows, self.records):
+            self.assertEqual(record['name'], row['name'])
+            self.assertEqual(sorted(record), sorted(row))
+            self.assertEqual(json.loads(json.dumps(project_story(record, None))), json.loads(json.dumps(row)))
+        lima = self.records[1]
+        self.assertIsNone(lima.get('title'))
+        self.assertNotIn('title', lima)
+        self.assertEqual(lima.get('cities'), ())
+        with self.assertRaises(KeyError):
+            lima['narrative']
+        self.assertEqual(project_story(self.records[2], ['country', 'story_id']), {'country': 'Japan', 'story_id': 'kyoto'})
+        self.assertFalse(hasattr(lima, '__dict__'))
+
+    def test_index_helpers_accept_records(self):
+        """Test filtering, pagination and the hash index give the same answers over records"""
+        filters = parse_filters({'country': 'japan', 'city': 'nikkō'}, self.mapper)
+        self.assertEqual([row['story_id'] for row in filter_rows(self.records, filters)], ['tokyo'])
+        page, cursor = paginate_rows(self.records, 2)
+        self.assertEqual(paginate_rows(self.records, 2, cursor)[0], self.records[2:])
+        self.assertIs(build_hash_index(self.records)['lima'], self.records[1])
+
+    def test_repeated_strings_are_shared(self):
+        """Test records and compacted stories share one copy of repeated strings"""
+        first, second = (StoryRecord(json.loads(json.dumps(row))) for row in (self.rows[0], self.rows[2]))
+        self.assertIs(first.country, second.country)
+        self.assertIs(first.iso_code, second.iso_code)
+
+        story = {'country': 'Japan', 'cities': ['Kyoto'], 'narrative': 'Temples'}
+        a, b = compact_story(json.loads(json.dumps(story))), compact_story(json.loads(json.dumps(story)))
+        self.assertEqual(a, story)
+        self.assertIs(a['country'], b['country'])
+        self.assertIs(a['cities'][0], b['cities'][0])
+        self.assertIs(next(iter(a)), next(iter(b)))
+
+if __name__ == '__main__':
+    unittest.main()
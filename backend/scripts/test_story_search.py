@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Search Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_search import SearchIndex, SearchIndexer, story_terms, tokenize
+
+class TestStorySearch(unittest.TestCase):
+    """Test the BM25 story search index"""
+
+    def setUp(self):
+        """Set up a local search index with a few stories"""
+        self.data_dir = tempfile.mkdtemp()
+        self.index = SearchIndex(local_path=os.path.join(self.data_dir, 'search_index.json'))
+        self.index.rebuild([
+            ('kyoto_20250101000000.json', {'title': 'Kyoto nights', 'cities': ['Kyoto'],
+                                           'narrative': 'We walked through Gion and ate ramen twice.'}, 10),
+            ('tokyo_20250102000000.json', {'cities': ['Tokyo'], 'narrative': 'Ramen, ramen and more ramen in Shinjuku.',
+                                           'user_answers': ['The best ramen was at a tiny counter']}, 10),
+            ('paris_20250103000000.json', {'cities': ['Paris'], 'narrative': 'Croissants by the Seine.'}, 10),
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_tokenize_folds_case_and_accents(self):
+        """Test tokens are lowercased and accent-folded"""
+        self.assertEqual(tokenize('Café in Gïon!'), ['cafe', 'in', 'gion'])
+        self.assertEqual(story_terms({'title': 'Gion', 'user_answers': {'q1': 'gion'}})['gion'], 3)
+
+    def test_ranking(self):
+        """Test BM25 ranks the story that mentions a term most first and ignores non-matches"""
+        results = self.index.search('ramen')
+        self.assertEqual([result['story_id'] for result in results], ['tokyo', 'kyoto'])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual(self.index.search('gion')[0]['name'], 'kyoto_20250101000000.json')
+        self.assertEqual(self.index.search('sushi'), [])
+        self.assertEqual(len(self.index.search('ramen', limit=1)), 1)
+
+    def test_remove_and_reindex(self):
+        """Test deleted stories drop out and re-saved stories replace their old terms"""
+        self.index.remove(['tokyo'])
+        self.assertEqual([result['story_id'] for result in self.index.search('ramen')], ['kyoto'])
+        self.index.add('kyoto_20250101000000.json', {'narrative': 'Only temples this time'})
+        self.assertEqual(self.index.search('ramen'), [])
+        self.assertEqual(self.index.search('temples')[0]['story_id'], 'kyoto')
+
+    def test_updates_leave_an_unbuilt_index_unbuilt(self):
+        """Test saves and deletes before the first search don't write an index that hides older stories"""
+        unbuilt = SearchIndex(local_path=os.path.join(self.data_dir, 'unbuilt.json'))
+        unbuilt.remove(['tokyo'])
+        unbuilt.add('lima_20250104000000.json', {'narrative': 'Ceviche in Lima'})
+        self.assertFalse(unbuilt.exists())
+        self.assertIsNone(unbuilt.search('ramen'))
+
+    def test_persisted_and_rebuilt(self):
+        """Test a fresh instance reads the stored index and rebuild replaces its contents"""
+        reopened = SearchIndex(local_path=self.index.local_path)
+        self.assertEqual(len(reopened.search('ramen')), 2)
+        self.assertIsNone(SearchIndex(local_path=os.path.join(self.data_dir, 'missing.json')).search('ramen'))
+
+        count = reopened.rebuild([('lima_20250104000000.json', {'narrative': 'Ceviche in Lima'}, 10)])
+        self.assertEqual(count, 1)
+        self.assertEqual(self.index.search('ramen'), [])
+        self.assertEqual(self.index.search('ceviche')[0]['story_id'], 'lima')
+
+    def test_background_indexer_batches_in_order(self):
+        """Test queued updates are applied in order with one index write per run of the same operation"""
+        writes = []
+        add_many, remove = self.index.add_many, self.index.remove
+        self.index.add_many = lambda entries: (writes.append('add'), add_many(entries))
+        self.index.remove = lambda story_ids: (writes.append('remove'), remove(story_ids))
+        SearchIndexer.apply([
+            (self.index, 'add', [('lima_20250104000000.json', {'narrative': 'Ceviche in Lima'})]),
+            (self.index, 'add', [('cusco_20250105000000.json', {'narrative': 'Ceviche in Cusco'})]),
+            (self.index, 'remove', ['lima']),
+            (self.index, 'add', [('lima_20250104000000.json', {'narrative': 'Pisco in Lima'})]),
+        ])
+        self.assertEqual(writes, ['add', 'remove', 'add'])
+        self.assertEqual([result['story_id'] for result in self.index.search('ceviche')], ['cusco'])
+        self.assertEqual(self.index.search('pisco')[0]['story_id'], 'lima')
+
+        indexer = SearchIndexer()
+        indexer.start()
+        indexer.remove(self.index, ['kyoto', 'tokyo'])
+        indexer.flush()
+        self.assertEqual(self.index.search('ramen'), [])
+
+if __name__ == '__main__':
+    unittest.main()
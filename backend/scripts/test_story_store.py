@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Store Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from google.api_core.exceptions import NotFound, PreconditionFailed, ServiceUnavailable
+
+from utils.fake_gcs import FakeBucket
+from utils.sqlite_story_store import SQLiteStoryStore
+from utils.story_codec import StoryCodec
+from utils.story_partition import StoryPartition
+from utils.story_store import GCSStoryStore, LocalFileStoryStore, MemoryStoryStore
+
+class TestStoryStore(unittest.TestCase):
+    """Test every story store honours the same contract, and the fake GCS bucket behind the GCS one"""
+
+    def setUp(self):
+        """Set up one store of each kind"""
+        self.test_data_dir = tempfile.mkdtemp()
+        self.stores = {
+            'files': LocalFileStoryStore(os.path.join(self.test_data_dir, 'stories')),
+            'sqlite': SQLiteStoryStore(os.path.join(self.test_data_dir, 'stories.db')),
+            'memory': MemoryStoryStore(),
+            'gcs': GCSStoryStore(FakeBucket(), prefix='stories/', codec=StoryCodec('gzip')),
+        }
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.test_data_dir, ignore_errors=True)
+
+    def test_contract(self):
+        """Test write, read, read_many, names, scan, summaries and remove on every store"""
+        for kind, store in self.stores.items():
+            with self.subTest(store=kind):
+                paris, _ = store.write('paris_20250101000000.json', {'country': 'France', 'title': 'Paris'})
+                kyoto, size = store.write('kyoto_20250102000000.json', {'country': 'Japan', 'title': 'Kyoto'})
+                self.assertGreater(size, 0)
+                self.assertEqual(store.read(kyoto)['title'], 'Kyoto')
+                self.assertEqual(sorted(store.names()), sorted([paris, kyoto]))
+
+                results = list(store.read_many([kyoto, 'missing_20250101000000.json', paris]))
+                self.assertEqual([name for name, _, _ in results], [kyoto, 'missing_20250101000000.json', paris])
+                self.assertEqual(results[0][1]['title'], 'Kyoto')
+                self.assertIsNotNone(results[1][2])
+
+                self.assertEqual(sorted(story['title'] for _, story, _ in store.scan()), ['Kyoto', 'Paris'])
+                self.assertEqual(sorted(row['story_id'] for row in store.scan_summaries()), ['kyoto', 'paris'])
+
+                deleted, failed = store.remove([paris])
+                self.assertEqual((deleted, failed), ([paris], []))
+                self.assertEqual(store.names(), [kyoto])
+                with self.assertRaises((FileNotFoundError, NotFound)):
+                    store.read(paris)
+
+    def test_gcs_store_writes_metadata_and_skips_sub_partitions(self):
+        """Test GCS blobs carry summary metadata and listings stay out of per-user prefixes"""
+        store = self.stores['gcs']
+        name, _ = store.write('paris_20250101000000.json', {'country': 'France', 'title': 'Paris'})
+        GCSStoryStore(store.bucket, prefix='stories/42/').write('lima_20250101000000.json', {'country': 'Peru'})
+        blob = store.bucket.get_blob(name)
+        self.assertEqual(blob.content_encoding, 'gzip')
+        self.assertEqual(blob.metadata['title'], 'Paris')
+        self.assertEqual(store.names(), ['stories/paris_20250101000000.json'])
+        self.assertTrue(store.url(name).endswith(f"/fake-bucket/{name}"))
+
+    def test_fake_bucket_preconditions(self):
+        """Test generation preconditions and pinned downloads behave like GCS"""
+        bucket = FakeBucket()
+        blob = bucket.blob('indexes/a.json')
+        blob.upload_from_string('1', if_generation_match=0)
+        with self.assertRaises(PreconditionFailed):
+            bucket.blob('indexes/a.json').upload_from_string('2', if_generation_match=0)
+        listed = bucket.list_blobs(prefix='indexes/')[0]
+        bucket.blob('indexes/a.json').upload_from_string('3', if_generation_match=blob.generation)
+        with self.assertRaises(NotFound):
+            listed.download_as_bytes()
+        self.assertEqual(bucket.get_blob('indexes/a.json').download_as_text(), '3')
+        self.assertEqual(bucket.requests['upload'], 3)
+
+    def test_fake_bucket_failures_are_reproducible(self):
+        """Test injected failures depend only on the seed, operation, name and attempt"""
+        def outcomes(seed):
+            bucket = FakeBucket(failure_rate=0.5, seed=seed)
+            results = []
+            for n in range(20):
+                try:
+                    bucket.blob(f"s{n % 4}.json").upload_from_string('{}')
+                    results.append(True)
+                except ServiceUnavailable:
+                    results.append(False)
+            return results
+
+        self.assertEqual(outcomes(7), outcomes(7))
+        self.assertIn(False, outcomes(7))
+        self.assertIn(True, outcomes(7))
+
+    def test_partition_over_fake_gcs(self):
+        """Test a partition's index, mirror and store run unchanged against the fake bucket"""
+        bucket = FakeBucket()
+        partition = StoryPartition('42', bucket=bucket, local_root=os.path.join(self.test_data_dir, 'stories'))
+        name, size = partition.store.write('paris_20250101000000.json', {'country': 'France', 'title': 'Paris'})
+        self.assertEqual(name, 'stories/42/paris_20250101000000.json')
+        partition.index.rebuild([])
+        partition.index.add(name, {'country': 'France', 'title': 'Paris'}, size)
+        self.assertEqual([row['name'] for row in partition.index.rows()], [name])
+        self.assertEqual(partition.store.version(), 2)
+        self.assertEqual(len(partition.store.scan()), 1)
+        self.assertEqual(partition.mirror.last_downloaded, 1)
+        partition.store.scan()
+        self.assertEqual(partition.mirror.last_downloaded, 0)
+        self.assertIsInstance(partition.fallback_store, LocalFileStoryStore)
+
+    def test_index_reads_retry_when_replaced_mid_read(self):
+        """Test index reads and updates retry when another instance rewrites the manifest between lookup and download"""
+        bucket = FakeBucket()
+        partition = StoryPartition('42', bucket=bucket, local_root=os.path.join(self.test_data_dir, 'stories'))
+        other = StoryPartition('42', bucket=bucket, local_root=os.path.join(self.test_data_dir, 'other'))
+        partition.index.rebuild([])
+        get_blob = bucket.get_blob
+        # Races let through so far, and how many to allow
+        races, armed = [], [1]
+
+        def racing_get_blob(name, *args, **kwargs):
+            blob = get_blob(name, *args, **kwargs)
+            if name == partition.index.blob_name and len(races) < armed[0]:
+                # Another instance writes after this handle's generation was read
+                races.append(name)
+                other.index.add(f"s{len(races)}_20250101000000.json", {'country': 'France'}, 10)
+            return blob
+        bucket.get_blob = racing_get_blob
+
+        self.assertEqual([row['story_id'] for row in partition.index.rows()], ['s1'])
+        armed[0] = 2
+        partition.index.add('s9_20250101000000.json', {'country': 'Peru'}, 10)
+        self.assertEqual(len(races), 2)
+        self.assertEqual(sorted(row['story_id'] for row in partition.index.rows()), ['s1', 's2', 's9'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Transfer Tests
+"""
+
+import unittest
+import json
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.blob_fetcher import BlobFetcher
+from utils.story_transfer import export_lines, import_lines, rows_from_names, story_checksum
+
+class TestStoryTransfer(unittest.TestCase):
+    """Test NDJSON export and import"""
+
+    def setUp(self):
+        """Set up a small corpus keyed by file name"""
+        self.fetcher = BlobFetcher(max_workers=2)
+        self.stories = {
+            f's{i}_2025010{i}000000.json': {'country': 'France', 'city': f'City {i}'} for i in range(1, 5)
+        }
+        self.rows = rows_from_names(list(self.stories) + ['index.json'])
+
+    def tearDown(self):
+        self.fetcher.shutdown()
+
+    def _export(self, cursor=None, limit=None):
+        lines = list(export_lines(self.rows, self.stories.__getitem__, cursor, limit, fetcher=self.fetcher))
+        return [json.loads(line) for line in lines]
+
+    def test_export_round_trip(self):
+        """Test an export re-imports into an identical corpus and reports completion"""
+        lines = list(export_lines(self.rows, self.stories.__getitem__, fetcher=self.fetcher))
+        self.assertEqual(json.loads(lines[-1]), {'end': True, 'count': 4, 'next_cursor': None})
+
+        imported, batches = {}, []
+        def write(name, story):
+            imported[name] = story
+            return name, 10
+        summary = import_lines(lines, write, batches.append, fetcher=self.fetcher)
+
+        self.assertEqual(imported, self.stories)
+        self.assertEqual((summary['imported'], summary['failed'], summary['complete']), (4, 0, True))
+        self.assertEqual(sum(len(batch) for batch in batches), 4)
+
+    def test_export_resumes_from_cursor(self):
+        """Test a limited export hands back a cursor that continues where it stopped"""
+        first = self._export(limit=3)
+        self.assertEqual([record['name'] for record in first[:-1]],
+                         ['s4_20250104000000.json', 's3_20250103000000.json', 's2_20250102000000.json'])
+        rest = self._export(cursor=first[-1]['next_cursor'])
+        self.assertEqual([record['name'] for record in rest[:-1]], ['s1_20250101000000.json'])
+        self.assertEqual(self._export(cursor=first[1]['cursor'])[0]['name'], 's2_20250102000000.json')
+
+    def test_import_rejects_bad_lines(self):
+        """Test tampered stories, unsafe names and broken JSON are reported, not written"""
+        story = {'country': 'Peru'}
+        lines = [
+            json.dumps({'name': 'ok_20250101000000.json', 'sha256': story_checksum(story), 'story': story}),
+            json.dumps({'name': 'bad_20250101000000.json', 'sha256': story_checksum(story), 'story': {'country': 'Chile'}}),
+            json.dumps({'name': '../escape_20250101000000.json', 'story': story}),
+            '{"name": "torn',
+            '',
+        ]
+        written = []
+        summary = import_lines(lines, lambda name, story: (written.append(name), (name, 1))[1], fetcher=self.fetcher)
+        self.assertEqual(written, ['ok_20250101000000.json'])
+        self.assertEqual((summary['imported'], summary['failed'], summary['complete']), (1, 3, False))
+
+    def test_resume_cursor_stops_at_first_failure(self):
+        """Test the import resume point never skips past a story that failed to write"""
+        lines = list(export_lines(self.rows, self.stories.__getitem__, fetcher=self.fetcher))
+        def write(name, story):
+            if name == 's2_20250102000000.json':
+                raise IOError("bucket unavailable")
+            return name, 1
+        summary = import_lines(lines, write, fetcher=self.fetcher)
+        self.assertEqual(summary['resume_cursor'], json.loads(lines[1])['cursor'])
+        self.assertEqual(summary['failed'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Upload Spool Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.blob_fetcher import BlobFetcher
+from utils.upload_spool import UploadSpool
+
+class TestUploadSpool(unittest.TestCase):
+    """Test the write-behind upload spool"""
+
+    def setUp(self):
+        """Set up a spool directory and a fake uploader that can be made to fail"""
+        self.spool_dir = tempfile.mkdtemp()
+        self.fetcher = BlobFetcher(max_workers=2)
+        self.uploaded = {}
+        self.indexed = []
+        self.failing = set()
+
+    def tearDown(self):
+        self.fetcher.shutdown()
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def _upload(self, entry):
+        if entry['name'] in self.failing:
+            raise IOError("GCS unavailable")
+        self.uploaded[entry['name']] = entry['content']
+
+    def _spool(self, batch_size=32):
+        return UploadSpool(self.spool_dir, self._upload, lambda entries: self.indexed.extend(e['name'] for e in entries),
+                           batch_size=batch_size, fetcher=self.fetcher)
+
+    def test_drain_uploads_in_batches(self):
+        """Test queued entries are uploaded oldest first in batches and the journal is emptied"""
+        spool = self._spool(batch_size=2)
+        for i in range(3):
+            spool.enqueue(f'stories/s{i}_20250101000000.json', b'{"country": "France"}', metadata={'country': 'France'})
+
+        self.assertEqual(spool.drain_once(), (2, 0))
+        self.assertEqual(self.indexed, ['stories/s0_20250101000000.json', 'stories/s1_20250101000000.json'])
+        self.assertTrue(spool.drain())
+        self.assertEqual(len(self.uploaded), 3)
+        self.assertEqual(spool.pending(), [])
+        self.assertEqual(os.path.getsize(spool.journal_path), 0)
+
+    def test_failed_uploads_stay_queued(self):
+        """Test a failing upload is retried later while the rest of the batch goes through"""
+        spool = self._spool()
+        spool.enqueue('stories/ok_20250101000000.json', b'{}')
+        spool.enqueue('stories/bad_20250101000000.json', b'{}')
+        self.failing.add('stories/bad_20250101000000.json')
+
+        self.assertFalse(spool.drain())
+        self.assertEqual([entry['name'] for entry in spool.pending()], ['stories/bad_20250101000000.json'])
+
+        self.failing.clear()
+        self.assertTrue(spool.drain())
+        self.assertIn('stories/bad_20250101000000.json', self.uploaded)
+
+    def test_replay_after_restart(self):
+        """Test unacknowledged entries survive a restart and acknowledged ones (and torn writes) don't"""
+        spool = self._spool(batch_size=1)
+        spool.enqueue('stories/s1_20250101000000.json', b'\x1f\x8b gzip bytes', 'gzip', {'country': 'Peru'}, '42')
+        spool.enqueue('stories/s2_20250102000000.json', b'{}')
+        spool.drain_once()
+        with open(spool.journal_path, 'a') as f:
+            f.write('{"seq": 3, "name": "stories/torn')
+
+        replayed = self._spool().pending()
+        self.assertEqual([entry['name'] for entry in replayed], ['stories/s2_20250102000000.json'])
+
+        restarted = self._spool()
+        entry = restarted.enqueue('stories/s3_20250103000000.json', b'{}')
+        self.assertEqual(entry['seq'], 3)
+        self.assertEqual([entry['name'] for entry in self._spool().pending()],
+                         ['stories/s2_20250102000000.json', 'stories/s3_20250103000000.json'])
+
+    def test_replayed_entries_keep_upload_details(self):
+        """Test content, encoding, metadata and owner round-trip through the journal"""
+        self._spool().enqueue('stories/42/s1_20250101000000.json', b'\x1f\x8b gzip bytes', 'gzip', {'country': 'Peru'}, '42')
+        entry = self._spool().pending()[0]
+        self.assertEqual(entry['content'], b'\x1f\x8b gzip bytes')
+        self.assertEqual((entry['content_encoding'], entry['metadata'], entry['user_id']), ('gzip', {'country': 'Peru'}, '42'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+WanderLog AI Story Transfer
+Exports stories from local or Cloud Storage as NDJSON, or imports an NDJSON export, without loading the whole corpus
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.story_partition import StoryPartition
+from utils.story_transfer import export_lines, import_lines, rows_from_names
+
+LOCAL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'stories')
+
+def open_partition(args):
+    bucket = None
+    if args.bucket:
+        from google.cloud import storage
+        bucket = storage.Client().bucket(args.bucket)
+    return StoryPartition(args.user, bucket=bucket, local_root=args.local_dir, backend=args.backend)
+
+def export_stories(partition, cursor, limit, out):
+    trailer = None
+    store = partition.store
+    for line in export_lines(rows_from_names(store.names()), store.read, cursor, limit):
+        out.write(line)
+        trailer = line
+    print(f"✅ Export finished: {trailer.strip()}", file=sys.stderr)
+
+def import_stories(partition, lines):
+    def on_written(entries):
+        # SQLite rows index themselves; the search index is updated for every store
+        if not partition.store.maintains_index:
+            partition.index.add_many(entries)
+        partition.search.add_many((name, story) for name, story, _ in entries)
+    summary = import_lines(lines, partition.store.write, on_written)
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export or import WanderLog stories as NDJSON")
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('--bucket', help="stories bucket (default: local storage)")
+    parser.add_argument('--local-dir', default=LOCAL_DIR, help="local stories directory")
+    parser.add_argument('--backend', default='files', choices=['files', 'sqlite'], help="local storage backend")
+    parser.add_argument('--user', help="user id of the partition to transfer (default: shared stories)")
+    parser.add_argument('--file', help="NDJSON file to write (export) or read (import); default stdout/stdin")
+    parser.add_argument('--cursor', help="resume an export after this cursor")
+    parser.add_argument('--limit', type=int, help="export at most this many stories")
+    args = parser.parse_args()
+
+    partition = open_partition(args)
+    if args.command == 'export':
+        with (open(args.file, 'w') if args.file else sys.stdout) as out:
+            export_stories(partition, args.cursor, args.limit, out)
+    else:
+        with (open(args.file, 'r') if args.file else sys.stdin) as lines:
+            summary = import_stories(partition, lines)
+        sys.exit(0 if not summary['failed'] else 1)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+⚡ Blob Fetcher Module
+Bounded-concurrency thread pool for fetching many story blobs/files at once
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.story_codec import decode_story_bytes
+
+# Tunable from the environment so Cloud Run instances can be sized independently
+DEFAULT_FETCH_CONCURRENCY = int(os.environ.get("STORY_FETCH_CONCURRENCY", "16"))
+DEFAULT_FETCH_TIMEOUT = float(os.environ.get("STORY_FETCH_TIMEOUT", "30"))
+
+class BlobFetcher:
+    """Runs fetches on a shared thread pool and hands results back in input order"""
+
+    def __init__(self, max_workers: int = DEFAULT_FETCH_CONCURRENCY, timeout: float = DEFAULT_FETCH_TIMEOUT):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="blob-fetch")
+
+    def imap(self, fetch: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+        """Yield (item, result, error) in input order, keeping a bounded window of work in flight"""
+        window = self.max_workers * 2
+        pending = deque()
+        for item in items:
+            pending.append((item, self._executor.submit(fetch, item)))
+            if len(pending) >= window:
+                yield self._collect(*pending.popleft())
+        while pending:
+            yield self._collect(*pending.popleft())
+
+    def map(self, fetch: Callable[[Any], Any], items: Iterable[Any]) -> List[Tuple[Any, Any, Optional[Exception]]]:
+        """Fetch everything and return the (item, result, error) list in input order"""
+        return list(self.imap(fetch, items))
+
+    def _collect(self, item, future) -> Tuple[Any, Any, Optional[Exception]]:
+        try:
+            return item, future.result(timeout=self.timeout), None
+        except FutureTimeoutError:
+            future.cancel()
+            return item, None, TimeoutError(f"Timed out after {self.timeout}s")
+        except Exception as e:
+            return item, None, e
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=False)
+
+# Cloud Storage accepts at most 100 calls per batch request
+GCS_BATCH_LIMIT = 100
+
+def delete_gcs_blobs(bucket, names: List[str], fetcher: Optional['BlobFetcher'] = None) -> Tuple[List[str], List[Tuple[str, Exception]]]:
+    """Delete blobs with batch requests sent in parallel; returns (deleted names, [(name, error)])"""
+    from google.api_core.exceptions import NotFound
+
+    fetcher = fetcher or default_fetcher
+    chunks = [names[start:start + GCS_BATCH_LIMIT] for start in range(0, len(names), GCS_BATCH_LIMIT)]
+
+    def delete_chunk(chunk):
+        try:
+            with bucket.client.batch():
+                for name in chunk:
+                    bucket.delete_blob(name, timeout=fetcher.timeout)
+            return chunk, []
+        except Exception:
+            # A batch reports only its first failure: retry this chunk one blob at a time
+            deleted, failed = [], []
+            for name in chunk:
+                try:
+                    bucket.delete_blob(name, timeout=fetcher.timeout)
+                    deleted.append(name)
+                except NotFound:
+                    # Already gone (possibly deleted by the batch before it failed)
+                    deleted.append(name)
+                except Exception as e:
+                    failed.append((name, e))
+            return deleted, failed
+
+    deleted, failed = [], []
+    for chunk, result, error in fetcher.imap(delete_chunk, chunks):
+        if error:
+            failed.extend((name, error) for name in chunk)
+            continue
+        deleted.extend(result[0])
+        failed.extend(result[1])
+    return deleted, failed
+
+def download_json_blob(blob, timeout: float = DEFAULT_FETCH_TIMEOUT) -> Dict:
+    """Download and parse one story blob, compressed or not (GCS enforces the timeout per request)"""
+    # Raw bytes: we decode gzip ourselves rather than rely on GCS transcoding
+    return decode_story_bytes(blob.download_as_bytes(timeout=timeout, raw_download=True))
+
+def read_json_file(filepath: str) -> Dict:
+    """Read and parse one local story file, compressed or not"""
+    with open(filepath, 'rb') as f:
+        return decode_story_bytes(f.read())
+
+# Shared process-wide fetcher
+default_fetcher = BlobFetcher()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+🧪 Fake GCS Module
+In-memory stand-in for the google-cloud-storage client, with injectable latency and failures
+
+Covers the calls the story storage makes (blob uploads/downloads with generation preconditions,
+metadata, listing with a delimiter, batched deletes). Failures are decided from a seed, the operation,
+the object name and how many times that pair was called, so a run is reproducible whatever the
+thread interleaving.
+"""
+
+import contextlib
+import gzip
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Union
+
+from google.api_core.exceptions import NotFound, PreconditionFailed, ServiceUnavailable
+
+class _StoredObject:
+    """One live object version"""
+
+    def __init__(self, data: bytes, generation: int, content_type: Optional[str], content_encoding: Optional[str],
+                 metadata: Optional[Dict[str, str]], cache_control: Optional[str]):
+        self.data = data
+        self.generation = generation
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        self.metadata = dict(metadata) if metadata else None
+        self.cache_control = cache_control
+
+class FakeBlob:
+    """Blob handle: fields are filled from the stored object by get_blob/list_blobs or after an upload"""
+
+    def __init__(self, name: str, bucket: 'FakeBucket'):
+        self.name = name
+        self.bucket = bucket
+        self.metadata: Optional[Dict[str, str]] = None
+        self.content_type: Optional[str] = None
+        self.content_encoding: Optional[str] = None
+        self.cache_control: Optional[str] = None
+        self.generation: Optional[int] = None
+        self.size: Optional[int] = None
+        self.etag: Optional[str] = None
+
+    def _load(self, stored: _StoredObject) -> 'FakeBlob':
+        self.metadata = dict(stored.metadata) if stored.metadata else None
+        self.content_type = stored.content_type
+        self.content_encoding = stored.content_encoding
+        self.cache_control = stored.cache_control
+        self.generation = stored.generation
+        self.size = len(stored.data)
+        self.etag = hashlib.md5(stored.data).hexdigest()
+        return self
+
+    def upload_from_string(self, data: Union[bytes, str], content_type: Optional[str] = None,
+                           if_generation_match: Optional[int] = None, timeout=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        stored = self.bucket._put(self.name, data, content_type, self.content_encoding, self.metadata,
+                                  self.cache_control, if_generation_match)
+        self._load(stored)
+
+    def download_as_bytes(self, timeout=None, raw_download: bool = False, if_generation_match: Optional[int] = None) -> bytes:
+        # A handle with a generation reads that version only, like a listed blob does on GCS
+        stored = self.bucket._get(self.name, if_generation_match or self.generation)
+        if stored.content_encoding == 'gzip' and not raw_download:
+            # GCS decompresses gzip objects for clients that don't ask for the raw bytes
+            return gzip.decompress(stored.data)
+        return stored.data
+
+    def download_as_text(self, timeout=None, if_generation_match: Optional[int] = None) -> str:
+        return self.download_as_bytes(timeout=timeout, if_generation_match=if_generation_match).decode('utf-8')
+
+    def exists(self, timeout=None) -> bool:
+        return self.bucket.get_blob(self.name) is not None
+
+    def reload(self, timeout=None):
+        blob = self.bucket.get_blob(self.name)
+        if blob is None:
+            raise NotFound(f"No such object: {self.bucket.name}/{self.name}")
+        self._load(self.bucket._objects[self.name])
+
+    def delete(self, timeout=None):
+        self.bucket.delete_blob(self.name, timeout=timeout)
+
+class FakeBucket:
+    """In-memory bucket; every API call waits `latency` seconds and may fail with a 503"""
+
+    def __init__(self, name: str = "fake-bucket", client: Optional['FakeClient'] = None,
+                 latency: Union[float, Callable[[str], float]] = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.name = name
+        self.client = client or FakeClient()
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._objects: Dict[str, _StoredObject] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._attempts: Counter = Counter()
+        # Requests per operation ('get', 'list', 'upload', 'download', 'delete'), for benchmarks
+        self.requests: Counter = Counter()
+
+    def _request(self, operation: str, name: str = ''):
+        """Account for one API request: wait out the latency, then maybe fail it"""
+        with self._lock:
+            self.requests[operation] += 1
+            self._attempts[(operation, name)] += 1
+            attempt = self._attempts[(operation, name)]
+        delay = self.latency(operation) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and random.Random(f"{self.seed}:{operation}:{name}:{attempt}").random() < self.failure_rate:
+            raise ServiceUnavailable(f"Injected failure: {operation} {name}")
+
+    def _put(self, name: str, data: bytes, content_type, content_encoding, metadata, cache_control,
+             if_generation_match: Optional[int]) -> _StoredObject:
+        self._request('upload', name)
+        with self._lock:
+            current = self._objects.get(name)
+            if if_generation_match is not None:
+                current_generation = current.generation if current else 0
+                if current_generation != if_generation_match:
+                    raise PreconditionFailed(f"Generation mismatch for {name}")
+            self._generation += 1
+            stored = _StoredObject(data, self._generation, content_type, content_encoding, metadata, cache_control)
+            self._objects[name] = stored
+            return stored
+
+    def _get(self, name: str, generation: Optional[int] = None) -> _StoredObject:
+        self._request('download', name)
+        with self._lock:
+            stored = self._objects.get(name)
+        if stored is None or (generation is not None and stored.generation != generation):
+            raise NotFound(f"No such object: {self.name}/{name}")
+        return stored
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(name, self)
+
+    def get_blob(self, name: str, timeout=None) -> Optional[FakeBlob]:
+        self._request('get', name)
+        with self._lock:
+            stored = self._objects.get(name)
+        return FakeBlob(name, self)._load(stored) if stored else None
+
+    def list_blobs(self, prefix: str = '', delimiter: Optional[str] = None, timeout=None) -> List[FakeBlob]:
+        self._request('list', prefix)
+        prefix = prefix or ''
+        with self._lock:
+            items = sorted(self._objects.items())
+        return [FakeBlob(name, self)._load(stored) for name, stored in items
+                if name.startswith(prefix) and not (delimiter and delimiter in name[len(prefix):])]
+
+    def delete_blob(self, name: str, timeout=None):
+        self._request('delete', name)
+        with self._lock:
+            if self._objects.pop(name, None) is None:
+                raise NotFound(f"No such object: {self.name}/{name}")
+
+    def reload(self, timeout=None):
+        self._request('get')
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+class FakeClient:
+    """Client whose buckets are in-memory FakeBuckets sharing the same latency/failure settings"""
+
+    def __init__(self, latency: Union[float, Callable[[str], float]] = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._buckets: Dict[str, FakeBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> FakeBucket:
+        with self._lock:
+            if name not in self._buckets:
+                self._buckets[name] = FakeBucket(name, self, self.latency, self.failure_rate, self.seed)
+            return self._buckets[name]
+
+    @contextlib.contextmanager
+    def batch(self):
+        # Requests in a batch are sent one by one here; failures surface at the failing call
+        yield
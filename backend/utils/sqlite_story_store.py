@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+🗄️ SQLite Story Store Module
+Local story storage in a single SQLite database (WAL mode, indexed on country, ISO code and timestamp)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.country_aggregates import add_row, build_aggregates, remove_row, remove_rows
+from utils.map_country_mapping import CountryMapper
+from utils.story_index import CHANGE_LOG_SIZE, build_summary_row, cities_contain, has_valid_country, scan_local_stories, story_content_hash
+from utils.story_store import StoryStore
+
+SUMMARY_COLUMNS = ('story_id', 'name', 'country', 'iso_code', 'cities', 'timestamp', 'title', 'size', 'content_hash')
+
+class SQLiteStoryStore(StoryStore):
+    """Stories stored as rows: summary columns for queries plus the full JSON document"""
+
+    # Summary rows and country aggregates are columns/tables of the database itself
+    maintains_index = True
+
+    def __init__(self, db_path: str, country_mapper: Optional[CountryMapper] = None):
+        super().__init__()
+        self.db_path = db_path
+        self.country_mapper = country_mapper or CountryMapper()
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL lets readers continue while a save is being written
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # City filters match inside the JSON cities column, case-insensitively and beyond ASCII
+            conn.create_function("cities_contain", 2,
+                                 lambda cities, needle: cities_contain(json.loads(cities) if cities else [], needle),
+                                 deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write_transaction(self):
+        """This thread's connection inside a BEGIN IMMEDIATE transaction (committed, or rolled back on error)
+
+        Saves and deletes read the aggregates and counters they rewrite; taking the write lock before those
+        reads keeps concurrent writers (parallel imports, deletes) from overwriting each other's totals."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _init_schema(self):
+        """Create the stories table and its indexes"""
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS stories (
+                story_id TEXT PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL,
+                country TEXT,
+                iso_code TEXT,
+                cities TEXT,
+                timestamp TEXT NOT NULL,
+                title TEXT,
+                size INTEGER,
+                content_hash TEXT,
+                data TEXT NOT NULL
+            )
+        ''')
+        if 'content_hash' not in [column['name'] for column in conn.execute("PRAGMA table_info(stories)")]:
+            # Databases created before saves were deduplicated: add the column and hash the stored documents
+            conn.execute("ALTER TABLE stories ADD COLUMN content_hash TEXT")
+            conn.executemany("UPDATE stories SET content_hash = ? WHERE story_id = ?",
+                             [(story_content_hash(json.loads(row['data'])), row['story_id'])
+                              for row in conn.execute("SELECT story_id, data FROM stories")])
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_stories_country ON stories(country)")
+        # Country names are matched ignoring case and surrounding spaces, like matches_country does
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_stories_country_name ON stories(lower(trim(country)))")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_stories_iso_code ON stories(iso_code)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_stories_timestamp ON stories(timestamp DESC, story_id DESC)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_stories_content_hash ON stories(content_hash)")
+        # Bumped in the same transaction as every write, so readers can tell when anything changed
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS store_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', 0)")
+        # Saves and deletes by version, for delta sync; versions up to changes_floor can't be replayed
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS story_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                seq INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                story_id TEXT NOT NULL
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_story_changes_seq ON story_changes(seq)")
+        conn.execute("INSERT OR IGNORE INTO store_meta (key, value) SELECT 'changes_floor', value FROM store_meta WHERE key = 'version'")
+        # Count of listed stories (usable country, ISO code or not), kept in step by save/delete
+        if conn.execute("SELECT 1 FROM store_meta WHERE key = 'story_count'").fetchone() is None:
+            listed = sum(1 for row in self._summaries(conn) if has_valid_country(row))
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('story_count', ?)", (listed,))
+        # Per-country aggregates (JSON entries keyed by ISO code), kept in step by save/delete
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS country_aggregates (
+                iso_code TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            )
+        ''')
+        if conn.execute("SELECT COUNT(*) FROM country_aggregates").fetchone()[0] == 0:
+            # Databases created before the aggregates table existed
+            self._write_aggregates(conn, build_aggregates(self._summaries(conn)))
+        conn.commit()
+
+    def _row_to_summary(self, row: sqlite3.Row) -> Dict:
+        summary = {column: row[column] for column in SUMMARY_COLUMNS}
+        summary['cities'] = json.loads(summary['cities']) if summary['cities'] else []
+        return {key: value for key, value in summary.items() if value is not None}
+
+    def _summaries(self, conn: sqlite3.Connection, where: str = "", params: Tuple = ()) -> List[Dict]:
+        cursor = conn.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM stories {where}", params)
+        return [self._row_to_summary(row) for row in cursor]
+
+    def _read_aggregates(self, conn: sqlite3.Connection, iso_codes: Iterable[str]) -> Dict[str, Dict]:
+        iso_codes = [iso_code for iso_code in set(iso_codes) if iso_code]
+        if not iso_codes:
+            return {}
+        placeholders = ','.join('?' * len(iso_codes))
+        cursor = conn.execute(f"SELECT iso_code, data FROM country_aggregates WHERE iso_code IN ({placeholders})", iso_codes)
+        return {row['iso_code']: json.loads(row['data']) for row in cursor}
+
+    def _write_aggregates(self, conn: sqlite3.Connection, aggregates: Dict[str, Dict], iso_codes: Iterable[str] = ()):
+        """Store the given entries; iso_codes missing from aggregates are deleted"""
+        for iso_code in set(iso_codes) - set(aggregates):
+            conn.execute("DELETE FROM country_aggregates WHERE iso_code = ?", (iso_code,))
+        conn.executemany("INSERT OR REPLACE INTO country_aggregates (iso_code, data) VALUES (?, ?)",
+                         [(iso_code, json.dumps(entry)) for iso_code, entry in aggregates.items()])
+
+    def _rows_for_country(self, conn: sqlite3.Connection, iso_code: str) -> List[Dict]:
+        return self._summaries(conn, "WHERE iso_code = ?", (iso_code,))
+
+    def _rows_for_countries(self, conn: sqlite3.Connection, iso_codes: Iterable[str]) -> List[Dict]:
+        iso_codes = list(iso_codes)
+        return self._summaries(conn, f"WHERE iso_code IN ({','.join('?' * len(iso_codes))})", tuple(iso_codes))
+
+    def _bump_version(self, conn: sqlite3.Connection):
+        conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+
+    def _log_changes(self, conn: sqlite3.Connection, changes: List[Tuple[str, str]]):
+        """Record (op, story_id) changes under the current version, keeping the newest CHANGE_LOG_SIZE entries"""
+        seq = conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+        conn.executemany("INSERT INTO story_changes (seq, op, story_id) VALUES (?, ?, ?)",
+                         [(seq, op, story_id) for op, story_id in changes])
+        cutoff = conn.execute("SELECT seq FROM story_changes ORDER BY id DESC LIMIT 1 OFFSET ?", (CHANGE_LOG_SIZE,)).fetchone()
+        if cutoff:
+            conn.execute("DELETE FROM story_changes WHERE seq <= ?", (cutoff['seq'],))
+            conn.execute("UPDATE store_meta SET value = max(value, ?) WHERE key = 'changes_floor'", (cutoff['seq'],))
+
+    def changes_since(self, since: int) -> Optional[Tuple[List[Dict], int]]:
+        """Change-log entries after a sequence and the current sequence (None if the log doesn't reach back that far)"""
+        meta = {row['key']: row['value'] for row in self._connect().execute("SELECT key, value FROM store_meta")}
+        if since < meta['changes_floor']:
+            return None
+        cursor = self._connect().execute(
+            "SELECT seq, op, story_id FROM story_changes WHERE seq > ? AND seq <= ? ORDER BY id", (since, meta['version']))
+        return [dict(row) for row in cursor], meta['version']
+
+    def generation(self) -> int:
+        """Change token for caches: the store version itself"""
+        return self.version()
+
+    def version(self) -> int:
+        """Monotonically increasing store version (changes on every save or delete)"""
+        return self._connect().execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+
+    def count(self) -> int:
+        """Number of stored stories"""
+        return self._connect().execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+
+    def story_count(self) -> int:
+        """Number of stories listings show (usable country), with or without an ISO code"""
+        return self._connect().execute("SELECT value FROM store_meta WHERE key = 'story_count'").fetchone()[0]
+
+    def save(self, name: str, story_data: Dict) -> int:
+        """Insert or replace a story; returns its stored size in bytes"""
+        content = json.dumps(story_data)
+        size = len(content.encode('utf-8'))
+        row = build_summary_row(name, story_data, size, self.country_mapper)
+        if row is None:
+            raise ValueError(f"Invalid story name: {name}")
+        with self._write_transaction() as conn:
+            previous = self._summaries(conn, "WHERE story_id = ?", (row['story_id'],))
+            aggregates = self._read_aggregates(conn, [row.get('iso_code')] + [old.get('iso_code') for old in previous])
+            touched = list(aggregates)
+            conn.execute("DELETE FROM stories WHERE story_id = ?", (row['story_id'],))
+            for old in previous:
+                remove_row(aggregates, old, lambda iso_code: self._rows_for_country(conn, iso_code))
+            conn.execute('''
+                INSERT OR REPLACE INTO stories (story_id, name, country, iso_code, cities, timestamp, title, size, content_hash, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (row['story_id'], name, row.get('country'), row.get('iso_code'), json.dumps(row['cities']),
+                  row['timestamp'], row.get('title'), size, row['content_hash'], content))
+            add_row(aggregates, row)
+            self._write_aggregates(conn, aggregates, touched)
+            listed = int(has_valid_country(row)) - sum(1 for old in previous if has_valid_country(old))
+            conn.execute("UPDATE store_meta SET value = value + ? WHERE key = 'story_count'", (listed,))
+            self._bump_version(conn)
+            self._log_changes(conn, [('save', row['story_id'])])
+        return size
+
+    def load(self, names: List[str]) -> List[Dict]:
+        """Load full stories by name, in the given order (missing names are skipped)"""
+        if not names:
+            return []
+        conn = self._connect()
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(f"SELECT name, data FROM stories WHERE name IN ({placeholders})", chunk):
+                found[row['name']] = json.loads(row['data'])
+        return [found[name] for name in names if name in found]
+
+    def read(self, name: str) -> Dict:
+        stories = self.load([name])
+        if not stories:
+            raise FileNotFoundError(name)
+        return stories[0]
+
+    def read_many(self, names: Iterable[str]) -> Iterable[Tuple[str, Optional[Dict], Optional[Exception]]]:
+        # One query per 500 names instead of a query per story
+        names = list(names)
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            found = {row['name']: row['data'] for row in
+                     self._connect().execute(f"SELECT name, data FROM stories WHERE name IN ({placeholders})", chunk)}
+            for name in chunk:
+                if name in found:
+                    yield name, json.loads(found[name]), None
+                else:
+                    yield name, None, FileNotFoundError(name)
+
+    def write(self, filename: str, story: Dict) -> Tuple[str, int]:
+        return filename, self.save(filename, story)
+
+    def remove(self, names: List[str]) -> Tuple[List[str], List[Tuple[str, Exception]]]:
+        # Single delete transaction; names that weren't there are simply gone already
+        self.delete(names)
+        return list(names), []
+
+    def names(self) -> List[str]:
+        return [row['name'] for row in self._connect().execute("SELECT name FROM stories")]
+
+    def scan_summaries(self, country_mapper: Optional[CountryMapper] = None) -> Iterable[Dict]:
+        return self.rows()
+
+    def url(self, name: str) -> str:
+        return f"sqlite://{self.db_path}#{name}"
+
+    def scan(self) -> Iterable[Tuple[str, Dict, int]]:
+        """Yield (name, story, size) for every story, newest first"""
+        cursor = self._connect().execute("SELECT name, data, size FROM stories ORDER BY timestamp DESC, story_id DESC")
+        for row in cursor:
+            yield row['name'], json.loads(row['data']), row['size']
+
+    def rows(self, filters: Optional[Dict] = None) -> List[Dict]:
+        """Summary rows, newest first, optionally narrowed by parsed filters (never reads the story documents)"""
+        clauses, params = [], []
+        filters = filters or {}
+        # ISO code and timestamp are indexed columns; the city match runs only on rows that pass them
+        if 'iso_code' in filters:
+            clauses.append("iso_code = ?")
+            params.append(filters['iso_code'])
+        if 'country' in filters:
+            clauses.append("lower(trim(country)) = ?")
+            params.append(filters['country'])
+        if 'visit_date_from' in filters:
+            clauses.append("timestamp >= ?")
+            params.append(filters['visit_date_from'])
+        if 'visit_date_to' in filters:
+            clauses.append("timestamp <= ?")
+            params.append(filters['visit_date_to'])
+        if 'city' in filters:
+            clauses.append("cities_contain(cities, ?)")
+            params.append(filters['city'])
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        cursor = self._connect().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM stories {where}ORDER BY timestamp DESC, story_id DESC", params)
+        return [self._row_to_summary(row) for row in cursor]
+
+    def find(self, story_id: Optional[str] = None, content_hash: Optional[str] = None) -> Optional[Dict]:
+        """Summary row of a stored story with this id or content hash (indexed lookup), None if there is none"""
+        clauses, params = [], []
+        if story_id:
+            clauses.append("story_id = ?")
+            params.append(story_id)
+        if content_hash:
+            clauses.append("content_hash = ?")
+            params.append(content_hash)
+        if not clauses:
+            return None
+        # An id match (client idempotency key) wins over a content match
+        rows = self._summaries(self._connect(), f"WHERE {' OR '.join(clauses)} ORDER BY story_id = ? DESC LIMIT 1",
+                               tuple(params) + (story_id,))
+        return rows[0] if rows else None
+
+    def country_aggregates(self) -> Dict[str, Dict]:
+        """Per-country aggregates keyed by ISO code, straight from the aggregates table"""
+        cursor = self._connect().execute("SELECT iso_code, data FROM country_aggregates")
+        return {row['iso_code']: json.loads(row['data']) for row in cursor}
+
+    def names_for_ids(self, story_ids: List[str]) -> Dict[str, str]:
+        """Names of stored stories by story id (primary key lookups); unknown ids are left out"""
+        names = {}
+        for start in range(0, len(story_ids), 500):
+            chunk = story_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in self._connect().execute(f"SELECT story_id, name FROM stories WHERE story_id IN ({placeholders})", chunk):
+                names[row['story_id']] = row['name']
+        return names
+
+    def names_for_country(self, country: str, iso_code: Optional[str] = None) -> List[str]:
+        """Names of stories saved with this country name (ignoring case) or ISO code (indexed lookup)"""
+        cursor = self._connect().execute("SELECT name FROM stories WHERE lower(trim(country)) = ? OR iso_code = ?",
+                                         (str(country or '').strip().lower(), iso_code))
+        return [row['name'] for row in cursor]
+
+    def delete(self, names: List[str]) -> int:
+        """Delete stories by name; returns how many rows were removed"""
+        if not names:
+            return 0
+        deleted = 0
+        removed = []
+        with self._write_transaction() as conn:
+            for start in range(0, len(names), 500):
+                chunk = names[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                removed.extend(self._summaries(conn, f"WHERE name IN ({placeholders})", tuple(chunk)))
+                deleted += conn.execute(f"DELETE FROM stories WHERE name IN ({placeholders})", chunk).rowcount
+            if deleted:
+                # One aggregate pass for the whole delete, rescanning only countries that lost an extreme
+                aggregates = self._read_aggregates(conn, [row.get('iso_code') for row in removed])
+                touched = list(aggregates)
+                remove_rows(aggregates, removed, lambda iso_codes: self._rows_for_countries(conn, iso_codes))
+                self._write_aggregates(conn, aggregates, touched)
+                listed = sum(1 for row in removed if has_valid_country(row))
+                conn.execute("UPDATE store_meta SET value = value - ? WHERE key = 'story_count'", (listed,))
+                self._bump_version(conn)
+                self._log_changes(conn, [('delete', row['story_id']) for row in removed])
+        return deleted
+
+    def import_files(self, directory: str) -> int:
+        """One-off import of JSON story files from the old local storage directory"""
+        imported = 0
+        for name, story_data, _ in scan_local_stories(directory):
+            try:
+                self.save(name, story_data)
+                imported += 1
+            except ValueError as e:
+                print(f"⚠️ Skipping {name}: {e}")
+        if imported:
+            print(f"✅ Imported {imported} local story files into {self.db_path}")
+        return imported
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+🧠 Story Cache Module
+Process-wide cache of loaded stories, invalidated on writes and checked against a storage generation
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class StoryCache:
+    """Caches loader results until this process writes or the storage generation changes (values are shared: read-only)"""
+
+    def __init__(self, generation: Callable[[], Optional[Hashable]]):
+        self._generation = generation
+        self._entries: Dict[str, Tuple[Optional[Hashable], Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, (re)loading it if it is missing or stale"""
+        # One loader per key at a time: concurrent requests wait for the same load
+        with self._key_lock(key):
+            generation = self._generation()
+            entry = self._entries.get(key)
+            if entry is not None and generation is not None and entry[0] == generation:
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            # Tag with the generation seen before loading, so a write during the load forces a reload
+            value = loader()
+            with self._lock:
+                self._entries[key] = (generation, value)
+            return value
+
+    def invalidate(self):
+        """Drop everything (called after this process saves or deletes stories)"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+🗜️ Story Codec Module
+Optional compression of stored story JSON (gzip on GCS, zstd with a trained dictionary locally)
+"""
+
+import gzip
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODECS = ('none', 'gzip', 'zstd')
+
+# Magic numbers let readers tell compressed objects from the plain JSON written before compression existed
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# Dictionary used to compress local story files (and to read them back)
+ZSTD_DICTIONARY_PATH = os.environ.get("STORY_ZSTD_DICTIONARY", "backend/data/story_codec.dict")
+
+_dictionary_lock = threading.Lock()
+_dictionaries: Dict[str, Optional['zstandard.ZstdCompressionDict']] = {}
+
+def load_zstd_dictionary(path: Optional[str]):
+    """Load (once) a trained zstd dictionary, or None if there isn't one"""
+    if not path or zstandard is None:
+        return None
+    with _dictionary_lock:
+        if path not in _dictionaries:
+            dictionary = None
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    dictionary = zstandard.ZstdCompressionDict(f.read())
+            _dictionaries[path] = dictionary
+        return _dictionaries[path]
+
+def train_zstd_dictionary(stories: Iterable[Dict], path: str, size: int = 16384) -> int:
+    """Train a zstd dictionary on sample stories and save it; returns the number of samples used"""
+    if zstandard is None:
+        raise RuntimeError("zstandard is not installed")
+    samples = [json.dumps(story, separators=(',', ':')).encode('utf-8') for story in stories]
+    dictionary = zstandard.train_dictionary(size, samples)
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'wb') as f:
+        f.write(dictionary.as_bytes())
+    with _dictionary_lock:
+        _dictionaries.pop(path, None)
+    return len(samples)
+
+def decode_story_bytes(data: bytes, dictionary_path: Optional[str] = ZSTD_DICTIONARY_PATH) -> Dict:
+    """Parse a stored story whether it is plain JSON, gzip or zstd"""
+    if data.startswith(GZIP_MAGIC):
+        data = gzip.decompress(data)
+    elif data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("Story is zstd-compressed but zstandard is not installed")
+        dictionary = load_zstd_dictionary(dictionary_path)
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary) if dictionary else zstandard.ZstdDecompressor()
+        # Our frames always record their size, but cap it anyway
+        data = decompressor.decompress(data, max_output_size=64 * 1024 * 1024)
+    return json.loads(data.decode('utf-8'))
+
+class StoryCodec:
+    """Encodes stories for storage; 'none' keeps the old plain JSON format"""
+
+    def __init__(self, name: str = 'none', dictionary_path: Optional[str] = None):
+        if name not in CODECS:
+            raise ValueError(f"Unknown story codec: {name}")
+        if name == 'zstd' and zstandard is None:
+            print("⚠️ zstandard not installed, compressing stories with gzip instead")
+            name = 'gzip'
+        self.name = name
+        self.dictionary_path = dictionary_path
+
+    def encode(self, story: Dict) -> Tuple[bytes, Optional[str]]:
+        """Return (stored bytes, Content-Encoding header value or None)"""
+        if self.name == 'none':
+            return json.dumps(story).encode('utf-8'), None
+        raw = json.dumps(story, separators=(',', ':')).encode('utf-8')
+        if self.name == 'gzip':
+            # mtime=0 keeps the output deterministic for identical stories
+            return gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+        dictionary = load_zstd_dictionary(self.dictionary_path)
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary) if dictionary \
+            else zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        # zstd isn't a Content-Encoding GCS understands, so local files only
+        return compressor.compress(raw), None
+
+    def decode(self, data: bytes) -> Dict:
+        """Parse stored bytes written with any codec (or none)"""
+        return decode_story_bytes(data, self.dictionary_path or ZSTD_DICTIONARY_PATH)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+🧱 Story Record Module
+Compact in-memory forms of cached stories: __slots__ summary records and interned story dicts
+
+A cached summary row is read-only and has the same fields for every story, so it is kept as a
+StoryRecord (no per-row dict) whose country, ISO code and city strings are shared by all records.
+Records read like the row dicts they replace, so listing, filtering and pagination code is unchanged.
+Narratives, answers and photos are never part of a record; they are fetched per story by name when needed.
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterator
+
+from utils.story_index import SUMMARY_FIELDS
+
+# Summary fields that repeat across stories and are worth sharing one string object for
+INTERNED_FIELDS = ('country', 'iso_code')
+
+# Story document fields whose values repeat across stories
+INTERNED_STORY_FIELDS = ('country', 'city', 'story_length', 'style', 'user_id')
+
+def intern_value(value):
+    """The shared copy of a string (other values unchanged)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+class StoryRecord(Mapping):
+    """Summary row of one story in slots; behaves as a read-only dict of the row's present fields"""
+
+    # name is rebuilt from prefix, story_id and timestamp rather than stored a second time
+    __slots__ = ('story_id', 'prefix', 'country', 'iso_code', 'cities', 'timestamp', 'title', 'size', 'content_hash')
+
+    def __init__(self, row: Dict):
+        self.story_id = row['story_id']
+        self.timestamp = row['timestamp']
+        name = row['name']
+        suffix = f"{self.story_id}_{self.timestamp}.json"
+        # The id and timestamp were parsed from the name, so only the (shared) prefix is kept;
+        # a name that somehow doesn't end that way is kept whole
+        self.prefix = intern_value(name[:-len(suffix)]) if name.endswith(suffix) else name
+        for field in INTERNED_FIELDS:
+            setattr(self, field, intern_value(row.get(field)))
+        self.cities = tuple(intern_value(city) for city in row.get('cities') or ())
+        self.title = row.get('title')
+        self.size = row.get('size')
+        self.content_hash = row.get('content_hash')
+
+    @property
+    def name(self) -> str:
+        if self.prefix.endswith('.json'):
+            # Kept whole (see __init__)
+            return self.prefix
+        return f"{self.prefix}{self.story_id}_{self.timestamp}.json"
+
+    def __getitem__(self, key: str):
+        if key not in SUMMARY_FIELDS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        # Absent fields are left out, like build_summary_row leaves them out of dict rows
+        return (field for field in SUMMARY_FIELDS if getattr(self, field) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"StoryRecord({dict(self)!r})"
+
+def compact_story(story: Dict) -> Dict:
+    """Copy of a full story whose keys and repeated values are shared strings (for long-lived caches)"""
+    compact = {intern_value(key): value for key, value in story.items()}
+    for field in INTERNED_STORY_FIELDS:
+        if field in compact:
+            compact[field] = intern_value(compact[field])
+    if isinstance(compact.get('cities'), list):
+        compact['cities'] = [intern_value(city) for city in compact['cities']]
+    return compact
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+🚚 Story Transfer Module
+Streams stories out as newline-delimited JSON and back in, for moving corpora between buckets and environments
+
+Each story is one line: {"name", "cursor", "sha256", "story"}. The export ends with a trailer line
+{"end": true, "count", "next_cursor"}; next_cursor is set when the export stopped at a limit, and the
+cursor of any line resumes an interrupted export right after that story.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.blob_fetcher import BlobFetcher, default_fetcher
+from utils.story_index import encode_cursor, paginate_rows, parse_story_name
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Stories fetched (export) or indexed (import) per round trip
+TRANSFER_BATCH_SIZE = int(os.environ.get("STORY_TRANSFER_BATCH_SIZE", "100"))
+
+# Errors kept in an import summary (the rest are only counted)
+MAX_REPORTED_ERRORS = 100
+
+def story_checksum(story: Dict) -> str:
+    """sha256 of the story's canonical JSON form (key order and whitespace don't matter)"""
+    canonical = json.dumps(story, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def rows_from_names(names: Iterable[str]) -> List[Dict]:
+    """Cursor-ready rows (newest first) from story blob/file names alone, without reading any story"""
+    rows = []
+    for name in names:
+        parsed = parse_story_name(name)
+        if parsed:
+            rows.append({'name': name, 'story_id': parsed[0], 'timestamp': parsed[1]})
+    rows.sort(key=lambda row: (row['timestamp'], row['story_id']), reverse=True)
+    return rows
+
+def export_lines(rows: List[Dict], read_story: Callable[[str], Dict], cursor: Optional[str] = None,
+                 limit: Optional[int] = None, fetcher: Optional[BlobFetcher] = None) -> Iterator[str]:
+    """Yield NDJSON lines for the rows after cursor, fetching stories a bounded window at a time"""
+    fetcher = fetcher or default_fetcher
+    if cursor or limit is not None:
+        rows, next_cursor = paginate_rows(rows, limit if limit is not None else len(rows) or 1, cursor)
+    else:
+        next_cursor = None
+
+    count = 0
+    for start in range(0, len(rows), TRANSFER_BATCH_SIZE):
+        batch = rows[start:start + TRANSFER_BATCH_SIZE]
+        for row, story, error in fetcher.imap(lambda row: read_story(row['name']), batch):
+            if error:
+                # Keep going: the trailer count tells the importer how many lines to expect
+                print(f"⚠️ Skipping unreadable story {row['name']} in export: {error}")
+                continue
+            record = {
+                'name': os.path.basename(row['name']),
+                'cursor': encode_cursor(row),
+                'sha256': story_checksum(story),
+                'story': story
+            }
+            yield json.dumps(record, separators=(',', ':')) + '\n'
+            count += 1
+    yield json.dumps({'end': True, 'count': count, 'next_cursor': next_cursor}) + '\n'
+
+def parse_import_line(line: Any) -> Dict:
+    """Parse and verify one NDJSON line (raises ValueError describing what is wrong)"""
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("line is not a JSON object")
+    if record.get('end'):
+        return record
+    name, story = record.get('name'), record.get('story')
+    # Plain file names only: imported names become blob names and local paths
+    if not isinstance(name, str) or os.path.basename(name) != name or not parse_story_name(name):
+        raise ValueError(f"invalid story name {name!r}")
+    if not isinstance(story, dict):
+        raise ValueError(f"story {name} is not a JSON object")
+    if record.get('sha256') and record['sha256'] != story_checksum(story):
+        raise ValueError(f"checksum mismatch for {name}")
+    return record
+
+def import_lines(lines: Iterable[Any], write_story: Callable[[str, Dict], Tuple[str, int]],
+                 on_written: Optional[Callable[[List[Tuple[str, Dict, int]]], None]] = None,
+                 fetcher: Optional[BlobFetcher] = None) -> Dict:
+    """Write stories from NDJSON lines in parallel, holding only a bounded window in memory
+
+    write_story(name, story) stores one story and returns (stored name, size); on_written gets
+    (stored name, story, size) batches, e.g. to index them. Returns an import summary.
+    """
+    fetcher = fetcher or default_fetcher
+    summary = {'imported': 0, 'failed': 0, 'errors': [], 'resume_cursor': None, 'complete': False}
+    expected = None
+    in_order = True
+
+    def fail(message):
+        nonlocal in_order
+        # Everything after the first failure has to be retried, so the resume point stops here
+        in_order = False
+        summary['failed'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append(message)
+
+    def records():
+        nonlocal expected
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = parse_import_line(line)
+            except ValueError as e:
+                fail(f"line {line_number}: {e}")
+                continue
+            if record.get('end'):
+                expected = record.get('count')
+                continue
+            yield record
+
+    def write(record):
+        return write_story(record['name'], record['story'])
+
+    written = []
+    for record, result, error in fetcher.imap(write, records()):
+        if error:
+            fail(f"{record['name']}: {error}")
+            continue
+        summary['imported'] += 1
+        if in_order and record.get('cursor'):
+            summary['resume_cursor'] = record['cursor']
+        written.append((result[0], record['story'], result[1]))
+        if len(written) >= TRANSFER_BATCH_SIZE:
+            if on_written:
+                on_written(written)
+            written = []
+    if written and on_written:
+        on_written(written)
+
+    summary['complete'] = expected is not None and not summary['failed'] and summary['imported'] == expected
+    return summary
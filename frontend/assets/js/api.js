@@ -8,9 +8,21 @@ class WanderLogAPI {
             ? 'http://localhost:8080/api'
             : 'https://us-central1-ai-test-394019.cloudfunctions.net/wanderlog_ai';
         this.baseURL = API_BASE_URL;
+        // Last ETag and body per read-only request, for If-None-Match revalidation
+        this.etagCache = new Map();
+    }
+
+    // Attach the signed-in user's session so story actions read and write their own partition
+    withSession(data) {
+        const sessionToken = localStorage.getItem('wanderlog_session_token');
+        if (!sessionToken || !data || data.session_token) {
+            return data;
+        }
+        return { ...data, session_token: sessionToken };
     }
 
     async makeRequest(data, method = 'POST') {
+        data = this.withSession(data);
         try {
             const options = {
                 method,
@@ -36,6 +48,41 @@ class WanderLogAPI {
         }
     }
 
+    // POST a read-only action, reusing the cached body when the server answers 304 Not Modified
+    async makeConditionalRequest(data) {
+        data = this.withSession(data);
+        const key = JSON.stringify(data);
+        const cached = this.etagCache.get(key);
+        try {
+            const headers = { 'Content-Type': 'application/json' };
+            if (cached) {
+                headers['If-None-Match'] = cached.etag;
+            }
+            const response = await fetch(this.baseURL, {
+                method: 'POST',
+                headers,
+                body: key
+            });
+
+            if (response.status === 304 && cached) {
+                return cached.body;
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const body = await response.json();
+            const etag = response.headers.get('ETag');
+            if (etag) {
+                this.etagCache.set(key, { etag, body });
+            }
+            return body;
+        } catch (error) {
+            console.error('API request failed:', error);
+            throw error;
+        }
+    }
+
     // Suggest cities for a country
     async suggestCities(country) {
         const data = {
@@ -82,20 +129,112 @@ class WanderLogAPI {
     }
 
     // Save a story
-    async saveStory(storyData) {
+    // Pass the same idempotencyKey when retrying so the story is only stored once
+    async saveStory(storyData, idempotencyKey = null) {
         const data = {
             action: 'save_story',
             ...storyData
         };
+        if (idempotencyKey) {
+            data.idempotency_key = idempotencyKey;
+        }
         return await this.makeRequest(data);
     }
 
-    // Get all saved stories
-    async getStories() {
+    // Get all saved stories, optionally narrowed on the server
+    // filters: { country | iso_code, visit_date: { from, to }, city }
+    async getStories(filters = null) {
         const data = {
             action: 'get_stories'
         };
-        return await this.makeRequest(data);
+        if (filters) {
+            data.filters = filters;
+        }
+        return await this.makeConditionalRequest(data);
+    }
+
+    // One story by id (a single object read on the server)
+    async getStory(storyId) {
+        const data = {
+            action: 'get_story',
+            story_id: storyId
+        };
+        return await this.makeConditionalRequest(data);
+    }
+
+    // Several stories by id, in the given order; unknown ids come back in `missing`
+    async getStoriesByIds(storyIds) {
+        const data = {
+            action: 'get_stories_by_ids',
+            story_ids: storyIds
+        };
+        return await this.makeConditionalRequest(data);
+    }
+
+    // Saves and deletes after a sequence from an earlier call; without one (or when too far behind)
+    // the response is a full snapshot with reset: true
+    async getStoriesSince(since = null) {
+        const data = {
+            action: 'get_stories_since'
+        };
+        if (since !== null && since !== undefined) {
+            data.since = since;
+        }
+        return await this.makeConditionalRequest(data);
+    }
+
+    // Live story and map changes as Server-Sent Events; EventSource reconnects (and resumes) by itself.
+    // handlers: { 'story-added': fn, 'story-deleted': fn, 'map-version-changed': fn, reset: fn, closed: fn }
+    // closed(source) runs when the stream gives up (expired token, too many streams); since resumes after a sequence.
+    async subscribeToChanges(handlers = {}, since = null) {
+        if (typeof EventSource === 'undefined') {
+            return null;
+        }
+        // EventSource can't set headers, so a short-lived stream token goes in the URL, never the session token
+        const params = new URLSearchParams();
+        if (localStorage.getItem('wanderlog_session_token')) {
+            const data = await this.makeRequest({ action: 'get_stream_token' });
+            if (!data.success) {
+                return null;
+            }
+            params.set('stream_token', data.stream_token);
+        }
+        if (since !== null && since !== undefined) {
+            params.set('since', since);
+        }
+        const query = params.toString() ? `?${params}` : '';
+        const source = new EventSource(`${this.baseURL}/events${query}`);
+        source.lastSequence = since;
+        Object.entries(handlers).forEach(([event, handler]) => {
+            if (event === 'closed') {
+                return;
+            }
+            source.addEventListener(event, message => {
+                if (message.lastEventId) {
+                    source.lastSequence = Number(message.lastEventId);
+                }
+                handler(JSON.parse(message.data));
+            });
+        });
+        source.addEventListener('ready', message => {
+            source.lastSequence = Number(message.lastEventId);
+        });
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED && handlers.closed) {
+                handlers.closed(source);
+            }
+        };
+        return source;
+    }
+
+    // Full-text search over saved stories, best matches first
+    async searchStories(query, limit = 20) {
+        const data = {
+            action: 'search_stories',
+            query: query,
+            limit: limit
+        };
+        return await this.makeConditionalRequest(data);
     }
 
     // Map-related APIs
@@ -104,14 +243,14 @@ class WanderLogAPI {
             action: 'get_highlighted_map',
             countries: countries
         };
-        return await this.makeRequest(data);
+        return await this.makeConditionalRequest(data);
     }
 
     async getMapStatistics() {
         const data = {
             action: 'get_map_statistics'
         };
-        return await this.makeRequest(data);
+        return await this.makeConditionalRequest(data);
     }
 
     async exportMapData(format = 'json') {
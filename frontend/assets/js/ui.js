@@ -29,6 +29,10 @@ class WanderLogUI {
         this.uploadedPhotos = []; // Store base64 data URLs for up to 3 photos
         this.selectedStoryLength = 'detailed';
         this.generatedNarrative = '';
+        this.saveIdempotencyKey = null;
+        this.storySequence = null;
+        this.storySyncToken = null;
+        this.storyEvents = null;
         this.currentStyle = 'original';
         this.aiSuggestedCities = [];
         this.currentCityData = {};
@@ -186,6 +190,9 @@ class WanderLogUI {
     }
 
     setupEventListeners() {
+        // Event streams hold a server thread, so close them while the tab is in the background
+        document.addEventListener('visibilitychange', () => this.subscribeToStoryChanges());
+
         // Create story form
         const createForm = document.getElementById('createForm');
         if (createForm) {
@@ -398,6 +405,7 @@ class WanderLogUI {
         
         // Set current page
         this.currentPage = pageName;
+        this.subscribeToStoryChanges();
         
         // Hide all pages
         const pages = ['create', 'stories', 'map', 'profile'];
@@ -937,6 +945,7 @@ class WanderLogUI {
             const data = await response.json();
             if (response.ok && data.narrative) {
                 this.generatedNarrative = data.narrative;
+                this.saveIdempotencyKey = null;
                 
                 // Display formatted story in editable container
                 this.displayFormattedStory(data.narrative);
@@ -1200,7 +1209,10 @@ class WanderLogUI {
                 },
                 body: JSON.stringify({
                     action: 'save_story',
-                    story_data: storyData
+                    story_data: storyData,
+                    // Same key for every save of this narrative, so double-clicks and retries store it once
+                    idempotency_key: this.getSaveIdempotencyKey(),
+                    session_token: this.sessionToken || undefined
                 })
             });
             const data = await response.json();
@@ -1218,6 +1230,16 @@ class WanderLogUI {
         }
     }
 
+    // One idempotency key per generated narrative
+    getSaveIdempotencyKey() {
+        if (!this.saveIdempotencyKey) {
+            this.saveIdempotencyKey = (window.crypto && crypto.randomUUID)
+                ? crypto.randomUUID()
+                : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        }
+        return this.saveIdempotencyKey;
+    }
+
     // Finish Story
     async finishStory() {
         // Save the story first
@@ -1234,6 +1256,7 @@ class WanderLogUI {
         this.manualCities = [];
         this.userAnswers = [];
         this.generatedNarrative = '';
+        this.saveIdempotencyKey = null;
         this.selectedStoryLength = 'detailed';
         this.uploadedPhotos = []; // Reset photos
         
@@ -1567,34 +1590,135 @@ class WanderLogUI {
         }
     }
 
-    // Load and display saved stories
-    async loadSavedStories() {
-        this.showLoading('Loading your stories...');
+    // Load and display saved stories: a full snapshot the first time, then only what changed since
+    async loadSavedStories({ quiet = false } = {}) {
+        if (!quiet) {
+            this.showLoading('Loading your stories...');
+        }
         try {
             const api = new WanderLogAPI();
-            const data = await api.getStories();
-            if (data.stories) {
-                this.stories = data.stories;
+            // Sequences belong to one user's stories, so signing in or out starts over
+            const sessionToken = localStorage.getItem('wanderlog_session_token');
+            const since = this.storySyncToken === sessionToken ? this.storySequence : null;
+            const data = await api.getStoriesSince(since);
+            if (data.success && (data.reset ? data.stories : data.changes)) {
+                this.stories = data.reset ? data.stories : this.applyStoryChanges(this.stories || [], data.changes);
+                this.storySequence = data.sequence;
+                this.storySyncToken = sessionToken;
                 this.filteredStories = [...this.stories];
                 this.displayStories();
             } else {
+                this.storySequence = null;
                 this.stories = [];
                 this.filteredStories = [];
                 this.showMessage(data.error || 'Failed to load stories.');
                 this.displayEmptyState();
             }
         } catch (error) {
+            this.storySequence = null;
             this.stories = [];
             this.filteredStories = [];
             this.showMessage('Network error. Please try again.');
             console.error('Error loading stories:', error);
             this.displayEmptyState();
         } finally {
-            this.hideLoading();
+            if (!quiet) {
+                this.hideLoading();
+            }
             this.updateDashboardCounters();
         }
     }
 
+    // Follow story and map changes pushed by the server (other tabs and devices) instead of polling.
+    // Each stream holds a server thread, so one is open only while the stories or map page is on screen.
+    subscribeToStoryChanges() {
+        const sessionToken = localStorage.getItem('wanderlog_session_token');
+        const wanted = !document.hidden && (this.currentPage === 'stories' || this.currentPage === 'map');
+        if (this.storyEventsToken !== sessionToken) {
+            // Another user's sequence means nothing to this session's stream
+            this.closeStoryEvents();
+            this.storyEventsSequence = null;
+        }
+        if (!wanted) {
+            this.closeStoryEvents();
+            return;
+        }
+        if (this.storyEvents || this.storyEventsOpening) {
+            return;
+        }
+        clearTimeout(this.storyEventsRetryTimer);
+        const refreshStories = () => {
+            // Only lists already loaded need catching up; several events in a row cause one delta sync
+            if (this.storySequence === null || this.storySequence === undefined) {
+                return;
+            }
+            clearTimeout(this.storyRefreshTimer);
+            this.storyRefreshTimer = setTimeout(() => this.loadSavedStories({ quiet: true }), 250);
+        };
+        this.storyEventsToken = sessionToken;
+        this.storyEventsOpening = true;
+        new WanderLogAPI().subscribeToChanges({
+            'story-added': refreshStories,
+            'story-deleted': refreshStories,
+            'reset': refreshStories,
+            'map-version-changed': () => {
+                if (this.currentPage === 'map') {
+                    this.loadMapData();
+                }
+            },
+            // Expired stream token or a busy server: open a new stream a little later, resuming where this one stopped
+            'closed': source => {
+                if (this.storyEvents !== source) {
+                    return;
+                }
+                this.storyEventsSequence = source.lastSequence;
+                this.storyEvents = null;
+                clearTimeout(this.storyEventsRetryTimer);
+                this.storyEventsRetryTimer = setTimeout(() => this.subscribeToStoryChanges(), 10000);
+            }
+        }, this.storyEventsSequence).then(source => {
+            this.storyEventsOpening = false;
+            if (!source) {
+                return;
+            }
+            if (this.storyEventsToken !== sessionToken || this.storyEvents) {
+                source.close();
+                return;
+            }
+            this.storyEvents = source;
+            // The page may have changed while the stream token was being fetched
+            this.subscribeToStoryChanges();
+        }).catch(error => {
+            this.storyEventsOpening = false;
+            console.error('Error subscribing to story changes:', error);
+        });
+    }
+
+    closeStoryEvents() {
+        clearTimeout(this.storyEventsRetryTimer);
+        if (this.storyEvents) {
+            this.storyEventsSequence = this.storyEvents.lastSequence;
+            this.storyEvents.close();
+            this.storyEvents = null;
+        }
+    }
+
+    // Apply get_stories_since changes to a newest-first story list
+    applyStoryChanges(stories, changes) {
+        const changedIds = new Set(changes.map(change => change.story_id));
+        const kept = stories.filter(story => !changedIds.has(story.story_id));
+        const saved = changes.filter(change => change.op === 'save').map(change => change.story);
+        return [...saved.reverse(), ...kept];
+    }
+
+    // Saved photos are either inline data URLs (older stories) or photos/<id> references served by the API
+    resolvePhotoUrl(photo) {
+        if (typeof photo === 'string' && photo.startsWith('photos/')) {
+            return `${this.API_BASE_URL}/${photo}`;
+        }
+        return photo;
+    }
+
     // Display stories in country cards
     displayStories() {
         const container = document.getElementById('storiesContainer');
@@ -1660,7 +1784,7 @@ class WanderLogUI {
                     <div class="country-photos">
                         ${stories.map(story =>
                             (story.photos && story.photos.length > 0) ?
-                                story.photos.slice(0, 3).map(photo => `<img src="${photo}" style="max-width:80px;max-height:80px;margin:4px;border-radius:6px;box-shadow:0 1px 4px #ccc;" loading="lazy" />`).join('')
+                                story.photos.slice(0, 3).map(photo => `<img src="${this.resolvePhotoUrl(photo)}" style="max-width:80px;max-height:80px;margin:4px;border-radius:6px;box-shadow:0 1px 4px #ccc;" loading="lazy" />`).join('')
                                 : ''
                         ).join('')}
                     </div>
@@ -1977,7 +2101,8 @@ class WanderLogUI {
                 },
                 body: JSON.stringify({
                     action: 'delete_stories_by_country',
-                    country_name: country
+                    country_name: country,
+                    session_token: this.sessionToken || undefined
                 })
             });
             
@@ -2107,6 +2232,7 @@ class WanderLogUI {
     }
     
     updateAuthUI(isLoggedIn) {
+        this.subscribeToStoryChanges();
         const guestMenu = document.getElementById('profileMenuGuest');
         const loggedInMenu = document.getElementById('profileMenuLoggedIn');
         const profileName = document.getElementById('profileMenuName');